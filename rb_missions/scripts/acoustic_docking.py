@@ -18,12 +18,13 @@ import math
 import time
 import os
 
-import numpy as np
 import rospy
 from geometry_msgs.msg import Pose, Pose2D, PoseArray
 from std_msgs.msg import Int32, Float32MultiArray, Float64, String
 from visualization_msgs.msg import Marker, MarkerArray
 
+from usv_control import frames, state_machine
+
 class AcousticDocking:
     def __init__(self):
         self.ned_x = 0
@@ -31,6 +32,7 @@ class AcousticDocking:
         self.yaw = 0
 
         self.activated = True
+        self.state = 0
 
         self.distance = 0
         self.signal_angle = 0
@@ -121,6 +123,28 @@ class AcousticDocking:
 
         self.desired(path_array)
 
+    def approach(self):
+        '''
+        @name: approach
+        @brief: Sends the docking waypoints while the dock is at least 5 m away.
+        @param: --
+        @return: --
+        '''
+        self.calculate_distance_to_dock()
+        if self.distance >= 5:
+            self.dock()
+
+    def hold(self):
+        '''
+        @name: hold
+        @brief: Reports the USV as docked while the dock is closer than 5 m.
+        @param: --
+        @return: --
+        '''
+        self.calculate_distance_to_dock()
+        if self.distance < 5:
+            self.status_pub.publish(1)
+
     def aux_to_body(self, aux_x2, aux_y2, alpha, body_x1, body_y1):
         '''
         @name: aux_to_body
@@ -133,23 +157,12 @@ class AcousticDocking:
         @return: body_x2: target x coordinate in body reference frame
                  body_y2: target y coordinate in body reference frame
         '''
-        p = np.array([[aux_x2],[aux_y2]])
-        J = self.rotation_matrix(alpha)
-        n = J.dot(p)
-        body_x2 = n[0] + body_x1
-        body_y2 = n[1] + body_y1
+        body_x2, body_y2 = frames.to_parent((aux_x2, aux_y2), alpha, body_x1, body_y1)
         return (body_x2, body_y2)
 
-    def rotation_matrix(self, angle):
-        '''
-        @name: rotation_matrix
-        @brief: Transformation matrix template.
-        @param: angle: angle of rotation
-        @return: J: transformation matrix
-        '''
-        J = np.array([[math.cos(angle), -1*math.sin(angle)],
-                      [math.sin(angle), math.cos(angle)]])
-        return (J)
+    def publish_state(self, state):
+        self.state = state
+        self.test.publish(state)
 
     def desired(self, path):
     	self.path_pub.publish(path)
@@ -158,15 +171,14 @@ def main():
     rospy.init_node("acoustic_docking", anonymous=False)
     rate = rospy.Rate(20)
     acousticDocking = AcousticDocking()
-    last_detection = []
-    while not rospy.is_shutdown() and acousticDocking.activated:
-        acousticDocking.calculate_distance_to_dock()
-        if (acousticDocking.distance >= 5):
-            acousticDocking.dock()
-        else:
-            acousticDocking.status_pub.publish(1)
-
-        rate.sleep()
+    states = [
+        state_machine.State(0, update=acousticDocking.approach,
+                            transitions=[(lambda: acousticDocking.distance < 5, 1)]),
+        state_machine.State(1, update=acousticDocking.hold,
+                            transitions=[(lambda: acousticDocking.distance >= 5, 0)])]
+    machine = state_machine.StateMachine(states, 0, rospy.get_time,
+                                         acousticDocking.publish_state)
+    machine.run(rate.sleep, rospy.is_shutdown, lambda: acousticDocking.activated)
     rospy.spin()
 
 if __name__ == "__main__":
@@ -21,14 +21,13 @@
 '''
 
 import math
-import time
 
 import matplotlib.pyplot as plt
-import numpy as np
 import rospy
 from std_msgs.msg import Float32MultiArray, Int32, String
 from geometry_msgs.msg import Pose2D
 
+from usv_control import frames, replanning, spatial_index, state_machine, world_model
 from usv_perception.msg import obj_detected, obj_detected_list
 
 # Class Definition
@@ -43,6 +42,12 @@ class AutoNav:
         self.distance = 0
         self.InitTime = rospy.Time.now().secs
         self.offset = .55 #camera to ins offset
+        self.max_visible_radius = 10
+        self.min_ahead = 1 #buoys closer in x are being passed
+        self.buoy_map = world_model.BuoyMap()
+        self.detection = state_machine.Event()
+        self.objects_index = spatial_index.SpatialIndex([], [])
+        self.plan = replanning.PlanTracker(tolerance=0.5, clock=rospy.get_time)
         self.target_x = 0
         self.target_y = 0
         self.ned_alpha = 0
@@ -62,39 +67,44 @@ class AutoNav:
         self.yaw = pose.theta
 
     def objs_callback(self,data):
-        self.objects_list = []
+        body = []
+        colors = []
+        classes = []
         for i in range(data.len):
             if str(data.objects[i].clase) == 'bouy':
-                self.objects_list.append({'X' : data.objects[i].X + self.offset, 
-                                      'Y' : data.objects[i].Y, 
-                                      'color' : data.objects[i].color, 
-                                      'class' : data.objects[i].clase})
-
-    def center_point(self):
+                body.append((data.objects[i].X + self.offset,
+                             -data.objects[i].Y)) #Negate sensor input in Y
+                colors.append(data.objects[i].color)
+                classes.append(data.objects[i].clase)
+        self.buoy_map.observe_body(body, colors, classes, self.ned_x, self.ned_y,
+                                   self.yaw, rospy.get_time())
+        self.buoy_map.prune()
+        # Buoys ahead from the map, also those out of the camera view
+        ids, body = self.buoy_map.ahead(self.ned_x, self.ned_y, self.yaw,
+                                        self.max_visible_radius, self.min_ahead)
+        self.objects_list = [{'X' : body[j, 0],
+                              'Y' : -body[j, 1],
+                              'color' : self.buoy_map.color[i],
+                              'class' : self.buoy_map.clase[i]}
+                             for j, i in enumerate(ids.tolist())]
+        self.objects_index = spatial_index.SpatialIndex(body[:, 0], -body[:, 1],
+                                                        self.buoy_map.color[ids])
+        self.detection.set()
+
+    def center_point(self, objects_index):
         '''
         @name: center_point
         @brief: Returns two waypoints as desired positions. The first waypoint is
           between the pair of obstacles (gate) and the second a distance to the front 
-        @param: --
+        @param: objects_index: SpatialIndex of the buoys ahead
         @return: --
         '''
-        x_list = []
-        y_list = []
-        class_list = []
-        distance_list = []
-        for i in range(len(self.objects_list)):
-            x_list.append(self.objects_list[i]['X'])
-            y_list.append(self.objects_list[i]['Y'])
-            class_list.append(self.objects_list[i]['class'])
-            distance_list.append(math.pow(x_list[i]**2 + y_list[i]**2, 0.5))
-
-        ind_g1 = np.argsort(distance_list)[0]
-        ind_g2 = np.argsort(distance_list)[1]
-
-        x1 = x_list[ind_g1]
-        y1 = -1*y_list[ind_g1]
-        x2 = x_list[ind_g2]
-        y2 = -1*y_list[ind_g2]
+        ind_g1, ind_g2 = objects_index.nearest(2)
+
+        x1 = objects_index.x[ind_g1]
+        y1 = -1*objects_index.y[ind_g1]
+        x2 = objects_index.x[ind_g2]
+        y2 = -1*objects_index.y[ind_g2]
         xc = min([x1,x2]) + abs(x1 - x2)/2
         yc = min([y1,y2]) + abs(y1 - y2)/2
 
@@ -123,42 +133,46 @@ class AutoNav:
         xm, ym = self.gate_to_body(3,0,alpha,xc,yc)
 
         self.target_x, self.target_y = self.body_to_ned(xm, ym)
-        
-        path_array = Float32MultiArray()
-        path_array.layout.data_offset = 5
-        path_array.data = [xc, yc, xm, ym, 2]
+        gate_x, gate_y = self.body_to_ned(xc, yc)
 
-        self.desired(path_array)
+        self.publish_plan([gate_x, gate_y, self.target_x, self.target_y])
 
-    def calculate_distance_to_boat(self):
+    def calculate_distance_to_boat(self, objects_index):
         '''
         @name: calculate_distance_to_boat
         @brief: Returns the distance from the USV to the next gate
-        @param: --
+        @param: objects_index: SpatialIndex of the buoys ahead
         @return: --
         '''
-        x_list = []
-        y_list = []
-        class_list = []
-        distance_list = []
-        for i in range(len(self.objects_list)):
-            x_list.append(self.objects_list[i]['X'])
-            y_list.append(self.objects_list[i]['Y'])
-            class_list.append(self.objects_list[i]['class'])
-            distance_list.append(math.pow(x_list[i]**2 + y_list[i]**2, 0.5))
-
-        ind_g1 = np.argsort(distance_list)[0]
-        ind_g2 = np.argsort(distance_list)[1]
-
-        x1 = x_list[ind_g1]
-        y1 = -1*y_list[ind_g1]
-        x2 = x_list[ind_g2]
-        y2 = -1*y_list[ind_g2]
+        ind_g1, ind_g2 = objects_index.nearest(2)
+
+        x1 = objects_index.x[ind_g1]
+        y1 = -1*objects_index.y[ind_g1]
+        x2 = objects_index.x[ind_g2]
+        y2 = -1*objects_index.y[ind_g2]
         xc = min([x1,x2]) + abs(x1 - x2)/2
         yc = min([y1,y2]) + abs(y1 - y2)/2
 
         self.distance = math.pow(xc*xc + yc*yc, 0.5)
 
+    def gate(self):
+        '''
+        @name: gate
+        @brief: Sends the USV through the nearest gate while it is at least
+          2 m away.
+        @param: --
+        @return: --
+        '''
+        # One snapshot per step, the callback replaces the index meanwhile
+        objects_index = self.objects_index
+        if len(objects_index) >= 2:
+            self.calculate_distance_to_boat(objects_index)
+            if self.distance >= 2:
+                self.center_point(objects_index)
+
+    def gate_ready(self):
+        return len(self.objects_index) >= 2 and self.distance >= 2
+
     def farther(self):
         '''
         @name: farther
@@ -171,10 +185,7 @@ class AutoNav:
                                                         self.ned_alpha,
                                                         self.target_x,
                                                         self.target_y)
-        path_array = Float32MultiArray()
-        path_array.layout.data_offset = 3
-        path_array.data = [self.target_x, self.target_y, 0]
-        self.desired(path_array)
+        self.publish_plan([self.target_x, self.target_y])
 
     def gate_to_body(self, gate_x2, gate_y2, alpha, body_x1, body_y1):
         '''
@@ -188,11 +199,7 @@ class AutoNav:
         @return: body_x2: target x coordinate in body reference frame
                  body_y2: target y coordinate in body reference frame
         '''
-        p = np.array([[gate_x2],[gate_y2]])
-        J = self.rotation_matrix(alpha)
-        n = J.dot(p)
-        body_x2 = n[0] + body_x1
-        body_y2 = n[1] + body_y1
+        body_x2, body_y2 = frames.to_parent((gate_x2, gate_y2), alpha, body_x1, body_y1)
         return (body_x2, body_y2)
 
     def body_to_ned(self, x2, y2):
@@ -204,11 +211,7 @@ class AutoNav:
         @return: ned_x2: target x coordinate in ned reference frame
                  ned_y2: target y coordinate in ned reference frame
         '''
-        p = np.array([x2, y2])
-        J = self.rotation_matrix(self.yaw)
-        n = J.dot(p)
-        ned_x2 = n[0] + self.ned_x
-        ned_y2 = n[1] + self.ned_y
+        ned_x2, ned_y2 = frames.body_to_ned((x2, y2), self.ned_x, self.ned_y, self.yaw)
         return (ned_x2, ned_y2)
 
     def gate_to_ned(self, gate_x2, gate_y2, alpha, ned_x1, ned_y1):
@@ -223,23 +226,27 @@ class AutoNav:
         @return: body_x2: target x coordinate in ned reference frame
                  body_y2: target y coordinate in ned reference frame
         '''
-        p = np.array([[gate_x2],[gate_y2]])
-        J = self.rotation_matrix(alpha)
-        n = J.dot(p)
-        ned_x2 = n[0] + ned_x1
-        ned_y2 = n[1] + ned_y1
+        ned_x2, ned_y2 = frames.gate_to_ned((gate_x2, gate_y2), alpha, ned_x1, ned_y1)
         return (ned_x2, ned_y2)
 
-    def rotation_matrix(self, angle):
+    def publish_state(self, state):
+        self.state = state
+        self.test.publish(state)
+
+    def publish_plan(self, waypoints):
         '''
-        @name: rotation_matrix
-        @brief: Transformation matrix template.
-        @param: angle: angle of rotation
-        @return: J: transformation matrix
+        @name: publish_plan
+        @brief: Sends a NED plan to LOS, only when a waypoint moved beyond
+          the replanning tolerance, as a tail update when possible.
+        @param: waypoints: flat NED waypoint list [x1, y1, x2, y2, ...]
+        @return: --
         '''
-        J = np.array([[math.cos(angle), -1*math.sin(angle)],
-                      [math.sin(angle), math.cos(angle)]])
-        return (J)
+        data = self.plan.update(waypoints)
+        if data is not None:
+            path_array = Float32MultiArray()
+            path_array.layout.data_offset = len(data)
+            path_array.data = data
+            self.desired(path_array)
 
     def desired(self, path):
     	self.path_pub.publish(path)
@@ -249,69 +256,19 @@ def main():
     rate = rospy.Rate(20)
     autoNav = AutoNav()
     autoNav.distance = 4
-    last_detection = []
-    while not rospy.is_shutdown() and autoNav.activated:
-        if autoNav.objects_list != last_detection:
-            if autoNav.state == -1:
-                while (not rospy.is_shutdown()) and (len(autoNav.objects_list) < 2):
-                    autoNav.test.publish(autoNav.state)
-                    rate.sleep()
-                autoNav.state = 0
-                last_detection = autoNav.objects_list
-
-            if autoNav.state == 0:
-                autoNav.test.publish(autoNav.state)
-                if len(autoNav.objects_list) >= 2:
-                    autoNav.calculate_distance_to_boat()
-                if (len(autoNav.objects_list) >= 2) and (autoNav.distance >= 2):
-                    autoNav.center_point()
-                else:
-                    initTime = rospy.Time.now().secs
-                    while ((not rospy.is_shutdown()) and 
-                        (len(autoNav.objects_list) < 2 or autoNav.distance < 2)):
-                        if rospy.Time.now().secs - initTime > 2:
-                            autoNav.state = 1
-                            rate.sleep()
-                            break
-                last_detection = autoNav.objects_list
-
-        if autoNav.state == 1:
-            autoNav.test.publish(autoNav.state)
-            if len(autoNav.objects_list) >= 2:
-                autoNav.state = 2
-            else:
-                initTime = rospy.Time.now().secs
-                while ((not rospy.is_shutdown()) and 
-                    (len(autoNav.objects_list) < 2)):
-                    if rospy.Time.now().secs - initTime > 1:
-                        autoNav.farther()
-                        rate.sleep()
-                        break
-            last_detection = autoNav.objects_list
-
-        if autoNav.objects_list != last_detection:
-            if autoNav.state == 2:
-                autoNav.test.publish(autoNav.state)
-                if len(autoNav.objects_list) >= 2:
-                    autoNav.calculate_distance_to_boat()
-                if len(autoNav.objects_list) >= 2 and autoNav.distance >= 2:
-                    autoNav.center_point()
-                else:
-                    initTime = rospy.Time.now().secs
-                    while ((not rospy.is_shutdown()) and 
-                        (len(autoNav.objects_list) < 2 or autoNav.distance < 2)):
-                        if rospy.Time.now().secs - initTime > 2:
-                            autoNav.state = 3
-                            rate.sleep()
-                            break
-                last_detection = autoNav.objects_list
-
-        elif autoNav.state == 3:
-            autoNav.test.publish(autoNav.state)
-            time.sleep(1)
-            autoNav.status_pub.publish(1)
-
-        rate.sleep()
+    buoys = lambda: len(autoNav.objects_index)
+    states = [
+        state_machine.State(-1, transitions=[(lambda: buoys() >= 2, 0)]),
+        # Through the first gate, then wait 2 s once it is lost or too close
+        state_machine.State(0, update=autoNav.gate, event=autoNav.detection,
+                            transitions=[(lambda: not autoNav.gate_ready(), 1, 2)]),
+        state_machine.State(1, transitions=[(lambda: buoys() >= 2, 2)],
+                            timers=[(lambda: buoys() < 2, 1, autoNav.farther)]),
+        state_machine.State(2, update=autoNav.gate, event=autoNav.detection,
+                            transitions=[(lambda: not autoNav.gate_ready(), 3, 2)]),
+        state_machine.State(3, timers=[(None, 1, lambda: autoNav.status_pub.publish(1))])]
+    machine = state_machine.StateMachine(states, -1, rospy.get_time, autoNav.publish_state)
+    machine.run(rate.sleep, rospy.is_shutdown, lambda: autoNav.activated)
     rospy.spin()
 
 if __name__ == "__main__":
@@ -17,12 +17,13 @@ import math
 import time
 import os
 
-import numpy as np
 import rospy
 from geometry_msgs.msg import Pose2D, PoseArray, Pose
 from std_msgs.msg import Float64
 from visualization_msgs.msg import Marker, MarkerArray
 
+from usv_control import frames
+
 
 class ObstacleSimulator:
     def __init__(self):
@@ -65,22 +66,19 @@ class ObstacleSimulator:
             delta_x = x - self.ned_x
             delta_y = y - self.ned_y
             distance = math.pow(delta_x*delta_x + delta_y*delta_y, 0.5)
-            x1 = x 
-            y1 = y - 2*self.radius
-            x2 = x 
-            y2 = y + 2*self.radius
-            x1b, y1b = self.ned_to_body(x1, y1)
-            x2b, y2b = self.ned_to_body(x2, y2)
-            pose1.position.x = x1b
-            pose1.position.y = y1b
+            #Both dock ends and the pinger in a single transformation
+            body = frames.ned_to_body([[x, y - 2*self.radius],
+                                       [x, y + 2*self.radius],
+                                       [x, y]], self.ned_x, self.ned_y, self.yaw)
+            pose1.position.x = body[0, 0]
+            pose1.position.y = body[0, 1]
             pose_array.poses.append(pose1)
-            pose2.position.x = x2b
-            pose2.position.y = y2b
+            pose2.position.x = body[1, 0]
+            pose2.position.y = body[1, 1]
             pose_array.poses.append(pose2)
             self.detector_pub.publish(pose_array)
             if (distance < self.max_acoustic_radius):
-                xb, yb = self.ned_to_body(x, y)
-                signal = np.math.atan2(yb,xb)
+                signal = math.atan2(body[2, 1], body[2, 0])
                 self.signal_pub.publish(signal)
 
     def body_to_ned(self, x2, y2):
@@ -92,11 +90,7 @@ class ObstacleSimulator:
         @return: ned_x2: target x coordinate in ned reference frame
                  ned_y2: target y coordinate in ned reference frame
         '''
-        p = np.array([x2, y2])
-        J = self.rotation_matrix(self.yaw)
-        n = J.dot(p)
-        ned_x2 = n[0] + self.ned_x
-        ned_y2 = n[1] + self.ned_y
+        ned_x2, ned_y2 = frames.body_to_ned((x2, y2), self.ned_x, self.ned_y, self.yaw)
         return (ned_x2, ned_y2)
 
     def ned_to_body(self, ned_x2, ned_y2):
@@ -108,25 +102,9 @@ class ObstacleSimulator:
         @return: body_x2: target x coordinate in body reference frame
                 body_y2: target y coordinate in body reference frame
         '''
-        n = np.array([ned_x2 - self.ned_x, ned_y2 - self.ned_y])
-        J = self.rotation_matrix(self.yaw)
-        J = np.linalg.inv(J)
-        b = J.dot(n)
-        body_x2 = b[0]
-        body_y2 = b[1]
+        body_x2, body_y2 = frames.ned_to_body((ned_x2, ned_y2), self.ned_x, self.ned_y, self.yaw)
         return (body_x2, body_y2)
 
-    def rotation_matrix(self, angle):
-        '''
-        @name: rotation_matrix
-        @brief: Transformation matrix template.
-        @param: angle: angle of rotation
-        @return: J: transformation matrix
-        '''
-        J = np.array([[math.cos(angle), -1*math.sin(angle)],
-                      [math.sin(angle), math.cos(angle)]])
-        return (J)
-
     def rviz_markers(self):
         '''
         @name: rviz_markers
@@ -14,8 +14,8 @@
 ---------------------------------------------------------
 '''
 
+import bisect
 import math
-import time
 
 import matplotlib.pyplot as plt
 import numpy as np
@@ -23,6 +23,7 @@ import rospy
 from std_msgs.msg import Float32MultiArray, Int32, String
 from geometry_msgs.msg import Pose2D
 
+from usv_control import frames, replanning, spatial_index, state_machine, world_model
 from usv_perception.msg import obj_detected, obj_detected_list
 
 # Class Definition
@@ -35,8 +36,15 @@ class ObsChan:
         self.activated = True
         self.state = -1
         self.distance = 0
-        self.distance_to_last = 0
+        self.distance_to_last = float('inf')
+        self.channel_started = False
         self.offset = .55 #camera to ins offset
+        self.max_visible_radius = 10
+        self.min_ahead = 1 #buoys closer in x are being passed
+        self.buoy_map = world_model.BuoyMap()
+        self.detection = state_machine.Event()
+        self.objects_index = spatial_index.SpatialIndex([], [])
+        self.plan = replanning.PlanTracker(tolerance=0.5, clock=rospy.get_time)
         self.ned_channel_origin_x = 0
         self.ned_channel_origin_y = 0
         self.ned_alpha = 0
@@ -62,52 +70,62 @@ class ObsChan:
         self.yaw = pose.theta
 
     def objs_callback(self,data):
-        self.objects_list = []
+        body = []
+        colors = []
+        classes = []
         for i in range(data.len):
             if str(data.objects[i].clase) == 'bouy':
-                self.objects_list.append({'X' : data.objects[i].X + self.offset, 
-                                      'Y' : -data.objects[i].Y, #Negate sensor input in Y
-                                      'color' : data.objects[i].color, 
-                                      'class' : data.objects[i].clase})
-
-    def generate_obstacle_list(self):
+                body.append((data.objects[i].X + self.offset,
+                             -data.objects[i].Y)) #Negate sensor input in Y
+                colors.append(data.objects[i].color)
+                classes.append(data.objects[i].clase)
+        self.buoy_map.observe_body(body, colors, classes, self.ned_x, self.ned_y,
+                                   self.yaw, rospy.get_time())
+        self.buoy_map.prune()
+        # Buoys ahead from the map, also those out of the camera view
+        ids, body = self.buoy_map.ahead(self.ned_x, self.ned_y, self.yaw,
+                                        self.max_visible_radius, self.min_ahead)
+        self.objects_list = [{'X' : body[j, 0],
+                              'Y' : body[j, 1],
+                              'color' : self.buoy_map.color[i],
+                              'class' : self.buoy_map.clase[i]}
+                             for j, i in enumerate(ids.tolist())]
+        self.objects_index = spatial_index.SpatialIndex(body[:, 0], body[:, 1],
+                                                        self.buoy_map.color[ids])
+        self.detection.set()
+
+    def generate_obstacle_list(self, objects_index):
         '''
         @name: generate_obstacle_list
         @brief: Returns four lists (x, y, class, distance), representing each obstacle 
-        @param: --
+        @param: objects_index: SpatialIndex of the buoys ahead
         @return: x_list (list), y_list (list), class_list (list), distance_list (list)
         '''
-        x_list = []
-        y_list = []
-        class_list = []
-        distance_list = []
-        for i in range(len(self.objects_list)):
-            x_list.append(self.objects_list[i]['X'])
-            y_list.append(self.objects_list[i]['Y'])
-            class_list.append(self.objects_list[i]['class'])
-            distance_list.append(math.pow(x_list[i]**2 + y_list[i]**2, 0.5))
+        x_list = objects_index.x.tolist()
+        y_list = objects_index.y.tolist()
+        class_list = ['bouy']*len(x_list) #objs_callback keeps buoys only
+        distance_list = objects_index.distance.tolist()
         return (x_list, y_list, class_list, distance_list)
 
-    def find_closer_buoys(self, distance_list):
+    def find_closer_buoys(self, objects_index):
         '''
         @name: find_closer_buoys
         @brief: Returns the index of the two closest buoys 
-        @param: --
+        @param: objects_index: SpatialIndex of the buoys ahead
         @return: ind_b1 (int), ind_b2 (int)
         '''
-        ind_b1 = np.argsort(distance_list)[0]
-        ind_b2 = np.argsort(distance_list)[1]
+        ind_b1, ind_b2 = objects_index.nearest(2).tolist()
         return (ind_b1, ind_b2)
 
-    def new_reference_frame(self):
+    def new_reference_frame(self, objects_index):
         '''
         @name: generate_obstacle_list
         @brief: Returns four lists (x, y, class, distance), representing each obstacle 
-        @param: --
+        @param: objects_index: SpatialIndex of the buoys ahead
         @return: x_list (list), y_list (list), class_list (list), distance_list (list)
         '''
-        x_list, y_list, class_list, distance_list = self.generate_obstacle_list()
-        ind_b1, ind_b2 = self.find_closer_buoys(distance_list)
+        x_list, y_list, class_list, distance_list = self.generate_obstacle_list(objects_index)
+        ind_b1, ind_b2 = self.find_closer_buoys(objects_index)
         x1 = x_list[ind_b1]
         y1 = y_list[ind_b1]
         x2 = x_list[ind_b2]
@@ -140,71 +158,98 @@ class ObsChan:
         self.ned_channel_origin_x, self.ned_channel_origin_y = self.body_to_ned(x_center, y_center)
 
     def rotate_obstacles_to_gate(self, x_list, y_list):
-        x_gate_list = []
-        y_gate_list = []
-        for i in range(len(self.objects_list)):
-            x_body = x_list[i]
-            y_body = y_list[i]
-            x_ned, y_ned = self.body_to_ned(x_body, y_body)
-            x_gate, y_gate = self.ned_to_gate(x_ned, y_ned)
-            x_gate_list.append(x_gate)
-            y_gate_list.append(y_gate)
-        return (x_gate_list, y_gate_list)
-
-    def compute_path(self):
+        '''
+        @name: rotate_obstacles_to_gate
+        @brief: Transforms every obstacle from body to gate reference frame
+        @param: x_list: obstacles x coordinate in body reference frame
+                y_list: obstacles y coordinate in body reference frame
+        @return: x_gate_list (list), y_gate_list (list)
+        '''
+        body = np.column_stack((x_list, y_list))
+        ned = frames.body_to_ned(body, self.ned_x, self.ned_y, self.yaw)
+        gate = frames.ned_to_gate(ned, self.ned_alpha, self.ned_channel_origin_x,
+                                  self.ned_channel_origin_y)
+        return (gate[:, 0].tolist(), gate[:, 1].tolist())
+
+    def pair_gates(self, x_gate_list, y_gate_list, window=0.5):
+        '''
+        @name: pair_gates
+        @brief: Pairs buoys into gates. Buoys are sorted once along the
+          channel; each buoy not yet paired, in list order, takes the
+          unpaired buoys within +-window in x, and every buoy it takes adds
+          the center between the leftmost and rightmost buoys of the group
+          as a waypoint.
+        @param: x_gate_list: obstacles x coordinate in gate reference frame
+                y_gate_list: obstacles y coordinate in gate reference frame
+                window: max x distance between buoys of a gate
+        @return: waypoint_array_x (list), waypoint_array_y (list)
+        '''
+        n = len(x_gate_list)
+        order = sorted(range(n), key=x_gate_list.__getitem__)
+        sorted_x = [x_gate_list[k] for k in order]
+        position = [0]*n
+        for p, k in enumerate(order):
+            position[k] = p
+        # Next unpaired sorted position, skipping paired ones with path
+        # compression so every buoy is stepped over about once
+        following = list(range(n + 1))
+
+        def next_free(p):
+            root = p
+            while following[root] != root:
+                root = following[root]
+            while following[p] != root:
+                following[p], p = root, following[p]
+            return root
+
+        waypoint_array_x = []
+        waypoint_array_y = []
+        for i in range(n):
+            p = position[i]
+            if following[p] != p:
+                continue
+            following[p] = p + 1
+            current_x = x_gate_list[i]
+            start = bisect.bisect_right(sorted_x, current_x - window)
+            end = bisect.bisect_left(sorted_x, current_x + window)
+            same = []
+            q = next_free(start)
+            while q < end:
+                same.append(order[q])
+                following[q] = q + 1
+                q = next_free(q + 1)
+            # Leftmost and rightmost so far, first and last of ties as argsort
+            left = i
+            right = i
+            for j in sorted(same):
+                if y_gate_list[j] < y_gate_list[left]:
+                    left = j
+                if y_gate_list[j] >= y_gate_list[right]:
+                    right = j
+                x_left = x_gate_list[left]
+                y_left = y_gate_list[left]
+                x_right = x_gate_list[right]
+                y_right = y_gate_list[right]
+                x_center = min([x_left,x_right]) + abs(x_left - x_right)/2
+                y_center = y_left + (y_right - y_left)/2
+                waypoint_array_x.append(x_center)
+                waypoint_array_y.append(y_center)
+        return (waypoint_array_x, waypoint_array_y)
+
+    def compute_path(self, objects_index):
         '''
         @name: compute_path
         @brief: Returns a path to follow to navigate in an obstacle channel 
-        @param: --
+        @param: objects_index: SpatialIndex of the buoys ahead
         @return: --
         '''
-        x_list, y_list, class_list, distance_list = self.generate_obstacle_list()
+        x_list, y_list, class_list, distance_list = self.generate_obstacle_list(objects_index)
         x_gate_list, y_gate_list = self.rotate_obstacles_to_gate(x_list, y_list)
-        self.counted_pairs = []
-        counted = False
-        counted_2 = False
-        same_x = []
-        same_y = []
-        self.waypoint_array_x = []
-        self.waypoint_array_y = []
+        self.waypoint_array_x, self.waypoint_array_y = self.pair_gates(x_gate_list, y_gate_list)
         self.path = []
-        for i in range(len(self.objects_list)):
-            for k in range(len(self.counted_pairs)):
-                if i == self.counted_pairs[k]:
-                    counted = True
-            if counted != True:
-                self.counted_pairs.append(i)
-                current_x = x_gate_list[i]
-                same_x = []
-                same_y = []
-                same_x.append(current_x)
-                same_y.append(y_gate_list[i])
-                for j in range(len(self.objects_list)):
-                    if j != i:
-                        for n in range(len(self.counted_pairs)):
-                            if j == self.counted_pairs[n]:
-                                counted_2 = True
-                        if counted_2 != True:
-                            comparison_x = x_gate_list[j]
-                            if (comparison_x > (current_x - 0.5)) and (comparison_x < current_x + 0.5):
-                                same_x.append(comparison_x)
-                                same_y.append(y_gate_list[j])
-                                self.counted_pairs.append(j)
-                                if len(same_y) > 1:
-                                    last = len(same_y) - 1
-                                    left_index = np.argsort(same_y)[0]
-                                    right_index = np.argsort(same_y)[last]
-                                    x_left = same_x[left_index]
-                                    y_left = same_y[left_index]
-                                    x_right = same_x[right_index]
-                                    y_right = same_y[right_index]
-                                    x_center = min([x_left,x_right]) + abs(x_left - x_right)/2
-                                    y_center = y_left + (y_right - y_left)/2
-                                    self.waypoint_array_x.append(x_center)
-                                    self.waypoint_array_y.append(y_center)
-                        counted_2 = False
-            counted = False
-        sorted_waypoint_array_x = np.argsort(self.waypoint_array_x)
+        if not self.waypoint_array_x:
+            return
+        sorted_waypoint_array_x = np.argsort(self.waypoint_array_x, kind='mergesort')
         for m in range(len(sorted_waypoint_array_x)):
             index = sorted_waypoint_array_x[m]
             ned_wp_x, ned_wp_y = self.gate_to_ned(self.waypoint_array_x[index], self.waypoint_array_y[index])
@@ -219,12 +264,39 @@ class ObsChan:
         self.last_x, self.last_y = self.gate_to_ned(self.waypoint_array_x[last] + 3, self.waypoint_array_y[last])
         self.path.append(self.last_x)
         self.path.append(self.last_y)
-        self.path.append(0)
-        path_array = Float32MultiArray()
-        path_array.layout.data_offset = len(self.path)
-        path_array.data = self.path
+        self.publish_plan(self.path)
 
-        self.desired(path_array)
+    def start_channel(self):
+        '''
+        @name: start_channel
+        @brief: Sets the channel reference frame on the first gate and plans
+          the path, once two buoys are ahead.
+        @param: --
+        @return: --
+        '''
+        # One snapshot per step, the callback replaces the index meanwhile
+        objects_index = self.objects_index
+        if len(objects_index) >= 2:
+            self.new_reference_frame(objects_index)
+            self.compute_path(objects_index)
+            self.channel_started = True
+
+    def follow_channel(self):
+        '''
+        @name: follow_channel
+        @brief: Replans once the USV is within 2 m of the next waypoint, or
+          checks whether the last waypoint was reached when no buoys are
+          ahead.
+        @param: --
+        @return: --
+        '''
+        objects_index = self.objects_index
+        self.compute_distance()
+        if self.distance < 2:
+            if len(objects_index) >= 2:
+                self.compute_path(objects_index)
+            else:
+                self.compute_distance_to_last()
 
     def compute_distance(self):
         '''
@@ -260,11 +332,7 @@ class ObsChan:
         @return: body_x2: target x coordinate in body reference frame
                  body_y2: target y coordinate in body reference frame
         '''
-        p = np.array([[gate_x2],[gate_y2]])
-        J = self.rotation_matrix(alpha)
-        n = J.dot(p)
-        body_x2 = n[0] + body_x1
-        body_y2 = n[1] + body_y1
+        body_x2, body_y2 = frames.to_parent((gate_x2, gate_y2), alpha, body_x1, body_y1)
         return (body_x2, body_y2)
 
     def body_to_ned(self, x2, y2):
@@ -276,11 +344,7 @@ class ObsChan:
         @return: ned_x2: target x coordinate in NED reference frame
                  ned_y2: target y coordinate in NED reference frame
         '''
-        p = np.array([x2, y2])
-        J = self.rotation_matrix(self.yaw)
-        n = J.dot(p)
-        ned_x2 = n[0] + self.ned_x
-        ned_y2 = n[1] + self.ned_y
+        ned_x2, ned_y2 = frames.body_to_ned((x2, y2), self.ned_x, self.ned_y, self.yaw)
         return (ned_x2, ned_y2)
 
     def gate_to_ned(self, gate_x2, gate_y2):
@@ -292,11 +356,9 @@ class ObsChan:
         @return: ned_x2: target x coordinate in NED reference frame
                  ned_y2: target y coordinate in NED reference frame
         '''
-        p = np.array([[gate_x2],[gate_y2]])
-        J = self.rotation_matrix(self.ned_alpha)
-        n = J.dot(p)
-        ned_x2 = n[0] + self.ned_channel_origin_x
-        ned_y2 = n[1] + self.ned_channel_origin_y
+        ned_x2, ned_y2 = frames.gate_to_ned((gate_x2, gate_y2), self.ned_alpha,
+                                            self.ned_channel_origin_x,
+                                            self.ned_channel_origin_y)
         return (ned_x2, ned_y2)
 
     def ned_to_gate(self, ned_x2, ned_y2):
@@ -308,24 +370,29 @@ class ObsChan:
         @return: gate_x2: target x coordinate in gate reference frame
                  gate_y2: target y coordinate in gate reference frame
         '''
-        p = np.array([ned_x2-self.ned_channel_origin_x, ned_y2-self.ned_channel_origin_y])
-        J = self.rotation_matrix(self.ned_alpha)
-        Jinv = np.linalg.inv(J)
-        n = Jinv.dot(p)
-        gate_x2 = n[0]
-        gate_y2 = n[1]
+        gate_x2, gate_y2 = frames.ned_to_gate((ned_x2, ned_y2), self.ned_alpha,
+                                              self.ned_channel_origin_x,
+                                              self.ned_channel_origin_y)
         return (gate_x2, gate_y2)
 
-    def rotation_matrix(self, angle):
+    def publish_state(self, state):
+        self.state = state
+        self.test.publish(state)
+
+    def publish_plan(self, waypoints):
         '''
-        @name: rotation_matrix
-        @brief: Transformation matrix template.
-        @param: angle: angle of rotation
-        @return: J: transformation matrix
+        @name: publish_plan
+        @brief: Sends a NED plan to LOS, only when a waypoint moved beyond
+          the replanning tolerance, as a tail update when possible.
+        @param: waypoints: flat NED waypoint list [x1, y1, x2, y2, ...]
+        @return: --
         '''
-        J = np.array([[math.cos(angle), -1*math.sin(angle)],
-                      [math.sin(angle), math.cos(angle)]])
-        return (J)
+        data = self.plan.update(waypoints)
+        if data is not None:
+            path_array = Float32MultiArray()
+            path_array.layout.data_offset = len(data)
+            path_array.data = data
+            self.desired(path_array)
 
     def desired(self, path):
     	self.path_pub.publish(path)
@@ -334,36 +401,14 @@ def main():
     rospy.init_node("auto_nav_position", anonymous=False)
     rate = rospy.Rate(20)
     obsChan = ObsChan()
-    last_detection = []
-    while not rospy.is_shutdown() and obsChan.activated:
-        if obsChan.objects_list != last_detection:
-            if obsChan.state == -1:
-                while (not rospy.is_shutdown()) and (len(obsChan.objects_list) < 2):
-                    obsChan.test.publish(obsChan.state)
-                    rate.sleep()
-                obsChan.state = 0
-                obsChan.new_reference_frame()
-                obsChan.compute_path()
-                last_detection = obsChan.objects_list
-
-            if obsChan.state == 0:
-                obsChan.test.publish(obsChan.state)
-                obsChan.compute_distance()
-                if obsChan.distance < 2:
-                    if len(obsChan.objects_list) >= 2:
-                        obsChan.compute_path()
-                    else:
-                        obsChan.compute_distance_to_last()
-                        if obsChan.distance_to_last < 2:
-                            obsChan.state = 1
-                last_detection = obsChan.objects_list
-
-        elif obsChan.state == 1:
-            obsChan.test.publish(obsChan.state)
-            time.sleep(1)
-            obsChan.status_pub.publish(1)
-
-        rate.sleep()
+    states = [
+        state_machine.State(-1, update=obsChan.start_channel, event=obsChan.detection,
+                            transitions=[(lambda: obsChan.channel_started, 0)]),
+        state_machine.State(0, update=obsChan.follow_channel, event=obsChan.detection,
+                            transitions=[(lambda: obsChan.distance_to_last < 2, 1)]),
+        state_machine.State(1, timers=[(None, 1, lambda: obsChan.status_pub.publish(1))])]
+    machine = state_machine.StateMachine(states, -1, rospy.get_time, obsChan.publish_state)
+    machine.run(rate.sleep, rospy.is_shutdown, lambda: obsChan.activated)
     rospy.spin()
 
 if __name__ == "__main__":
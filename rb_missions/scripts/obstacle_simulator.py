@@ -14,13 +14,13 @@
 ----------------------------------------------------------
 '''
 
-import math
 import time
 import os
 
 import numpy as np
 import rospy
 from geometry_msgs.msg import Pose2D
+from usv_control import frames
 from usv_perception.msg import obj_detected
 from usv_perception.msg import obj_detected_list
 from visualization_msgs.msg import Marker
@@ -61,22 +61,18 @@ class ObstacleSimulator:
         '''
         object_detected_list = obj_detected_list()
         list_length = 0
-        for i in range(len(self.obstacle_list)):
-            x = self.obstacle_list[i]['X']
-            y = self.obstacle_list[i]['Y']
-            delta_x = x - self.ned_x
-            delta_y = y - self.ned_y
-            distance = math.pow(delta_x*delta_x + delta_y*delta_y, 0.5)
-            if (distance < self.max_visible_radius):
-                x, y = self.ned_to_body(x, y)
-                if x > 1:
-                    obstacle = obj_detected()
-                    obstacle.X = x - self.sensor_to_usv_offset
-                    obstacle.Y = -y
-                    obstacle.color = self.obstacle_list[i]['color']
-                    obstacle.clase = self.obstacle_list[i]['class']
-                    list_length += 1
-                    object_detected_list.objects.append(obstacle)
+        ned = np.array([[obstacle['X'], obstacle['Y']] for obstacle in self.obstacle_list]).reshape(-1, 2)
+        distance = np.hypot(ned[:, 0] - self.ned_x, ned[:, 1] - self.ned_y)
+        body = frames.ned_to_body(ned, self.ned_x, self.ned_y, self.yaw)
+        visible = np.nonzero((distance < self.max_visible_radius) & (body[:, 0] > 1))[0]
+        for i in visible:
+            obstacle = obj_detected()
+            obstacle.X = body[i, 0] - self.sensor_to_usv_offset
+            obstacle.Y = -body[i, 1]
+            obstacle.color = self.obstacle_list[i]['color']
+            obstacle.clase = self.obstacle_list[i]['class']
+            list_length += 1
+            object_detected_list.objects.append(obstacle)
         object_detected_list.len = list_length
         self.detector_pub.publish(object_detected_list)
 
@@ -90,11 +86,7 @@ class ObstacleSimulator:
         @return: ned_x2: target x coordinate in ned reference frame
                  ned_y2: target y coordinate in ned reference frame
         '''
-        p = np.array([x2, y2])
-        J = self.rotation_matrix(self.yaw)
-        n = J.dot(p)
-        ned_x2 = n[0] + self.ned_x
-        ned_y2 = n[1] + self.ned_y
+        ned_x2, ned_y2 = frames.body_to_ned((x2, y2), self.ned_x, self.ned_y, self.yaw)
         return (ned_x2, ned_y2)
 
     def ned_to_body(self, ned_x2, ned_y2):
@@ -106,25 +98,9 @@ class ObstacleSimulator:
         @return: body_x2: target x coordinate in body reference frame
                 body_y2: target y coordinate in body reference frame
         '''
-        n = np.array([ned_x2 - self.ned_x, ned_y2 - self.ned_y])
-        J = self.rotation_matrix(self.yaw)
-        J = np.linalg.inv(J)
-        b = J.dot(n)
-        body_x2 = b[0]
-        body_y2 = b[1]
+        body_x2, body_y2 = frames.ned_to_body((ned_x2, ned_y2), self.ned_x, self.ned_y, self.yaw)
         return (body_x2, body_y2)
 
-    def rotation_matrix(self, angle):
-        '''
-        @name: rotation_matrix
-        @brief: Transformation matrix template.
-        @param: angle: angle of rotation
-        @return: J: transformation matrix
-        '''
-        J = np.array([[math.cos(angle), -1*math.sin(angle)],
-                      [math.sin(angle), math.cos(angle)]])
-        return (J)
-
     def rviz_markers(self):
         '''
         @name: rviz_markers
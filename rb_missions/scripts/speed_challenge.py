@@ -25,13 +25,13 @@ import math
 import time
 
 import matplotlib.pyplot as plt
-import numpy as np
 import rospy
 from geometry_msgs.msg import Pose2D
 from std_msgs.msg import Float32MultiArray, Int32, String
 from sensor_msgs.msg import PointCloud2
 import sensor_msgs.point_cloud2 as pc2
 
+from usv_control import frames, replanning, spatial_index, state_machine, world_model
 from usv_perception.msg import obj_detected, obj_detected_list
 
 #EARTH_RADIUS = 6371000
@@ -50,11 +50,22 @@ class SpeedChallenge:
         self.InitTime = rospy.Time.now().secs
         self.distance = 0
         self.offset = .55 #camera to ins offset
+        self.max_visible_radius = 10
+        self.min_ahead = 1 #buoys closer in x are being passed
+        self.buoy_map = world_model.BuoyMap()
+        self.detection = state_machine.Event()
+        self.objects_index = spatial_index.SpatialIndex([], [])
+        self.plan = replanning.PlanTracker(tolerance=0.5, clock=rospy.get_time)
         self.target_x = 0
         self.target_y = 0
         self.gate_x = 0
         self.gate_y = 0
         self.ned_alpha = 0
+        self.buoy_x = 0
+        self.buoy_y = 0
+        self.buoy_found = False
+        self.x_final = 0
+        self.y_final = 0
         
         # ROS Subscribers
         rospy.Subscriber("/vectornav/ins_2d/NED_pose", Pose2D, self.ins_pose_callback)
@@ -71,39 +82,44 @@ class SpeedChallenge:
         self.yaw = pose.theta
 
     def objs_callback(self,data):
-        self.objects_list = []
+        body = []
+        colors = []
+        classes = []
         for i in range(data.len):
             if str(data.objects[i].clase) == 'bouy':
-                self.objects_list.append({'X' : data.objects[i].X + self.offset,
-                                          'Y' : data.objects[i].Y,
-                                          'color' : data.objects[i].color, 
-                                          'class' : data.objects[i].clase})
-
-    def center_point(self):
+                body.append((data.objects[i].X + self.offset,
+                             -data.objects[i].Y)) #Negate sensor input in Y
+                colors.append(data.objects[i].color)
+                classes.append(data.objects[i].clase)
+        self.buoy_map.observe_body(body, colors, classes, self.ned_x, self.ned_y,
+                                   self.yaw, rospy.get_time())
+        self.buoy_map.prune()
+        # Buoys ahead from the map, also those out of the camera view
+        ids, body = self.buoy_map.ahead(self.ned_x, self.ned_y, self.yaw,
+                                        self.max_visible_radius, self.min_ahead)
+        self.objects_list = [{'X' : body[j, 0],
+                              'Y' : -body[j, 1],
+                              'color' : self.buoy_map.color[i],
+                              'class' : self.buoy_map.clase[i]}
+                             for j, i in enumerate(ids.tolist())]
+        self.objects_index = spatial_index.SpatialIndex(body[:, 0], -body[:, 1],
+                                                        self.buoy_map.color[ids])
+        self.detection.set()
+
+    def center_point(self, objects_index):
         '''
         @name: center_point
         @brief: Returns two waypoints as desired positions. The first waypoint is
           between the pair of obstacles (gate) and the second a distance to the front 
-        @param: --
+        @param: objects_index: SpatialIndex of the buoys ahead
         @return: --
         '''
-        x_list = []
-        y_list = []
-        class_list = []
-        distance_list = []
-        for i in range(len(self.objects_list)):
-            x_list.append(self.objects_list[i]['X'])
-            y_list.append(self.objects_list[i]['Y'])
-            class_list.append(self.objects_list[i]['class'])
-            distance_list.append(math.pow(x_list[i]**2 + y_list[i]**2, 0.5))
-
-        ind_g1 = np.argsort(distance_list)[0]
-        ind_g2 = np.argsort(distance_list)[1]
-
-        x1 = x_list[ind_g1]
-        y1 = -1*y_list[ind_g1]
-        x2 = x_list[ind_g2]
-        y2 = -1*y_list[ind_g2]
+        ind_g1, ind_g2 = objects_index.nearest(2)
+
+        x1 = objects_index.x[ind_g1]
+        y1 = -1*objects_index.y[ind_g1]
+        x2 = objects_index.x[ind_g2]
+        y2 = -1*objects_index.y[ind_g2]
         xc = min([x1,x2]) + abs(x1 - x2)/2
         yc = min([y1,y2]) + abs(y1 - y2)/2
 
@@ -133,40 +149,81 @@ class SpeedChallenge:
         self.target_x, self.target_y = self.body_to_ned(xm, ym)
         self.gate_x, self.gate_y = self.body_to_ned(xc, yc)
         
-        path_array = Float32MultiArray()
-        path_array.layout.data_offset = 5
-        path_array.data = [xc, yc, xm, ym, 2]
-        self.desired(path_array)
+        self.publish_plan([self.gate_x, self.gate_y, self.target_x, self.target_y])
 
-    def calculate_distance_to_boat(self):
+    def calculate_distance_to_boat(self, objects_index):
         '''
         @name: calculate_distance_to_boat
         @brief: Returns the distance from the USV to the next gate
-        @param: --
+        @param: objects_index: SpatialIndex of the buoys ahead
         @return: --
         '''
-        x_list = []
-        y_list = []
-        class_list = []
-        distance_list = []
-        for i in range(len(self.objects_list)):
-            x_list.append(self.objects_list[i]['X'])
-            y_list.append(self.objects_list[i]['Y'])
-            class_list.append(self.objects_list[i]['class'])
-            distance_list.append(math.pow(x_list[i]**2 + y_list[i]**2, 0.5))
-
-        ind_g1 = np.argsort(distance_list)[0]
-        ind_g2 = np.argsort(distance_list)[1]
-
-        x1 = x_list[ind_g1]
-        y1 = -1*y_list[ind_g1]
-        x2 = x_list[ind_g2]
-        y2 = -1*y_list[ind_g2]
+        ind_g1, ind_g2 = objects_index.nearest(2)
+
+        x1 = objects_index.x[ind_g1]
+        y1 = -1*objects_index.y[ind_g1]
+        x2 = objects_index.x[ind_g2]
+        y2 = -1*objects_index.y[ind_g2]
         xc = min([x1,x2]) + abs(x1 - x2)/2
         yc = min([y1,y2]) + abs(y1 - y2)/2
 
         self.distance = math.pow(xc*xc + yc*yc, 0.5)
 
+    def gate(self):
+        '''
+        @name: gate
+        @brief: Sends the USV through the nearest gate while it is at least
+          2 m away.
+        @param: --
+        @return: --
+        '''
+        # One snapshot per step, the callback replaces the index meanwhile
+        objects_index = self.objects_index
+        if len(objects_index) >= 2:
+            self.calculate_distance_to_boat(objects_index)
+            if self.distance >= 2:
+                self.center_point(objects_index)
+
+    def gate_ready(self):
+        return len(self.objects_index) >= 2 and self.distance >= 2
+
+    def blue_ahead(self):
+        objects_index = self.objects_index
+        nearest = objects_index.nearest(1)
+        return len(nearest) == 1 and str(objects_index.labels[nearest[0]]) == 'blue'
+
+    def find_buoy(self):
+        '''
+        @name: find_buoy
+        @brief: Keeps the position of the nearest buoy once it is closer
+          than 7 m.
+        @param: --
+        @return: --
+        '''
+        objects_index = self.objects_index
+        nearest = objects_index.nearest(1)
+        if len(nearest) == 1 and objects_index.x[nearest[0]] < 7:
+            self.buoy_x = objects_index.x[nearest[0]]
+            self.buoy_y = objects_index.y[nearest[0]]
+            self.buoy_found = True
+
+    def around_buoy(self):
+        self.x_final, self.y_final = self.buoy_waypoints(self.buoy_x, self.buoy_y)
+
+    def check_final(self):
+        '''
+        @name: check_final
+        @brief: Reports the mission as finished once the USV is within 1 m
+          of the last waypoint.
+        @param: --
+        @return: --
+        '''
+        x_squared = math.pow(self.x_final - self.ned_x, 2)
+        y_squared = math.pow(self.y_final - self.ned_y, 2)
+        distance_final = math.pow(x_squared + y_squared, 0.5)
+        if distance_final <= 1:
+            self.status_pub.publish(2)
+
     def buoy_waypoints(self,buoy_x,buoy_y):
         '''
         @name: buoy_waypoints
@@ -184,16 +241,11 @@ class SpeedChallenge:
         w2 = [buoy_x + radius, buoy_y]
         w3 = [buoy_x, buoy_y - radius]
 
-        path_array = Float32MultiArray()
-        path_array.layout.data_offset = 11
-        
-        w1_x, w1_y = self.body_to_ned(w1[0], w1[1])
-        w2_x, w2_y = self.body_to_ned(w2[0], w2[1])
-        w3_x, w3_y = self.body_to_ned(w3[0], w3[1])
+        ned = frames.body_to_ned([w1, w2, w3], self.ned_x, self.ned_y, self.yaw)
+        (w1_x, w1_y), (w2_x, w2_y), (w3_x, w3_y) = ned.tolist()
         w5_x, w5_y = self.gate_to_ned(-5, 0, self.ned_alpha, self.gate_x, self.gate_y)
-        path_array.data = [w1_x, w1_y, w2_x, w2_y, w3_x, w3_y,
-                          self.gate_x, self.gate_y, w5_x, w5_y, 0]
-        self.desired(path_array)
+        self.publish_plan([w1_x, w1_y, w2_x, w2_y, w3_x, w3_y,
+                           self.gate_x, self.gate_y, w5_x, w5_y])
 
         return(w5_x, w5_y)
 
@@ -209,10 +261,7 @@ class SpeedChallenge:
                                                         self.ned_alpha,
                                                         self.target_x, 
                                                         self.target_y)
-        path_array = Float32MultiArray()
-        path_array.layout.data_offset = 3
-        path_array.data = [self.target_x, self.target_y, 0]
-        self.desired(path_array)
+        self.publish_plan([self.target_x, self.target_y])
 
     def gate_to_body(self, gate_x2, gate_y2, alpha, body_x1, body_y1):
         '''
@@ -226,11 +275,7 @@ class SpeedChallenge:
         @return: body_x2: target x coordinate in body reference frame
                  body_y2: target y coordinate in body reference frame
         '''
-        p = np.array([[gate_x2],[gate_y2]])
-        J = self.rotation_matrix(alpha)
-        n = J.dot(p)
-        body_x2 = n[0] + body_x1
-        body_y2 = n[1] + body_y1
+        body_x2, body_y2 = frames.to_parent((gate_x2, gate_y2), alpha, body_x1, body_y1)
         return (body_x2, body_y2)
 
     def body_to_ned(self, x2, y2):
@@ -242,11 +287,7 @@ class SpeedChallenge:
         @return: ned_x2: target x coordinate in ned reference frame
                  ned_y2: target y coordinate in ned reference frame
         '''
-        p = np.array([x2, y2])
-        J = self.rotation_matrix(self.yaw)
-        n = J.dot(p)
-        ned_x2 = n[0] + self.ned_x
-        ned_y2 = n[1] + self.ned_y
+        ned_x2, ned_y2 = frames.body_to_ned((x2, y2), self.ned_x, self.ned_y, self.yaw)
         return (ned_x2, ned_y2)
 
     def gate_to_ned(self, gate_x2, gate_y2, alpha, ned_x1, ned_y1):
@@ -261,23 +302,27 @@ class SpeedChallenge:
         @return: body_x2: target x coordinate in ned reference frame
                  body_y2: target y coordinate in ned reference frame
         '''
-        p = np.array([[gate_x2],[gate_y2]])
-        J = self.rotation_matrix(alpha)
-        n = J.dot(p)
-        ned_x2 = n[0] + ned_x1
-        ned_y2 = n[1] + ned_y1
+        ned_x2, ned_y2 = frames.gate_to_ned((gate_x2, gate_y2), alpha, ned_x1, ned_y1)
         return (ned_x2, ned_y2)
 
-    def rotation_matrix(self, angle):
+    def publish_state(self, state):
+        self.state = state
+        self.test.publish(state)
+
+    def publish_plan(self, waypoints):
         '''
-        @name: rotation_matrix
-        @brief: Transformation matrix template.
-        @param: angle: angle of rotation
-        @return: J: transformation matrix
+        @name: publish_plan
+        @brief: Sends a NED plan to LOS, only when a waypoint moved beyond
+          the replanning tolerance, as a tail update when possible.
+        @param: waypoints: flat NED waypoint list [x1, y1, x2, y2, ...]
+        @return: --
         '''
-        J = np.array([[math.cos(angle), -1*math.sin(angle)],
-                      [math.sin(angle), math.cos(angle)]])
-        return (J)
+        data = self.plan.update(waypoints)
+        if data is not None:
+            path_array = Float32MultiArray()
+            path_array.layout.data_offset = len(data)
+            path_array.data = data
+            self.desired(path_array)
 
     def desired(self, path):
     	self.path_pub.publish(path)
@@ -287,95 +332,26 @@ def main():
     rate = rospy.Rate(20)
     speedChallenge = SpeedChallenge()
     speedChallenge.distance = 4
-    last_detection = []
-    while not rospy.is_shutdown() and speedChallenge.activated:
-        if speedChallenge.objects_list != last_detection:
-            if speedChallenge.state == -1:
-                while (not rospy.is_shutdown()) and (len(speedChallenge.objects_list) < 2):
-                    speedChallenge.test.publish(speedChallenge.state)
-                    rate.sleep()
-                speedChallenge.state = 0
-                last_detection = speedChallenge.objects_list
-            if speedChallenge.state == 0:
-                speedChallenge.test.publish(speedChallenge.state)
-                if len(speedChallenge.objects_list) >= 2:
-                    speedChallenge.calculate_distance_to_boat()
-                if len(speedChallenge.objects_list) >= 2 and speedChallenge.distance >= 2:
-                    speedChallenge.center_point()
-                else:
-                    initTime = rospy.Time.now().secs
-                    while ((not rospy.is_shutdown()) and
-                        (len(speedChallenge.objects_list) < 2 or speedChallenge.distance < 2)):
-                        if rospy.Time.now().secs - initTime > 2:
-                            speedChallenge.state = 1
-                            rate.sleep()
-                            break
-                last_detection = speedChallenge.objects_list
-        if speedChallenge.state == 1:
-            speedChallenge.test.publish(speedChallenge.state)
-            x_list = []
-            y_list = []
-            class_list = []
-            distance_list = []
-            for i in range(len(speedChallenge.objects_list)):
-                x_list.append(speedChallenge.objects_list[i]['X'])
-                y_list.append(speedChallenge.objects_list[i]['Y'])
-                class_list.append(speedChallenge.objects_list[i]['class'])
-                distance_list.append(math.pow(x_list[i]**2 + y_list[i]**2, 0.5))
-                ind_0 = np.argsort(distance_list)[0]
-            if (len(speedChallenge.objects_list) >= 1 and
-            (str(speedChallenge.objects_list[ind_0]['color']) == 'blue')):
-                speedChallenge.state = 2
-            else:
-                initTime = rospy.Time.now().secs
-                while (not rospy.is_shutdown() and (len(speedChallenge.objects_list)) < 1):
-                    if rospy.Time.now().secs - initTime > 1:
-                        speedChallenge.farther()
-                        rate.sleep()
-                        break
-            last_detection = speedChallenge.objects_list
-        if speedChallenge.objects_list != last_detection:
-            if speedChallenge.state == 2:
-                speedChallenge.test.publish(speedChallenge.state)
-                x_list = []
-                y_list = []
-                class_list = []
-                distance_list = []
-                for i in range(len(speedChallenge.objects_list)):
-                    x_list.append(speedChallenge.objects_list[i]['X'])
-                    y_list.append(speedChallenge.objects_list[i]['Y'])
-                    class_list.append(speedChallenge.objects_list[i]['class'])
-                    distance_list.append(math.pow(x_list[i]**2 + y_list[i]**2, 0.5))
-                    ind_0 = np.argsort(distance_list)[0]
-                if ((len(speedChallenge.objects_list) >= 1) and
-                    (speedChallenge.objects_list[ind_0]['X'] < 7)):
-                    buoy_x = speedChallenge.objects_list[0]['X']
-                    buoy_y = speedChallenge.objects_list[0]['Y']
-                    speedChallenge.state = 3
-                else:
-                    initTime = rospy.Time.now().secs
-                    while not rospy.is_shutdown() and (len(speedChallenge.objects_list) < 1 or speedChallenge.objects_list[ind_0]['X'] >= 7):
-                        if rospy.Time.now().secs - initTime > 1:
-                            speedChallenge.farther()
-                            rate.sleep()
-                            break
-                last_detection = speedChallenge.objects_list
-            if speedChallenge.state == 3:
-                speedChallenge.test.publish(speedChallenge.state)
-                x_final, y_final = speedChallenge.buoy_waypoints(buoy_x,buoy_y)
-                speedChallenge.state = 4
-                last_detection = speedChallenge.objects_list
-        if speedChallenge.state == 4:
-            speedChallenge.test.publish(speedChallenge.state)
-            x_squared = math.pow(x_final - speedChallenge.ned_x, 2)
-            y_squared = math.pow(y_final - speedChallenge.ned_y, 2)
-            distance_final = math.pow(x_squared + y_squared, 0.5)
-            if distance_final > 1:
-                pass
-            else:
-                speedChallenge.status_pub.publish(2)
-            last_detection = speedChallenge.objects_list
-        rate.sleep()    
+    buoys = lambda: len(speedChallenge.objects_index)
+    states = [
+        state_machine.State(-1, transitions=[(lambda: buoys() >= 2, 0)]),
+        # Through the gate, then wait 2 s once it is lost or too close
+        state_machine.State(0, update=speedChallenge.gate, event=speedChallenge.detection,
+                            transitions=[(lambda: not speedChallenge.gate_ready(), 1, 2)]),
+        # Forward until the nearest buoy is the blue one
+        state_machine.State(1, transitions=[(speedChallenge.blue_ahead, 2)],
+                            timers=[(lambda: buoys() < 1, 1, speedChallenge.farther)]),
+        state_machine.State(2, update=speedChallenge.find_buoy,
+                            transitions=[(lambda: speedChallenge.buoy_found, 3)],
+                            timers=[(lambda: not speedChallenge.buoy_found, 1,
+                                     speedChallenge.farther)]),
+        # Around the buoy and back through the gate
+        state_machine.State(3, enter=speedChallenge.around_buoy,
+                            transitions=[(None, 4)]),
+        state_machine.State(4, update=speedChallenge.check_final)]
+    machine = state_machine.StateMachine(states, -1, rospy.get_time,
+                                         speedChallenge.publish_state)
+    machine.run(rate.sleep, rospy.is_shutdown, lambda: speedChallenge.activated)
     rospy.spin()
 
 if __name__ == "__main__":
@@ -19,14 +19,29 @@ import os
 import time
 import rospy
 import math
-from std_msgs.msg import Float64
+from std_msgs.msg import Float32MultiArray, Float64
 from geometry_msgs.msg import Pose2D
 from geometry_msgs.msg import Vector3
+from usv_control import allocation, event_loop, recorder
 
 NODE_NAME_THIS = 'bc'
 
+TELEMETRY_FIELDS = ('u_d', 'psi_d', 'u', 'v', 'r', 'psi', 'error_u', 'error_psi',
+                    'T_x', 'T_z', 'T_port', 'T_stbd')
+
 class Controller:
-    def __init__(self):
+    def __init__(self, guidance_topics=True, ros=True):
+        '''
+        @name: __init__
+        @brief: Backstepping controller node state.
+        @param: guidance_topics: subscribe to the desired speed and heading
+          topics; False when guidance runs in the same process and passes
+          them to run()
+                ros: False for a headless controller (simulation), with no
+          subscribers, publishers nor parameters; feed u, v, r and psi and
+          call control()
+        @return: --
+        '''
         self.activated = True #determines if the controller should run
 
 #Controller hydrodynamic and physical constants
@@ -39,6 +54,13 @@ class Controller:
         self.B = 0.41
 
         self.c = 0.78
+        # c scales the port thruster, as tuned for this controller
+        self.allocator = allocation.ThrustAllocator(
+            self.B,
+            port_map=([self.c*allocation.COMMAND_MIN, self.c*allocation.COMMAND_MAX],
+                      [allocation.COMMAND_MIN, allocation.COMMAND_MAX]),
+            stbd_map=([allocation.COMMAND_MIN, allocation.COMMAND_MAX],
+                      [allocation.COMMAND_MIN, allocation.COMMAND_MAX]))
 
 #Controller gains
         self.ku = 0.5 #Speed controller speed error gain
@@ -76,9 +98,27 @@ class Controller:
         self.T_port = 0 #Thrust in Newtons
         self.T_stbd = 0 #Thrust in Newtons
 
+        self.event_driven = False
+        self.recorder = None
+        if not ros:
+            return
+
+#Telemetry ring file, relative to ROS_HOME; '' disables it
+        telemetry = rospy.get_param('~control_telemetry', 'bc_telemetry.npy')
+        if telemetry:
+            self.recorder = recorder.Recorder(telemetry, TELEMETRY_FIELDS)
+
 #Desired values subscribers
-        rospy.Subscriber("/guidance/desired_speed", Float64, self.dspeed_callback)
-        rospy.Subscriber("/guidance/desired_heading", Float64, self.dheading_callback)
+        if guidance_topics:
+            rospy.Subscriber("/guidance/desired_speed", Float64, self.dspeed_callback)
+            rospy.Subscriber("/guidance/desired_heading", Float64, self.dheading_callback)
+
+#Event driven mode: control runs on every IMU or guidance sample
+        self.event_driven = rospy.get_param('~event_driven', False)
+        self.trigger = event_loop.EventTrigger(rospy.get_param('~min_period', 0.01),
+            rospy.get_param('~stale_timeout', 0.5), ('local_vel', 'ins_pose'))
+        if guidance_topics:
+            rospy.Subscriber("/guidance/pose_stamp", Float64, self.pose_stamp_callback)
 
 #IMU data subscribers
         rospy.Subscriber("/vectornav/ins_2d/local_vel", Vector3, self.local_vel_callback)
@@ -89,6 +129,8 @@ class Controller:
         self.left_thruster_pub = rospy.Publisher("/usv_control/controller/left_thruster", Float64, queue_size=10)
 
         self.u_error_pub = rospy.Publisher("/usv_control/bc/speed_error", Float64, queue_size=10)
+        self.latency_pub = rospy.Publisher("/usv_control/controller/latency", Float64, queue_size=10)
+        self.health_pub = rospy.Publisher("/usv_control/bc/health", Float32MultiArray, queue_size=10)
         self.psi_error_pub = rospy.Publisher("/usv_control/bc/heading_error", Float64, queue_size=10)
 
 
@@ -102,11 +144,16 @@ class Controller:
         self.u = upsilon.x
         self.v = upsilon.y
         self.r = upsilon.z
+        self.trigger.notify('local_vel')
 
     def ins_pose_callback(self, pose):
         self.lat = pose.x
         self.long = pose.y
         self.psi = pose.theta
+        self.trigger.notify('ins_pose')
+
+    def pose_stamp_callback(self, stamp):
+        self.trigger.notify('guidance', stamp.data)
 
     def control(self, u_d=0, psi_d=0):
 
@@ -156,17 +203,12 @@ class Controller:
         if math.fabs(self.error_psi) > 0.3:
             self.T_z = self.T_z * .8
 
-        self.T_port = (self.T_x/(2*self.c)) + (self.T_z/(self.B * self.c))
-        self.T_stbd = (self.T_x/2) - (self.T_z/self.B)
-        if self.T_port > 36.5:
-            self.T_port = 20
-        elif self.T_port < -30:
-            self.T_port = -20
-        if self.T_stbd > 36.5:
-            self.T_stbd = 20
-        elif self.T_stbd < -30:
-            self.T_stbd = -20
+        #Yaw moment keeps priority when the thrusters saturate
+        self.T_port, self.T_stbd = self.allocator.allocate(self.T_x, self.T_z)
+
+        return (self.T_port, self.T_stbd)
 
+    def publish(self):
 #Controller outputs
         self.right_thruster_pub.publish(self.T_stbd)
         self.left_thruster_pub.publish(self.T_port)
@@ -176,15 +218,20 @@ class Controller:
 
     def run(self, u_d=0, psi_d=0):
         self.control(u_d, psi_d)
+        self.publish()
+        if self.recorder is not None:
+            self.recorder.record(u_d, psi_d, self.u, self.v, self.r, self.psi,
+                                 self.error_u, self.error_psi, self.T_x, self.T_z,
+                                 self.T_port, self.T_stbd)
 
 def main():
     rospy.init_node(NODE_NAME_THIS, anonymous=False, disable_signals=False)
-    rate = rospy.Rate(100) # 100hz
     rospy.loginfo("Test node running")
     C = Controller()
-    while not rospy.is_shutdown() and C.activated:
-        C.run(C.u_d, C.psi_d)
-        rate.sleep()
+    if C.recorder is not None:
+        rospy.on_shutdown(C.recorder.close)
+
+    event_loop.run_controller(C, lambda: (C.u_d, C.psi_d))
     rospy.spin()
 if __name__ == "__main__":
     try:
@@ -19,9 +19,10 @@ import os
 import time
 import rospy
 import math
-from std_msgs.msg import Float64
+from std_msgs.msg import Float32MultiArray, Float64
 from geometry_msgs.msg import Pose2D
 from geometry_msgs.msg import Vector3
+from usv_control import allocation, event_loop
 
 NODE_NAME_THIS = 'bc_heading'
 
@@ -39,6 +40,13 @@ class Controller:
         self.B = 0.41
 
         self.c = 0.78
+        # c scales the port thruster, as tuned for this controller
+        self.allocator = allocation.ThrustAllocator(
+            self.B,
+            port_map=([self.c*allocation.COMMAND_MIN, self.c*allocation.COMMAND_MAX],
+                      [allocation.COMMAND_MIN, allocation.COMMAND_MAX]),
+            stbd_map=([allocation.COMMAND_MIN, allocation.COMMAND_MAX],
+                      [allocation.COMMAND_MIN, allocation.COMMAND_MAX]))
 
 #Controller gains
         self.k1 = -3 #Heading controller yaw error gain
@@ -71,6 +79,12 @@ class Controller:
         rospy.Subscriber("/guidance/desired_heading", Float64, self.dheading_callback)
         rospy.Subscriber("/guidance/desired_thrust", Float64, self.dthrust_callback)
 
+#Event driven mode: control runs on every IMU or guidance sample
+        self.event_driven = rospy.get_param('~event_driven', False)
+        self.trigger = event_loop.EventTrigger(rospy.get_param('~min_period', 0.01),
+            rospy.get_param('~stale_timeout', 0.5), ('local_vel', 'ins_pose'))
+        rospy.Subscriber("/guidance/pose_stamp", Float64, self.pose_stamp_callback)
+
 #IMU data subscribers
         rospy.Subscriber("/vectornav/ins_2d/local_vel", Vector3, self.local_vel_callback)
         rospy.Subscriber("/vectornav/ins_2d/ins_pose", Pose2D, self.ins_pose_callback)
@@ -79,6 +93,8 @@ class Controller:
         self.right_thruster_pub = rospy.Publisher("/usv_control/controller/right_thruster", Float64, queue_size=10)
         self.left_thruster_pub = rospy.Publisher("/usv_control/controller/left_thruster", Float64, queue_size=10)
 
+        self.latency_pub = rospy.Publisher("/usv_control/controller/latency", Float64, queue_size=10)
+        self.health_pub = rospy.Publisher("/usv_control/bc_h/health", Float32MultiArray, queue_size=10)
         self.psi_error_pub = rospy.Publisher("/usv_control/bc_h/heading_error", Float64, queue_size=10)
 
     def dheading_callback(self, d_heading):
@@ -92,11 +108,16 @@ class Controller:
         self.u = upsilon.x
         self.v = upsilon.y
         self.r = upsilon.z
+        self.trigger.notify('local_vel')
 
     def ins_pose_callback(self, pose):
         self.lat = pose.x
         self.long = pose.y
         self.psi = pose.theta
+        self.trigger.notify('ins_pose')
+
+    def pose_stamp_callback(self, stamp):
+        self.trigger.notify('guidance', stamp.data)
 	#rospy.logwarn("psi %f", self.psi)
 
     def control(self, tx_d=0, psi_d=0):
@@ -134,16 +155,8 @@ class Controller:
         if math.fabs(self.error_psi) > 2:
             self.T_x = self.T_x * .5
 
-        self.T_port = (self.T_x/(2*self.c)) + (self.T_z/(self.B*self.c))
-        self.T_stbd = (self.T_x/2) - (self.T_z/self.B)
-        if self.T_port > 36.5:
-            self.T_port = 20
-        elif self.T_port < -30:
-            self.T_port = -20
-        if self.T_stbd > 36.5:
-            self.T_stbd = 20
-        elif self.T_stbd < -30:
-            self.T_stbd = -20
+        #Yaw moment keeps priority when the thrusters saturate
+        self.T_port, self.T_stbd = self.allocator.allocate(self.T_x, self.T_z)
 
         if self.T_x == 0:
             self.T_stbd = 0
@@ -160,12 +173,10 @@ class Controller:
 
 def main():
     rospy.init_node(NODE_NAME_THIS, anonymous=False, disable_signals=False)
-    rate = rospy.Rate(100) # 100hz
     rospy.loginfo("Test node running")
     C = Controller()
-    while not rospy.is_shutdown() and C.activated:
-        C.run(C.tx_d, C.psi_d)
-        rate.sleep()
+
+    event_loop.run_controller(C, lambda: (C.tx_d, C.psi_d))
     rospy.spin()
 if __name__ == "__main__":
     try:
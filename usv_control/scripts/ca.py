@@ -12,36 +12,14 @@
 
 import math
 import os
-import sys
 import time
 
 import numpy as np
-import rospy
 from geometry_msgs.msg import Pose2D, Vector3
 from std_msgs.msg import Float64,  Float32MultiArray, String
+from usv_control import debug_log, dynamic_window, frames, guidance, obstacles
 from usv_perception.msg import obstacles_list
 
-# Class definition for easy debugging
-class Color():
-    RED   = "\033[1;31m"  
-    BLUE  = "\033[1;34m"
-    CYAN  = "\033[1;36m"
-    GREEN = "\033[0;32m"
-    RESET = "\033[0;0m"
-    BOLD    = "\033[;1m"
-    REVERSE = "\033[;7m"
-
-class Obstacle:
-    def __init__(self):
-        self. x = 0
-        self.y = 0
-        self.radius = 0
-        self.teta = 0
-        self.alpha = 0
-        self.collision_flag = 0
-        self.past_collision_flag = 0
-        self.total_radius = 0
-
 class Boat:
     def __init__(self, radius=0):
         self.radius = radius
@@ -50,12 +28,13 @@ class Boat:
         self.yaw = 0
         self.u = 0
         self.v = 0
+        self.r = 0
         self.vel = 0
         self.bearing = 0
 
 class CollisionAvoidance:
     def __init__(self, exp_offset=0, safety_radius=0, u_max=0, u_min=0, 
-        exp_gain=0, chi_psi=0, r_max=0, obstacle_mode=0):
+        exp_gain=0, chi_psi=0, r_max=0, obstacle_mode=0, avoidance_mode=0):
         self.safety_radius = safety_radius
         self.u_max = u_max
         self.u_min = u_min
@@ -64,17 +43,27 @@ class CollisionAvoidance:
         self.exp_offset = exp_offset
         self.r_max = r_max
         self.obstacle_mode = obstacle_mode
-        self.obs_list = []
-        self.vel_list = []
+        self.avoidance_mode = avoidance_mode # 0 for collision cone, 1 for velocity obstacles, 2 for dynamic window
+        self.obs = obstacles.ObstacleTable()
+        self.log = debug_log.RingLogger('ca', sink=debug_log.rospy_sink)
+        self.vel_list = np.zeros(0)
         self.u_psi = 0
         self.u_r = 0
         self.boat = Boat()
 
-        for i in range(0,21,1):
-            obstacle = Obstacle()
-            self.obs_list.append(obstacle)
+        # Velocity obstacle candidate grid: speeds times heading offsets from
+        # the LOS bearing, kept as unit vectors rotated every tick. The LOS
+        # speed is added to the speeds on every call
+        self.vo_horizon = 10. #seconds
+        self.vo_heading_weight = 1.
+        self.vo_speed_weight = 1.
+        self.vo_offsets = np.linspace(-math.pi/2, math.pi/2, 31)
+        self.vo_speeds = np.linspace(self.u_min, self.u_max, 6)
+        self.vo_unit = np.column_stack((np.cos(self.vo_offsets), np.sin(self.vo_offsets)))
+
+        self.dynamic_window = dynamic_window.DynamicWindow(self.u_max, self.u_min)
 
-    def avoid(self, ak, x1, y1, input_list, boat):
+    def avoid(self, ak, x1, y1, input_list, boat, stamp=None):
         '''
         @name: avoid
         @brief: If there is an impending collision, returns the velocity and 
@@ -84,273 +73,213 @@ class CollisionAvoidance:
                 ak: angle from NED reference frame to path
                 input_list: incomming obstacle list
                 boat: boat class structure
+                stamp: time the obstacle list was received, used to
+                  estimate the obstacles velocity
         @return: bearing: bearing to avoid obstacles
                  velocity: velocity to avoid obstacles
         '''
-        nearest_obs = []
-        self.vel_list = []
         self.boat = boat
 
         vel_nedx,vel_nedy = self.body_to_ned(self.boat.u,self.boat.v,0,0)
-        #print("self.u: " + str(self.boat.u))
-        #print("self.boat.v: " + str(self.boat.v))
-        #print("vel_nedx: " + str(vel_nedx))
-        #print("vel_nedy " + str(vel_nedy))
-        #print("ak: ", str(ak))
         vel_ppx,vel_ppy =  self.ned_to_pp(ak,0,0,vel_nedx,vel_nedy)
-        #ppx,ppy = self.ned_to_pp(ak,x1,y1,self.boat.ned_x,self.boat.ned_y)
 
-        self.check_obstacles(input_list)
+        self.check_obstacles(input_list, stamp)
+        n = len(self.obs)
+        self.obs.total_radius[:] = self.boat.radius + self.safety_radius + self.obs.radius
+        if self.avoidance_mode == 1:
+            return self.velocity_obstacles(ak)
+        if self.avoidance_mode == 2:
+            return self.dynamic_window_avoid()
+        collision, distance, distance_free = self.get_collision(0, 0, vel_ppy, vel_ppx)
+        self.vel_list = self.get_velocity(distance_free)
+        avoid_distance = self.calculate_avoid_distance(self.boat.u, self.boat.v)
+        nearest_obs = np.where(collision, avoid_distance - distance, 0)
 
-        for i in range(0,len(self.obs_list),1):
-            sys.stdout.write(Color.CYAN)
-            print("obstacle"+str(i))
-            sys.stdout.write(Color.RESET)
-            print("obsx: " + str(self.obs_list[i].x))
-            print("obsy: " + str(self.obs_list[i].y))
-            print("obsradius: " + str(self.obs_list[i].radius))
-        
-            self.obs_list[i].total_radius = self.boat.radius + self.safety_radius + self.obs_list[i].radius
-            collision, distance = self.get_collision(0, 0, vel_ppy, vel_ppx,i)
-            #print("distance: " + str(distance)) 
-            if collision:
-                #u_obs = np.amin(u_obstacle)
-                avoid_distance = self.calculate_avoid_distance(self.boat.u, self.boat.v, i)
-                nearest_obs.append(avoid_distance - distance)
-                #print("avoid_distance: " + str(avoid_distance)) 
-                #print("distance: " + str(distance)) 
-            else:
-                nearest_obs.append(0)
-                #self.vel_list.append(self.vel)
-        
-        if len(nearest_obs) > 0:
-            print('nearest_obs max: ' + str(np.max(nearest_obs)))
-            if np.max(nearest_obs)>0:
-                index = nearest_obs.index(np.max(nearest_obs))
-                if np.max(nearest_obs) > 0 and self.obs_list[index].alpha > 0:
-                    self.boat.vel = np.min(self.vel_list)
-                    sys.stdout.write(Color.BOLD)
-                    print('index: ' + str(index))
-                    sys.stdout.write(Color.RESET)
+        if n > 0:
+            index = np.argmax(nearest_obs)
+            self.log.debug('nearest', 'nearest_obs max: %.3f', nearest_obs[index])
+            if nearest_obs[index] > 0:
+                if self.obs.alpha[index] > 0:
+                    self.boat.vel = self.vel_list.min()
+                    self.log.info('dodge', 'dodging obstacle %d', self.obs.track_id[index])
                     ppx,ppy = self.ned_to_pp(ak, x1, y1, self.boat.ned_x, self.boat.ned_y)
                     obs_ppx, obs_ppy = self.get_obstacle( ak, x1, y1, index)
                     self.dodge(vel_ppx, vel_ppy, ppx, ppy, obs_ppx, obs_ppy, index)
                 else:
-                    #rospy.loginfo("nearest_obs: " + str(nearest_obs[index])) 
-                    sys.stdout.write(Color.BLUE)
-                    print ('free')
-                    sys.stdout.write(Color.RESET)
-                #sys.stdout.write(Color.BOLD)
-                #print("yaw: " + str(self.yaw))
-                #print("bearing: " + str(self.bearing))
-                #sys.stdout.write(Color.RESET)
+                    self.log.debug('free', 'free')
         else:
-            sys.stdout.write(Color.BLUE)
-            print ('no obstacles')
-            sys.stdout.write(Color.RESET)
-        print('vel:' + str(self.boat.vel))
+            self.log.debug('free', 'no obstacles')
+        self.log.debug('vel', 'vel: %.3f bearing: %.3f', self.boat.vel, self.boat.bearing)
         
         return self.boat.bearing, self.boat.vel
 
-    def check_obstacles(self, input_list):
+    def check_obstacles(self, input_list, stamp=None):
         '''
         @name: check_obstacles
-        @brief: Recieves incomming obstacles and checks if they must be merged.
+        @brief: Recieves incomming obstacles, merges the ones the boat can not
+          pass between and updates the obstacle table. Obstacles are tracked
+          in NED reference frame so their collision state survives between
+          lists.
         @param: input_list: incomming obstacle list
-        @return: --
+                stamp: time the obstacle list was received
+        @return: obs: obstacle table
         '''
-        sys.stdout.write(Color.RED)
-        print("Check Obstacles:")
-        sys.stdout.write(Color.RESET)
-        for i in range(0,len(input_list),1):
-            #self.obstacle = Obstacle()
-            self.obs_list[i].x = input_list[i]['X']
-            # Negative y to compensate Lidar reference frame
-            self.obs_list[i].y = -input_list[i]['Y']
-            self.obs_list[i].radius = input_list[i]['radius']
-            print("self.obs_list[" + str(i)+ "].x: " + str(self.obs_list[i].x))
-            print("self.obs_list[i].y: " + str(self.obs_list[i].y))
-            print("self.obs_list[i].radius: " + str(self.obs_list[i].radius))
-            print("self.obs_list[i].collision_flag: " + str(self.obs_list[i].collision_flag))
-        i = 0
-        j = 0 
-        while i < (len(self.obs_list)-1):
-            j = i + 1
-            while j < len(self.obs_list):
-                x = pow(self.obs_list[i].x-self.obs_list[j].x, 2)
-                y = pow(self.obs_list[i].y-self.obs_list[j].y, 2)
-                radius = self.obs_list[i].radius + self.obs_list[j].radius
-                distance_centers = pow(x+y, 0.5)
-                distance = distance_centers - radius
-                #print("distance between i:" + str(i)+ " and j:" + str(j) + " = "+ str(distance))
-                #print("boat distance: " + str((self.boat.radius + self.safety_radius)*2))
-                if distance < 0:
-                  j = j + 1
-                elif distance <= (self.boat.radius + self.safety_radius)*2:
-                    x,y,radius = self.merge_obstacles(i,j, distance_centers)
-                    print("self.obs_list[i].y: " + str(self.obs_list[i].y))
-                    print("self.obs_list[j].y: " + str(self.obs_list[j].y))
-                    self.obs_list[i].x = x
-                    self.obs_list[i].y = y
-                    self.obs_list[i].radius = radius
-                    print("self.obs_list[ij].y: " + str(self.obs_list[i].y))
-                    print("self.obs_list[ij].radius: " + str(self.obs_list[i].radius))
-                    self.obs_list[j].x = x
-                    #print("self.obs_list[i].x: " + str(self.obs_list[j].x))
-                    self.obs_list[j].y = y
-                    self.obs_list[j].radius = radius
-                    i = 0
-                else:
-                    j = j + 1
+        x = np.array([obstacle['X'] for obstacle in input_list], dtype=float)
+        # Negative y to compensate Lidar reference frame
+        y = -np.array([obstacle['Y'] for obstacle in input_list], dtype=float)
+        radius = np.array([obstacle['radius'] for obstacle in input_list], dtype=float)
+        clearance = (self.boat.radius + self.safety_radius)*2
+        _, x, y, radius = obstacles.merge_obstacles(x, y, radius, clearance)
+        if len(x) < len(input_list):
+            self.log.debug('merge', 'merged obstacles: %d', len(input_list) - len(x))
 
-                sys.stdout.write(Color.RED)
-                #print("Obstacle the same")
-                sys.stdout.write(Color.RESET)
-                #print("i: " + str(i))
-                #print("j: " + str(j))
-            i = i + 1
-            #print("done j")
-        #print(self.obs_list)
-        return self.obs_list
+        # Body obstacles
+        if self.obstacle_mode == 1:
+            ned = frames.body_to_ned(np.column_stack((x, y)), self.boat.ned_x,
+                                     self.boat.ned_y, self.boat.yaw)
+            ned_x = ned[:,0]
+            ned_y = ned[:,1]
+        # NED obstacles
+        else:
+            ned_x = x
+            ned_y = y
+        self.obs.update(x, y, radius, ned_x, ned_y, stamp)
+        if self.log.enabled(debug_log.DEBUG):
+            self.log.debug('obstacles', 'track_id: %s x: %s y: %s radius: %s collision_flag: %s',
+                           self.obs.track_id, self.obs.x, self.obs.y, self.obs.radius,
+                           self.obs.collision_flag.copy())
+        return self.obs
+
+    def velocity_obstacles(self, ak):
+        '''
+        @name: velocity_obstacles
+        @brief: Velocity obstacle avoidance for moving obstacles. Obstacle
+          positions and velocities are taken to the path reference frame
+          and the LOS command is checked against all the velocity
+          obstacles. If it is free for the whole horizon it is returned
+          unchanged; otherwise every (speed, heading) candidate of the grid
+          is checked and the admissible one closest to the LOS command is
+          returned. When no candidate is free, the one colliding the latest
+          is chosen.
+        @param: ak: angle from NED reference frame to path
+        @return: bearing: bearing to avoid obstacles
+                 velocity: velocity to avoid obstacles
+        '''
+        if len(self.obs) == 0:
+            self.log.debug('free', 'no obstacles')
+            return self.boat.bearing, self.boat.vel
+        position = frames.ned_to_path(np.column_stack((self.obs.ned_x, self.obs.ned_y)),
+                                      ak, self.boat.ned_x, self.boat.ned_y)
+        velocity = frames.ned_to_path(np.column_stack((self.obs.vel_x, self.obs.vel_y)), ak, 0, 0)
+        los_x, los_y = frames.to_parent((self.boat.vel, 0.), self.boat.bearing - ak)
+        ttc = obstacles.time_to_collision(position[:,0], position[:,1],
+                                          velocity[:,0], velocity[:,1],
+                                          self.obs.total_radius, [los_x], [los_y],
+                                          self.vo_horizon)
+        if np.isinf(ttc[0]):
+            self.log.debug('free', 'LOS command free')
+            return self.boat.bearing, self.boat.vel
+
+        speeds = np.append(self.vo_speeds, self.boat.vel)
+        offset = np.tile(self.vo_offsets, len(speeds))
+        speed = np.repeat(speeds, len(self.vo_offsets))
+        candidates = np.tile(frames.to_parent(self.vo_unit, self.boat.bearing - ak),
+                             (len(speeds), 1))*speed[:, None]
+        ttc = obstacles.time_to_collision(position[:,0], position[:,1],
+                                          velocity[:,0], velocity[:,1],
+                                          self.obs.total_radius, candidates[:,0],
+                                          candidates[:,1], self.vo_horizon)
+        cost = (self.vo_heading_weight*offset*offset
+                + self.vo_speed_weight*(speed - self.boat.vel)**2)
+        free = np.isinf(ttc)
+        if free.any():
+            best = np.flatnonzero(free)[np.argmin(cost[free])]
+        else:
+            self.log.warn('vo_blocked', 'no collision free velocity, latest collision in %.1f s',
+                          ttc.max())
+            latest = np.flatnonzero(ttc == ttc.max())
+            best = latest[np.argmin(cost[latest])]
+        self.log.debug('vo', 'heading offset: %.3f speed: %.3f blocked: %d',
+                       offset[best], speed[best], np.count_nonzero(~free))
+        self.boat.bearing = guidance.wrap_angle(self.boat.bearing + offset[best])
+        self.boat.vel = speed[best]
+        return self.boat.bearing, self.boat.vel
 
-    def merge_obstacles(self, i, j, distance_centers):
+    def dynamic_window_avoid(self):
         '''
-        @name: merge_obstacles
-        @brief: Calculates new obstacle center and radius for merged obstacles.
-        @param: i: first obstacle index
-                j: second obstacle index
-                distance_centers: distance of obstacles centers
-        @return: x: merged obstacle center x
-                 y: merged obstacle center y 
-                 radius: merged obstacle radius
+        @name: dynamic_window_avoid
+        @brief: Dynamic window avoidance. The (speed, heading) commands
+          reachable by the boat are rolled out with its dynamic model and
+          scored against the obstacles clearance and a target ahead on the
+          LOS bearing.
+        @param: --
+        @return: bearing: bearing to avoid obstacles
+                 velocity: velocity to avoid obstacles
         '''
-        # calculate centroid
-        x = (self.obs_list[i].x + self.obs_list[j].x)/2
-        y = (self.obs_list[i].y + self.obs_list[j].y)/2
-        #calculte radius
-        max_radius = max(self.obs_list[i].radius, self.obs_list[i+1].radius)
-        radius = distance_centers/2 + max_radius
-        sys.stdout.write(Color.RED)
-        print("Merged obstacle:" + str(radius))
-        sys.stdout.write(Color.RESET)
-        return(x,y,radius)
-    
-    def get_collision(self, ppx, ppy, vel_ppy, vel_ppx, i):
+        if len(self.obs) == 0:
+            self.log.debug('free', 'no obstacles')
+            return self.boat.bearing, self.boat.vel
+        upsilon = np.array([self.boat.u, self.boat.v, self.boat.r])
+        eta = np.array([self.boat.ned_x, self.boat.ned_y, self.boat.yaw])
+        reach = 2*self.u_max*self.dynamic_window.horizon
+        target_x = self.boat.ned_x + reach*math.cos(self.boat.bearing)
+        target_y = self.boat.ned_y + reach*math.sin(self.boat.bearing)
+        vel, bearing, clearance = self.dynamic_window.plan(upsilon, eta,
+            self.obs.ned_x, self.obs.ned_y, self.obs.total_radius,
+            target_x, target_y, self.boat.bearing, self.boat.vel)
+        if clearance <= 0:
+            self.log.warn('dw_blocked', 'no collision free command, clearance %.2f', clearance)
+        self.log.debug('dw', 'speed: %.3f heading: %.3f clearance: %.2f', vel, bearing, clearance)
+        self.boat.bearing = bearing
+        self.boat.vel = vel
+        return self.boat.bearing, self.boat.vel
+
+    def get_collision(self, ppx, ppy, vel_ppy, vel_ppx):
         '''
         @name: get_collision
-        @brief: Calculates if there is an impending collision with an obstacle.
+        @brief: Calculates if there is an impending collision with each
+          obstacle, and the angle needed to avoid the colliding ones.
         @param: ppx: boat parallel path position x
                 ppy: boat parallel path position y
                 vel_ppy: boat parallel path velocity y
                 vel_ppx: boat parallel path velocity x
-                i: obstacle index
-        @return: collision: 1 = collision 0 = non-collision
-                 distance: distance to obstacle
+        @return: collision: array, 1 = collision 0 = non-collision
+                 distance: distance to each obstacle
+                 distance_free: distance to each obstacle edge
         '''
-        collision = 0
-        #print("Total Radius: " + str(total_radius))
-        x_pow = pow(self.obs_list[i].x - ppx,2) 
-        y_pow = pow(self.obs_list[i].y - ppy,2) 
-        distance = pow((x_pow + y_pow),0.5)
+        collision, distance, distance_free = self.obs.collision_cone(ppx, ppy, vel_ppx, vel_ppy)
+        if np.any(distance_free < 0):
+            self.log.warn('crash', 'CRASH')
+        if np.any(collision):
+            self.log.debug('collision', 'COLLISION: %s alpha: %s teta: %s',
+                           self.obs.track_id[collision], self.obs.alpha[collision],
+                           self.obs.teta[collision])
+        return collision, distance, distance_free
 
-        distance_free = distance - self.obs_list[i].total_radius
-        print("Distance_free: " + str(distance_free))
-
-        if distance < self.obs_list[i].total_radius:
-            rospy.logwarn("CRASH")
-        alpha_params = (self.obs_list[i].total_radius/distance)
-        alpha = math.asin(alpha_params)
-        beta = math.atan2(vel_ppy,vel_ppx)-math.atan2(self.obs_list[i].y-ppy,self.obs_list[i].x-ppx)
-        if beta > math.pi: 
-            beta = beta - 2*math.pi
-        if beta < - math.pi: 
-            beta = beta + 2*math.pi
-        beta = abs(beta)
-        if beta <= alpha or 1 == self.obs_list[i].collision_flag:
-            #print('beta: ' + str(beta))
-            #print('alpha: ' + str(alpha))
-            print("COLLISION")
-            collision = 1
-            self.obs_list[i].collision_flag = 1
-            self.calculate_avoid_angle(ppy, distance, ppx, i)
-            #self.get_velocity(distance_free, i)
-        else:
-            #self.obs_list[i].collision_flag = 0
-            self.obs_list[i].tetha = 0
-        self.get_velocity(distance_free, i)
-        return collision, distance
-
-    def calculate_avoid_angle(self, ppy, distance, ppx, i):
-        '''
-        @name: calculate_avoid_angle
-        @brief: Calculates angle needed to avoid obstacle
-        @param: ppy: boat y coordiante in path reference frame 
-                distance: distance from center of boat to center of obstacle 
-                ppx: boat x coordiante in path reference frame 
-                i: osbtacle index
-        @return: --
-        '''
-        #print("ppx: " + str(ppx) + " obs: " + str(self.obs_list[i].x))
-        #print("ppy: " + str(ppy) + " obs: " + str(self.obs_list[i].y))
-        self.obs_list[i].total_radius = self.obs_list[i].total_radius + .30
-        tangent_param = abs((distance - self.obs_list[i].total_radius) * (distance + self.obs_list[i].total_radius))
-        #print("distance: " + str(distance))
-        tangent = pow(tangent_param, 0.5)
-        #print("tangent: " + str(tangent))
-        teta = math.atan2(self.obs_list[i].total_radius,tangent)
-        #print("teta: " + str(teta))
-        gamma1 = math.asin(abs(ppy-self.obs_list[i].y)/distance)
-        #print("gamma1: " + str(gamma1))
-        gamma = ((math.pi/2) - teta) + gamma1
-        #print("gamma: " + str(gamma))
-        self.obs_list[i].alpha = (math.pi/2) - gamma
-        print("alpha: " + str(self.obs_list[i].alpha))
-        hb = abs(ppy-self.obs_list[i].y)/math.cos(self.obs_list[i].alpha)
-        #print("hb: " + str(hb))
-        b = self.obs_list[i].total_radius - hb
-        #print("i: " + str(i))
-        print("b: " + str(b))
-        self.obs_list[i].teta = math.atan2(b,tangent)
-        print("teta: " + str(self.obs_list[i].teta))
-        if self.obs_list[i].alpha < 0.0:
-            self.obs_list[i].collision_flag = 0
-            sys.stdout.write(Color.BOLD)
-            print("Collision flag off")
-            sys.stdout.write(Color.RESET)
-
-    def get_velocity(self, distance_free, i):
+    def get_velocity(self, distance_free):
         '''
         @name: get_velocity
-        @brief: Calculates velocity needed to avoid obstacle
-        @param: distance_free: distance to collision  
-                i: osbtacle index
-        @return: --
+        @brief: Calculates velocity needed to avoid each obstacle
+        @param: distance_free: distance to collision
+        @return: vel_list: velocity for each obstacle
         '''
-        u_r_obs = 1/(1 + math.exp(-self.exp_gain*(distance_free*(1/5) - self.exp_offset)))
-        u_psi_obs = 1/(1 + math.exp(self.exp_gain*(abs(self.obs_list[i].teta)*self.chi_psi -self.exp_offset)))
-        #print("u_r_obs: " + str( u_r_obs))
-        #print("u_psi_obs" + str(u_psi_obs))
-        #print("Vel chosen: " + str(np.min([self.u_psi, self.u_r, u_r_obs, u_psi_obs])))
-        self.vel_list.append((self.u_max - self.u_min)*np.min([self.u_psi, self.u_r, u_r_obs, u_psi_obs]) + self.u_min)
+        u_r_obs = 1/(1 + np.exp(-self.exp_gain*(distance_free*(1/5) - self.exp_offset)))
+        u_psi_obs = 1/(1 + np.exp(self.exp_gain*(np.abs(self.obs.teta)*self.chi_psi -self.exp_offset)))
+        u_obs = np.minimum(np.minimum(self.u_psi, self.u_r), np.minimum(u_r_obs, u_psi_obs))
+        return (self.u_max - self.u_min)*u_obs + self.u_min
 
-    def calculate_avoid_distance(self, vel_ppx, vel_ppy, i):
+    def calculate_avoid_distance(self, vel_ppx, vel_ppy):
         '''
         @name: calculate_avoid_distance
         @brief: Calculates distance at wich it is necesary to leave path to 
-            avoid obstacle
+            avoid each obstacle
         @param: vel_ppx: boat velocity x  in path reference frame 
                 vel_ppy: boat velocity y  in path reference frame 
-                i: obstacle index
         @return: avoid_distance: returns distance at wich it is necesary to 
-            leave path to avoid obstacle
+            leave path to avoid each obstacle
         '''
-        time = (self.obs_list[i].teta/self.r_max) + 3
-        #print("time: " + str(time))
-        eucledian_vel = pow((pow(vel_ppx,2) + pow(vel_ppy,2)),0.5)
-        #print("vel: " + str(eucledian_vel))
-        #print("self.boat.vel: " + str(self.boat.vel))
-        #avoid_distance = time * eucledian_vel + total_radius +.3
-        avoid_distance = time * self.boat.vel + self.obs_list[i].total_radius +.3 #+.5
+        time = (self.obs.teta/self.r_max) + 3
+        avoid_distance = time * self.boat.vel + self.obs.total_radius +.3 #+.5
         return (avoid_distance)
 
     def get_obstacle(self, ak, x1, y1, i):
@@ -366,10 +295,10 @@ class CollisionAvoidance:
         '''
         # NED obstacles
         if (self.obstacle_mode == 0):
-            obs_ppx,obs_ppy = self.ned_to_pp(ak,x1,y1,self.obs_list[i].x,self.obs_list[i].y)
+            obs_ppx,obs_ppy = self.ned_to_pp(ak,x1,y1,self.obs.x[i],self.obs.y[i])
         # Body obstacles
         if (self.obstacle_mode == 1):
-            obs_nedx, obs_nedy = self.body_to_ned(self.obs_list[i].x, self.obs_list[i].y, self.boat.ned_x, self.boat.ned_y)
+            obs_nedx, obs_nedy = self.body_to_ned(self.obs.x[i], self.obs.y[i], self.boat.ned_x, self.boat.ned_y)
             obs_ppx,obs_ppy = self.ned_to_pp(ak, x1, y1, obs_nedx, obs_nedy)
         return(obs_ppx, obs_ppy)
 
@@ -393,19 +322,15 @@ class CollisionAvoidance:
             #print("vel y: " + str(vel_ppy))
             #print("obs_y: " + str(obs_y))
             # obstacle in center, this is to avoid shaky behaivor
-            if abs(self.obs_list[i].y) < 0.1:
+            if abs(self.obs.y[i]) < 0.1:
                 angle_difference = self.boat.bearing - self.boat.yaw
                 #print("angle diference: " + str(angle_difference))
                 if 0.1 > abs(angle_difference) or 0 > (angle_difference):
-                    self.boat.bearing = self.boat.yaw - self.obs_list[i].teta
-                    sys.stdout.write(Color.RED)
-                    print("center left -")
-                    sys.stdout.write(Color.RESET)
+                    self.boat.bearing = self.boat.yaw - self.obs.teta[i]
+                    self.log.debug('dodge_side', 'center left -')
                 else:
-                    self.boat.bearing = self.boat.yaw + self.obs_list[i].teta
-                    sys.stdout.write(Color.GREEN)
-                    print("center right +")
-                    sys.stdout.write(Color.RESET)
+                    self.boat.bearing = self.boat.yaw + self.obs.teta[i]
+                    self.log.debug('dodge_side', 'center right +')
             else:
                 eucledian_pos = pow((pow(obs_ppx - ppx,2) + pow(obs_ppy - ppy,2)),0.5)
                 #print("eucledian_vel " + str(eucledian_vel))
@@ -415,19 +340,15 @@ class CollisionAvoidance:
                 #print("unit_vely " + str(unit_vely))
                 #print("unit_posy: " + str(unit_posy))
                 if unit_vely <= unit_posy:
-                    self.boat.bearing = self.boat.yaw - self.obs_list[i].teta
-                    sys.stdout.write(Color.RED)
-                    print("left -")
-                    sys.stdout.write(Color.RESET)
+                    self.boat.bearing = self.boat.yaw - self.obs.teta[i]
+                    self.log.debug('dodge_side', 'left -')
                     '''
                     if (abs(self.avoid_angle) > (math.pi/2)):
                         self.avoid_angle = -math.pi/2
                     '''
                 else:
-                    self.boat.bearing = self.boat.yaw + self.obs_list[i].teta
-                    sys.stdout.write(Color.GREEN)
-                    print("right +")
-                    sys.stdout.write(Color.RESET)
+                    self.boat.bearing = self.boat.yaw + self.obs.teta[i]
+                    self.log.debug('dodge_side', 'right +')
                     '''
                     if (abs(self.avoid_angle) > (math.pi/3)):
                         self.avoid_angle = math.pi/2
@@ -452,12 +373,7 @@ class CollisionAvoidance:
         @return: ned_x2: target x coordinate in ned reference frame
                  ned_y2: target y coordinate in ned reference frame
         '''
-        p = np.array([x2, y2])
-        J = np.array([[math.cos(self.boat.yaw), -1*math.sin(self.boat.yaw)],
-                      [math.sin(self.boat.yaw), math.cos(self.boat.yaw)]])
-        n = J.dot(p)
-        ned_x2 = n[0] + offsetx
-        ned_y2 = n[1] + offsety
+        ned_x2, ned_y2 = frames.body_to_ned((x2, y2), offsetx, offsety, self.boat.yaw)
         return (ned_x2, ned_y2)
 
     def ned_to_pp(self, ak, ned_x1, ned_y1, ned_x2, ned_y2):
@@ -474,11 +390,5 @@ class CollisionAvoidance:
         @return: pp_x2: target x coordinate in parallel path reference frame
                  pp_y2: target y coordinate in parallel path reference frame
         '''
-        n = np.array([ned_x2 - ned_x1, ned_y2 - ned_y1])
-        J = np.array([[math.cos(ak), -1*math.sin(ak)],
-                      [math.sin(ak), math.cos(ak)]])
-        J = np.linalg.inv(J)
-        pp = J.dot(n)
-        pp_x2 = pp[0]
-        pp_y2 = pp[1]
+        pp_x2, pp_y2 = frames.ned_to_path((ned_x2, ned_y2), ak, ned_x1, ned_y1)
         return (pp_x2, pp_y2)
\ No newline at end of file
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+----------------------------------------------------------
+    @file: collision_cone_benchmark.py
+    @date: Mon Oct 19, 2026
+    @brief: Measures the cost of the collision avoidance obstacle
+      evaluation from 1 to 1000 obstacles, comparing the former per
+      obstacle CollisionAvoidance methods against the vectorized
+      ObstacleTable.collision_cone kernel. Does not need a ROS master.
+      The kernel resets teta of the obstacles out of collision, which the
+      former code meant to do but never did (it set a misspelled tetha);
+      the check reports the obstacles where this changes the result.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import math
+import timeit
+
+import numpy as np
+from usv_control import obstacles
+
+SIZES = [1, 10, 100, 1000]
+SEED = 3
+TOLERANCE = 1e-12
+
+# CollisionAvoidance parameters used by los_ca
+EXP_OFFSET = 0.5
+EXP_GAIN = 10
+CHI_PSI = 2/math.pi
+U_MAX = 1.0
+U_MIN = 0.3
+R_MAX = 0.4
+U_PSI = 0
+U_R = 0
+SPEED = 0.7
+
+
+def make_table(n, rng):
+    '''
+    @name: make_table
+    @brief: Random obstacle field ahead of the boat, half of it already
+      flagged as colliding.
+    @param: n: number of obstacles
+            rng: random generator
+    @return: table: obstacle table
+    '''
+    table = obstacles.ObstacleTable()
+    x = rng.uniform(2, 30, n)
+    y = rng.uniform(-10, 10, n)
+    radius = rng.uniform(0.1, 0.8, n)
+    table.update(x, y, radius, x, y)
+    table.total_radius[:] = 0.5 + 0.3 + table.radius
+    table.collision_flag[:] = rng.randint(0, 2, n)
+    return table
+
+
+def scalar_avoid(table, vel_ppx, vel_ppy):
+    '''
+    @name: scalar_avoid
+    @brief: Former get_collision, calculate_avoid_angle, get_velocity and
+      calculate_avoid_distance math, one obstacle at a time.
+    @return: nearest_obs: avoid distance left for each obstacle
+             vel_list: velocity for each obstacle
+             collision: impending collision with each obstacle
+    '''
+    ppx = 0
+    ppy = 0
+    nearest_obs = []
+    vel_list = []
+    collisions = []
+    for i in range(len(table)):
+        collision = 0
+        x_pow = pow(table.x[i] - ppx,2)
+        y_pow = pow(table.y[i] - ppy,2)
+        distance = pow((x_pow + y_pow),0.5)
+        distance_free = distance - table.total_radius[i]
+        alpha = math.asin(table.total_radius[i]/distance)
+        beta = math.atan2(vel_ppy,vel_ppx)-math.atan2(table.y[i]-ppy,table.x[i]-ppx)
+        if beta > math.pi:
+            beta = beta - 2*math.pi
+        if beta < - math.pi:
+            beta = beta + 2*math.pi
+        beta = abs(beta)
+        if beta <= alpha or 1 == table.collision_flag[i]:
+            collision = 1
+            table.collision_flag[i] = 1
+            table.total_radius[i] = table.total_radius[i] + .30
+            tangent_param = abs((distance - table.total_radius[i]) * (distance + table.total_radius[i]))
+            tangent = pow(tangent_param, 0.5)
+            teta = math.atan2(table.total_radius[i],tangent)
+            gamma1 = math.asin(abs(ppy-table.y[i])/distance)
+            gamma = ((math.pi/2) - teta) + gamma1
+            table.alpha[i] = (math.pi/2) - gamma
+            hb = abs(ppy-table.y[i])/math.cos(table.alpha[i])
+            b = table.total_radius[i] - hb
+            table.teta[i] = math.atan2(b,tangent)
+            if table.alpha[i] < 0.0:
+                table.collision_flag[i] = 0
+        else:
+            # Former code: self.obs_list[i].tetha = 0, teta was kept
+            pass
+        u_r_obs = 1/(1 + math.exp(-EXP_GAIN*(distance_free*(1/5) - EXP_OFFSET)))
+        u_psi_obs = 1/(1 + math.exp(EXP_GAIN*(abs(table.teta[i])*CHI_PSI -EXP_OFFSET)))
+        vel_list.append((U_MAX - U_MIN)*np.min([U_PSI, U_R, u_r_obs, u_psi_obs]) + U_MIN)
+        if collision:
+            avoid_distance = ((table.teta[i]/R_MAX) + 3) * SPEED + table.total_radius[i] +.3
+            nearest_obs.append(avoid_distance - distance)
+        else:
+            nearest_obs.append(0)
+        collisions.append(collision == 1)
+    return (np.array(nearest_obs), np.array(vel_list), np.array(collisions, dtype=bool))
+
+
+def vectorized_avoid(table, vel_ppx, vel_ppy):
+    '''
+    @name: vectorized_avoid
+    @brief: CollisionAvoidance.avoid math on the whole table at once.
+    @return: nearest_obs: avoid distance left for each obstacle
+             vel_list: velocity for each obstacle
+             collision: impending collision with each obstacle
+    '''
+    collision, distance, distance_free = table.collision_cone(0, 0, vel_ppx, vel_ppy)
+    u_r_obs = 1/(1 + np.exp(-EXP_GAIN*(distance_free*(1/5) - EXP_OFFSET)))
+    u_psi_obs = 1/(1 + np.exp(EXP_GAIN*(np.abs(table.teta)*CHI_PSI -EXP_OFFSET)))
+    u_obs = np.minimum(np.minimum(U_PSI, U_R), np.minimum(u_r_obs, u_psi_obs))
+    vel_list = (U_MAX - U_MIN)*u_obs + U_MIN
+    avoid_distance = ((table.teta/R_MAX) + 3) * SPEED + table.total_radius +.3
+    return (np.where(collision, avoid_distance - distance, 0), vel_list, collision)
+
+
+def copy_table(table):
+    '''
+    @name: copy_table
+    @brief: Independent copy of an obstacle table.
+    @param: table: obstacle table
+    @return: table copy
+    '''
+    copy = obstacles.ObstacleTable()
+    copy.__dict__.update(dict((k, np.copy(v)) for k, v in table.__dict__.items()))
+    return copy
+
+
+def main():
+    rng = np.random.RandomState(SEED)
+    vel_ppx, vel_ppy = 1.0, 0.1
+
+    # Both implementations must take the same decisions. numpy and math
+    # transcendental functions may round the last bit differently, so the
+    # angles are compared to within TOLERANCE. A second evaluation with
+    # another heading lets obstacles leave the collision cone: there the
+    # former code kept a stale teta, which lowers their speed, and the
+    # kernel resets it to 0
+    for n in SIZES:
+        table = make_table(n, rng)
+        scalar = copy_table(table)
+        stale_count = 0
+        for velocity in [(vel_ppx, vel_ppy), (0.2, 1.0)]:
+            old = scalar_avoid(scalar, *velocity)
+            new = vectorized_avoid(table, *velocity)
+            assert np.array_equal(old[2], new[2])
+            assert np.array_equal(old[0] > 0, new[0] > 0)
+            assert np.array_equal(np.argmax(old[0]), np.argmax(new[0]))
+            assert np.array_equal(scalar.collision_flag, table.collision_flag)
+            assert np.array_equal(scalar.total_radius, table.total_radius)
+            stale = ~new[2] & (scalar.teta != 0)
+            assert not table.teta[stale].any()
+            stale_count += np.count_nonzero(stale)
+            same = ~stale
+            for old_column, new_column in [(old[0], new[0]), (old[1][same], new[1][same]),
+                                           (scalar.alpha, table.alpha),
+                                           (scalar.teta[same], table.teta[same])]:
+                assert np.allclose(old_column, new_column, rtol=0, atol=TOLERANCE)
+            # The next evaluation starts from the same teta in both
+            scalar.teta[stale] = 0
+        print("%4d obstacles: %d kept a stale teta in the former code" % (n, stale_count))
+
+    for n in SIZES:
+        table = make_table(n, rng)
+        number = max(10, 10000//n)
+        t_scalar = timeit.timeit(lambda: scalar_avoid(copy_table(table), vel_ppx, vel_ppy),
+                                 number=number)
+        t_vector = timeit.timeit(lambda: vectorized_avoid(copy_table(table), vel_ppx, vel_ppy),
+                                 number=number)
+        print("%4d obstacles: scalar %9.1f us  vectorized %7.1f us  speedup %6.1fx"
+              % (n, 1e6*t_scalar/number, 1e6*t_vector/number, t_scalar/t_vector))
+
+if __name__ == "__main__":
+    main()
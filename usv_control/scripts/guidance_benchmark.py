@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+----------------------------------------------------------
+    @file: guidance_benchmark.py
+    @date: Mon Oct 19, 2026
+    @brief: Measures the per-tick cost of the LOS guidance law, comparing
+      the per-tick trigonometry of the former LOS.los implementation
+      against the segment geometry precomputed by usv_control.guidance.
+      Does not need a ROS master.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import math
+import timeit
+
+import numpy as np
+from usv_control import guidance
+
+TICKS = 100000
+
+
+def legacy_los(los, x1, y1, x2, y2, ned_x, ned_y, yaw, distance):
+    '''
+    @name: legacy_los
+    @brief: Former LOS.los math, recomputing the segment trigonometry.
+    @return: bearing: desired heading
+             vel: desired speed
+    '''
+    ak = math.atan2(y2 - y1, x2 - x1)
+    ye = -(ned_x - x1)*math.sin(ak) + (ned_y - y1)*math.cos(ak)
+    xe = (ned_x - x1)*math.cos(ak) + (ned_y - y1)*math.sin(ak)
+    x_total = (x2 - x1)*math.cos(ak) + (y2 - y1)*math.sin(ak)
+    if xe > x_total:
+        ak = ak - math.pi
+        if (abs(ak) > (math.pi)):
+            ak = (ak/abs(ak))*(abs(ak) - 2*math.pi)
+        ye = -(ned_x - x1)*math.sin(ak) + (ned_y - y1)*math.cos(ak)
+        xe = (ned_x - x1)*math.cos(ak) + (ned_y - y1)*math.sin(ak)
+    delta = (los.delta_max - los.delta_min)*math.exp(-(1/los.gamma)*abs(ye)) + los.delta_min
+    psi_r = math.atan(-ye/delta)
+    bearing = ak + psi_r
+    if (abs(bearing) > (math.pi)):
+        bearing = (bearing/abs(bearing))*(abs(bearing) - 2*math.pi)
+    e_psi = bearing - yaw
+    abs_e_psi = abs(e_psi)
+    if (abs_e_psi > (math.pi)):
+        e_psi = (e_psi/abs_e_psi)*(abs_e_psi - 2*math.pi)
+        abs_e_psi = abs(e_psi)
+    u_psi = 1/(1 + math.exp(los.exp_gain*(abs_e_psi*los.chi_psi - los.exp_offset)))
+    u_r = 1/(1 + math.exp(-los.exp_gain*(distance*los.chi_r - los.exp_offset)))
+    vel = (los.u_max - los.u_min)*np.min([u_psi, u_r]) + los.u_min
+    return (bearing, vel)
+
+
+def cached_los(los, segment, ned_x, ned_y, yaw, distance):
+    '''
+    @name: cached_los
+    @brief: LOS math on a segment with precomputed geometry.
+    @return: bearing: desired heading
+             vel: desired speed
+    '''
+    ak, xe, ye = los.track_errors(segment, ned_x, ned_y)
+    bearing, delta = los.bearing(ak, ye)
+    return (bearing, los.speed(bearing, yaw, distance))
+
+
+def main():
+    los = guidance.LineOfSight()
+    path = guidance.WaypointPath([0, 0, 10, 5, 20, -3])
+    segment = path.segment(1)
+
+    # Both implementations must agree, including past the segment end
+    for ned_x, ned_y in [(1, 2), (4, -1), (12, 7), (-3, 0.5)]:
+        old = legacy_los(los, 0, 0, 10, 5, ned_x, ned_y, 0.3, 4)
+        new = cached_los(los, segment, ned_x, ned_y, 0.3, 4)
+        assert np.allclose(old, new), (old, new)
+
+    t_legacy = timeit.timeit(lambda: legacy_los(los, 0, 0, 10, 5, 4, -1, 0.3, 4),
+                             number=TICKS)
+    t_cached = timeit.timeit(lambda: cached_los(los, segment, 4, -1, 0.3, 4),
+                             number=TICKS)
+    print("legacy LOS tick: %.2f us" % (1e6*t_legacy/TICKS))
+    print("cached LOS tick: %.2f us" % (1e6*t_cached/TICKS))
+    print("speedup: %.2fx" % (t_legacy/t_cached))
+
+if __name__ == "__main__":
+    main()
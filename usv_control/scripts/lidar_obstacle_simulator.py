@@ -16,7 +16,6 @@
 ----------------------------------------------------------
 '''
 
-import math
 import time
 import os
 
@@ -24,6 +23,7 @@ import numpy as np
 import rospy
 from geometry_msgs.msg import Pose2D
 from geometry_msgs.msg import Vector3
+from usv_control import frames
 from usv_perception.msg import obj_detected
 from usv_perception.msg import obj_detected_list
 from usv_perception.msg import obstacles_list
@@ -64,21 +64,16 @@ class ObstacleSimulator:
         '''
         object_detected_list = obstacles_list()
         list_length = 0
-        for i in range(len(self.obstacle_list)):
-            x = self.obstacle_list[i]['X'] + 1.5
-            y = self.obstacle_list[i]['Y'] - 4.0
-            delta_x = x - self.ned_x
-            delta_y = y - self.ned_y
-            distance = math.pow(delta_x*delta_x + delta_y*delta_y, 0.5)
-            if (distance < self.max_visible_radius):
-                x, y = self.ned_to_body(x, y)
-                #if x > -0.5:
-                obstacle = Vector3()
-                obstacle.x = x 
-                obstacle.y = -y
-                obstacle.z = self.obstacle_list[i]['R']
-                list_length += 1
-                object_detected_list.obstacles.append(obstacle)
+        ned = np.array([[obstacle['X'] + 1.5, obstacle['Y'] - 4.0] for obstacle in self.obstacle_list]).reshape(-1, 2)
+        distance = np.hypot(ned[:, 0] - self.ned_x, ned[:, 1] - self.ned_y)
+        body = frames.ned_to_body(ned, self.ned_x, self.ned_y, self.yaw)
+        for i in np.nonzero(distance < self.max_visible_radius)[0]:
+            obstacle = Vector3()
+            obstacle.x = body[i, 0]
+            obstacle.y = -body[i, 1]
+            obstacle.z = self.obstacle_list[i]['R']
+            list_length += 1
+            object_detected_list.obstacles.append(obstacle)
         object_detected_list.len = list_length
         self.detector_pub.publish(object_detected_list)
 
@@ -92,11 +87,7 @@ class ObstacleSimulator:
         @return: ned_x2: target x coordinate in ned reference frame
                  ned_y2: target y coordinate in ned reference frame
         '''
-        p = np.array([x2, y2])
-        J = self.rotation_matrix(self.yaw)
-        n = J.dot(p)
-        ned_x2 = n[0] + self.ned_x
-        ned_y2 = n[1] + self.ned_y
+        ned_x2, ned_y2 = frames.body_to_ned((x2, y2), self.ned_x, self.ned_y, self.yaw)
         return (ned_x2, ned_y2)
 
     def ned_to_body(self, ned_x2, ned_y2):
@@ -108,25 +99,9 @@ class ObstacleSimulator:
         @return: body_x2: target x coordinate in body reference frame
                 body_y2: target y coordinate in body reference frame
         '''
-        n = np.array([ned_x2 - self.ned_x, ned_y2 - self.ned_y])
-        J = self.rotation_matrix(self.yaw)
-        J = np.linalg.inv(J)
-        b = J.dot(n)
-        body_x2 = b[0]
-        body_y2 = b[1]
+        body_x2, body_y2 = frames.ned_to_body((ned_x2, ned_y2), self.ned_x, self.ned_y, self.yaw)
         return (body_x2, body_y2)
 
-    def rotation_matrix(self, angle):
-        '''
-        @name: rotation_matrix
-        @brief: Transformation matrix template.
-        @param: angle: angle of rotation
-        @return: J: transformation matrix
-        '''
-        J = np.array([[math.cos(angle), -1*math.sin(angle)],
-                      [math.sin(angle), math.cos(angle)]])
-        return (J)
-
     def rviz_markers(self):
         '''
         @name: rviz_markers
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+----------------------------------------------------------
+    @file: los_bc.py
+    @date: Mon Oct 19, 2026
+    @brief: LOS guidance (optionally with collision avoidance) and the
+      backstepping controller in a single node. The desired speed and
+      heading are passed to the controller in memory within the same loop
+      iteration; the guidance topics are still published for monitoring.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import rospy
+from usv_control import event_loop
+
+import bc
+import los
+import los_ca
+
+NODE_NAME_THIS = 'los_bc'
+
+
+def main():
+    rospy.init_node(NODE_NAME_THIS, anonymous=False)
+    rate = rospy.Rate(100) # 100hz
+    collision_avoidance = rospy.get_param('~collision_avoidance', False)
+    # Guidance runs every guidance_divider control iterations
+    guidance_divider = rospy.get_param('~guidance_divider', 10 if collision_avoidance else 1)
+    event_driven = rospy.get_param('~event_driven', False)
+
+    if collision_avoidance:
+        guidance = los_ca.LOS()
+    else:
+        guidance = los.LOS()
+    C = bc.Controller(guidance_topics=False)
+    for telemetry in (guidance.recorder, C.recorder):
+        if telemetry is not None:
+            rospy.on_shutdown(telemetry.close)
+
+    # One trigger for both, fed by the guidance and controller pose callbacks
+    trigger = event_loop.EventTrigger(rospy.get_param('~min_period', 0.01),
+        rospy.get_param('~stale_timeout', 0.5), ('ned_pose', 'local_vel', 'ins_pose'))
+    guidance.trigger = trigger
+    C.trigger = trigger
+
+    iteration = 0
+    while not rospy.is_shutdown() and guidance.active and C.activated:
+        if event_driven:
+            trigger.wait()
+            stale = trigger.stale()
+            if stale:
+                rospy.logwarn_throttle(1, 'LOS-BC stale inputs: ' + ', '.join(stale))
+                C.right_thruster_pub.publish(0)
+                C.left_thruster_pub.publish(0)
+                continue
+        if iteration % guidance_divider == 0 and guidance.manager.update():
+            guidance.los_manager()
+        iteration += 1
+        C.run(guidance.desired_speed, guidance.desired_heading)
+        if event_driven:
+            C.latency_pub.publish(trigger.complete())
+        else:
+            rate.sleep()
+    guidance.desired(0, guidance.yaw)
+    C.run(0, guidance.yaw)
+    rospy.logwarn('Finished')
+    rospy.spin()
+
+if __name__ == "__main__":
+    try:
+        main()
+    except rospy.ROSInterruptException:
+        pass
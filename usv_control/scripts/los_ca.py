@@ -20,13 +20,16 @@ import math
 import os
 import time
 
-import numpy as np
 import rospy
 from geometry_msgs.msg import Pose2D, Vector3
 from std_msgs.msg import Float32MultiArray, Float64
+from usv_control import debug_log, event_loop, geodesy, guidance, recorder, smoothing
 from usv_perception.msg import obstacles_list
 import ca
 
+TELEMETRY_FIELDS = ('k', 'ned_x', 'ned_y', 'yaw', 'ye', 'distance',
+                    'desired_speed', 'desired_heading')
+
 # Class definition
 class LOS:
     def __init__(self):
@@ -43,16 +46,13 @@ class LOS:
 
         self.reference_latitude = 0
         self.reference_longitude = 0
-
-        self.waypoint_array = []
-        self.last_waypoint_array = []
+        self.geodetic_mode = rospy.get_param('~geodetic_mode', 'haversine') # 'haversine', 'flat' or 'ecef'
+        self.geodetic_reference = geodesy.GeodeticReference(0, 0, self.geodetic_mode)
 
         self.delta_max = 5
         self.delta_min = 0.5
         self.gamma = 0.5
 
-        self.k = 1
-
         self.u_max = 1
         self.u_min = 0.3
         self.threshold_radius = 5
@@ -61,21 +61,48 @@ class LOS:
         self.exp_gain = 10
         self.exp_offset = 0.5
 
+        self.los_guidance = guidance.LineOfSight(self.delta_max, self.delta_min,
+            self.gamma, self.u_max, self.u_min, self.threshold_radius,
+            self.exp_gain, self.exp_offset)
+
         self.waypoint_path = Pose2D()
         self.ye = 0
 
-        self.waypoint_mode = 0 # 0 for NED, 1 for GPS, 2 for body
-
         self.obstacles = []
         self.safety_radius = 0.0
         self.boat_radius = 0.5
         self.r_max = 1 #rad/sec
         self.obstacle_mode = 1 # 0 for NED, 1 for Body
+        self.avoidance_mode = 0 # 0 for collision cone, 1 for velocity obstacles, 2 for dynamic window
+        self.obstacles_stamp = None
         self.ca_obj = ca.CollisionAvoidance(self.exp_offset, self.safety_radius, 
             self.u_max, self.u_min, self.exp_gain, self.chi_psi, self.r_max, 
-            self.obstacle_mode)
+            self.obstacle_mode, self.avoidance_mode)
         self.boat = ca.Boat(self.boat_radius)
+
+        # Corners rounded to the turn radius at u_max
+        self.path_smoothing = rospy.get_param('~path_smoothing', False)
+        self.turn_rate_max = rospy.get_param('~turn_rate_max', 0.15) #rad/sec sustained by bc
+        self.smoothing_radius = smoothing.turn_radius(self.u_max, self.turn_rate_max)
+        # Speed cap along the path from its curvature and the bc.py uamax
+        self.use_speed_profile = rospy.get_param('~speed_profile', False)
+        self.acceleration_max = rospy.get_param('~acceleration_max', 0.2)
+        self.speed_cap = None
+        self.manager = guidance.WaypointManager(
+            self.smoothing_radius if self.path_smoothing else 0,
+            dict(u_max=self.u_max, u_min=self.u_min, r_max=self.turn_rate_max,
+                 a_max=self.acceleration_max) if self.use_speed_profile else None,
+            debug_log.RingLogger('los_ca', sink=debug_log.rospy_sink))
          
+        # Telemetry ring file, relative to ROS_HOME; '' disables it
+        telemetry = rospy.get_param('~guidance_telemetry', 'los_ca_telemetry.npy')
+        self.recorder = recorder.Recorder(telemetry, TELEMETRY_FIELDS) if telemetry else None
+
+        # Event driven mode: guidance runs on every NED pose sample
+        self.event_driven = rospy.get_param('~event_driven', False)
+        self.trigger = event_loop.EventTrigger(rospy.get_param('~min_period', 0.01),
+            rospy.get_param('~stale_timeout', 0.5), ('ned_pose',))
+
         # ROS Subscribers
         rospy.Subscriber("/vectornav/ins_2d/NED_pose", Pose2D, self.ned_callback)
         rospy.Subscriber("/vectornav/ins_2d/ins_ref", Pose2D, self.gpsref_callback)
@@ -88,11 +115,13 @@ class LOS:
         self.d_heading_pub = rospy.Publisher("/guidance/desired_heading", Float64, queue_size=10)
         self.target_pub = rospy.Publisher("/usv_control/los/target", Pose2D, queue_size=10)
         self.ye_pub = rospy.Publisher("/usv_control/los/ye", Float64, queue_size=10)
+        self.pose_stamp_pub = rospy.Publisher("/guidance/pose_stamp", Float64, queue_size=10)
 
     def ned_callback(self, gps):
         self.ned_x = gps.x
         self.ned_y = gps.y
         self.yaw = gps.theta
+        self.trigger.notify('ned_pose')
 
     def local_vel_callback(self, upsilon):
         self.u = upsilon.x
@@ -102,160 +131,75 @@ class LOS:
     def gpsref_callback(self, gps):
         self.reference_latitude = gps.x
         self.reference_longitude = gps.y
+        self.geodetic_reference = geodesy.GeodeticReference(
+            self.reference_latitude, self.reference_longitude, self.geodetic_mode)
 
     def waypoints_callback(self, msg):
-        waypoints = []
-        leng = (msg.layout.data_offset)
-
-        for i in range(int(leng)-1):
-            waypoints.append(msg.data[i])
-        self.waypoint_mode = msg.data[-1] # 0 for NED, 1 for GPS, 2 for body
-        self.waypoint_array = waypoints
+        leng = int(msg.layout.data_offset)
+        self.manager.load(msg.data[:leng], self.ned_x, self.ned_y, self.yaw,
+                          self.geodetic_reference)
 
     def obstacles_callback(self, data):
+        self.obstacles_stamp = rospy.get_time()
         self.obstacles = []
         for i in range(data.len):
             self.obstacles.append({'X' : data.obstacles[i].x , #- self.offset,
                                    'Y' : data.obstacles[i].y ,
                                  'radius' : data.obstacles[i].z})
-    def los_manager(self, listvar):
+    def los_manager(self):
         '''
         @name: los_manager
         @brief: Waypoint manager to execute the LOS algorithm.
-        @param: listvar: list of variable waypoints
+        @param: --
         @return: --
         '''
-        if self.k < len(listvar)/2:
-            x1 = listvar[2*self.k - 2]
-            y1 = listvar[2*self.k - 1]
-            x2 = listvar[2*self.k]
-            y2 = listvar[2*self.k + 1]
-            self.waypoint_path.x = x2
-            self.waypoint_path.y = y2
+        segment, ye, self.distance, self.speed_cap = self.manager.step(self.ned_x, self.ned_y)
+        if segment is not None:
+            self.waypoint_path.x = segment.x2
+            self.waypoint_path.y = segment.y2
             self.target_pub.publish(self.waypoint_path)
-            x_squared = math.pow(x2 - self.ned_x, 2)
-            y_squared = math.pow(y2 - self.ned_y, 2)
-            self.distance = math.pow(x_squared + y_squared, 0.5)
-
-            if self.distance > 1:
-                self.los(x1, y1, x2, y2)
-            else:
-                self.k += 1
+            self.los(segment, ye)
         else:
             self.desired(0, self.yaw)
 
-    def los(self, x1, y1, x2, y2):
+    def los(self, segment, ye):
         '''
         @name: los
         @brief: Implementation of the LOS algorithm.
-        @param: x1: x coordinate of the path starting-waypoint
-                y1: y coordinate of the path starting-waypoint
-                x2: x coordinate of the path ending-waypoint
-                y2: y coordinate of the path ending-waypoint
+        @param: segment: path segment with precomputed angle and length
+                ye: cross-track error on the segment
         @return: --
         '''
-        ak = math.atan2(y2 - y1, x2 - x1)
-        ye = -(self.ned_x - x1)*math.sin(ak) + (self.ned_y - y1)*math.cos(ak)
-        xe = (self.ned_x - x1)*math.cos(ak) + (self.ned_y - y1)*math.sin(ak)
-        x_total = (x2 - x1)*math.cos(ak) + (y2 - y1)*math.sin(ak)
-        if xe > x_total: #Means the USV went farther than x2. 2 Alternatives:
-            #This one makes the USV return
-            ak = ak - math.pi
-            if (abs(ak) > (math.pi)):
-                ak = (ak/abs(ak))*(abs(ak) - 2*math.pi)
-            ye = -(self.ned_x - x1)*math.sin(ak) + (self.ned_y - y1)*math.cos(ak)
-            xe = (self.ned_x - x1)*math.cos(ak) + (self.ned_y - y1)*math.sin(ak)
-            '''#This one changes the target to the next in line
-            self.k += 1'''
-
-        delta = (self.delta_max - self.delta_min)*math.exp(-(1/self.gamma)*abs(ye)) + self.delta_min
-        psi_r = math.atan(-ye/delta)
-        self.bearing = ak + psi_r
-
-        if (abs(self.bearing) > (math.pi)):
-            self.bearing = (self.bearing/abs(self.bearing))*(abs(self.bearing) - 2*math.pi)
-
-        x_los = x1 + (delta+xe)*math.cos(ak)
-        y_los = y1 + (delta+xe)*math.sin(ak)
+        ak = segment.ak
+        self.bearing, delta = self.los_guidance.bearing(ak, ye)
+
         self.ye = ye
         self.ye_pub.publish(self.ye)
 
-        e_psi = self.bearing - self.yaw
-        abs_e_psi = abs(e_psi)
-        if (abs_e_psi > (math.pi)):
-            e_psi = (e_psi/abs_e_psi)*(abs_e_psi - 2*math.pi)
-            abs_e_psi = abs(e_psi)
-        u_psi = 1/(1 + math.exp(self.exp_gain*(abs_e_psi*self.chi_psi - self.exp_offset)))
-        u_r = 1/(1 + math.exp(-self.exp_gain*(self.distance*self.chi_r - self.exp_offset)))
-
-        self.vel = (self.u_max - self.u_min)*np.min([u_psi, u_r]) + self.u_min
+        self.vel = self.los_guidance.speed(self.bearing, self.yaw, self.distance,
+                                           self.speed_cap)
 
         self.boat.ned_x = self.ned_x
         self.boat.ned_y = self.ned_y
         self.boat.yaw = self.yaw
         self.boat.u = self.u
         self.boat.v = self.v
+        self.boat.r = self.r
         self.boat.vel = self.vel
         self.boat.bearing = self.bearing
-        self.bearing, self.vel = self.ca_obj.avoid(ak, x1, y1, self.obstacles, self.boat)
+        self.bearing, self.vel = self.ca_obj.avoid(ak, segment.x1, segment.y1, self.obstacles, self.boat,
+            self.obstacles_stamp)
 
         self.desired(self.vel, self.bearing)
 
-    def gps_to_ned(self, latitude_2, longitude_2):
-        '''
-        @name: gps_to_ned
-        @brief: Coordinate transformation between geodetic and NED reference frames.
-        @param: latitude_2: target x coordinate in geodetic reference frame
-                longitude_2: target y coordinate in geodetic reference frame
-        @return: ned_x2: target x coordinate in ned reference frame
-                 ned_y2: target y coordinate in ned reference frame
-        '''
-        latitude_1 = self.reference_latitude
-        longitude_1 = self.reference_longitude
-
-        longitud_distance = (longitude_1 - longitude_2)
-        y_distance = math.sin(longitud_distance)*math.cos(latitude_2)
-        x_distance = (math.cos(latitude_1)*math.sin(latitude_2) 
-                     - math.sin(latitude_1)*math.cos(latitude_2)*math.cos(longitud_distance))
-        bearing = math.atan2(-y_distance, x_distance)
-        phi_1 = math.radians(latitude_1)
-        phi_2 = math.radians(latitude_2)
-        delta_phi = math.radians(latitude_2 - latitude_1)
-        delta_longitude = math.radians(longitude_2 - longitude_1)
-        a = (math.sin(delta_phi/2)*math.sin(delta_phi/2) 
-             + math.cos(phi_1)*math.cos(phi_2)*math.sin(delta_longitude/2)*math.sin(delta_longitude/2))
-        c = 2*math.atan2(math.sqrt(a), math.sqrt(1-a))
-        distance = 6378137*c
-
-        ned_x2 = distance*math.cos(bearing)
-        ned_y2 = distance*math.sin(bearing)
-
-        return (ned_x2,ned_y2)
-
-    def body_to_ned(self, x2, y2):
-        '''
-        @name: body_to_ned
-        @brief: Coordinate transformation between body and NED reference frames.
-        @param: x2: target x coordinate in body reference frame
-                y2: target y coordinate in body reference frame
-        @return: ned_x2: target x coordinate in ned reference frame
-                 ned_y2: target y coordinate in ned reference frame
-        '''
-        p = np.array([x2, y2])
-        J = np.array([[math.cos(self.yaw),
-                      -1*math.sin(self.yaw)],
-                      [math.sin(self.yaw),
-                       math.cos(self.yaw)]])
-        n = J.dot(p)
-        ned_x2 = n[0] + self.ned_x
-        ned_y2 = n[1] + self.ned_y
-        return (ned_x2, ned_y2)
-
     def desired(self, _speed, _heading):
         self.desired_heading = _heading
         self.desired_speed = _speed
         self.d_heading_pub.publish(self.desired_heading)
         self.d_speed_pub.publish(self.desired_speed)
+        if self.recorder is not None:
+            self.recorder.record(self.manager.k, self.ned_x, self.ned_y, self.yaw, self.ye,
+                                 self.distance, self.desired_speed, self.desired_heading)
 
 
 def main():
@@ -263,33 +207,30 @@ def main():
     rospy.init_node('los', anonymous=False)
     rate = rospy.Rate(10) # 100hz
     los = LOS()
-    los.last_waypoint_array = []
-    aux_waypoint_array = []
+    if los.recorder is not None:
+        rospy.on_shutdown(los.recorder.close)
+    # Collision avoidance debug records are dumped on a crash or on SIGUSR1
+    los.ca_obj.log.dump_on_crash()
+    los.ca_obj.log.dump_on_signal()
 
     while (not rospy.is_shutdown()) and los.active:
-        if los.last_waypoint_array != los.waypoint_array:
-            los.k = 1
-            los.last_waypoint_array = los.waypoint_array
-            aux_waypoint_array = los.last_waypoint_array
-            x_0 = los.ned_x
-            y_0 = los.ned_y
-            
-            if los.waypoint_mode == 0:
-                aux_waypoint_array.insert(0,x_0)
-                aux_waypoint_array.insert(1,y_0)
-            elif los.waypoint_mode == 1:
-                for i in range(0, len(aux_waypoint_array), 2):
-                    aux_waypoint_array[i], aux_waypoint_array[i+1] = los.gps_to_ned(aux_waypoint_array[i],aux_waypoint_array[i+1])
-                aux_waypoint_array.insert(0,x_0)
-                aux_waypoint_array.insert(1,y_0)
-            elif los.waypoint_mode == 2:
-                for i in range(0, len(aux_waypoint_array), 2):
-                    aux_waypoint_array[i], aux_waypoint_array[i+1] = los.body_to_ned(aux_waypoint_array[i],aux_waypoint_array[i+1])
-                aux_waypoint_array.insert(0,x_0)
-                aux_waypoint_array.insert(1,y_0)
-        if len(aux_waypoint_array) > 1:
-            los.los_manager(los.last_waypoint_array)
-        rate.sleep()
+        if los.event_driven:
+            los.trigger.wait()
+            stale = los.trigger.stale()
+            if stale:
+                rospy.logwarn_throttle(1, 'LOS stale inputs: ' + ', '.join(stale))
+                if len(los.manager.path.x) > 0:
+                    los.desired(0, los.yaw)
+                continue
+        if los.manager.update():
+            los.los_manager()
+        if los.event_driven:
+            # Receive time of the pose that produced this command, for the
+            # controller end-to-end latency
+            if los.trigger.origin is not None:
+                los.pose_stamp_pub.publish(los.trigger.origin)
+        else:
+            rate.sleep()
     los.desired(0, los.yaw)
     rospy.logwarn('Finished')
     rospy.spin()
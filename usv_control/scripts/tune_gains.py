@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+----------------------------------------------------------
+    @file: tune_gains.py
+    @date: Mon Oct 19, 2026
+    @brief: Monte Carlo gain sweep of the backstepping (bc.py) or ASMC
+      (asmc.cpp) controller with usv_control.gain_sweep. Prints the best
+      configurations and stores every result in a compressed .npz file.
+      Does not need a ROS master.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import argparse
+import sys
+import time
+
+from usv_control import gain_sweep
+
+# Gains around the defaults of bc.py and asmc.launch
+GRIDS = {
+    'bc': dict(ku=[0.25, 0.5, 1.], ka=[0.2, 0.4, 0.8],
+               k1=[-1.5, -3, -6], k2=[4, 8, 12]),
+    'asmc': dict(k_u=[0.05, 0.1, 0.2], k_psi=[0.1, 0.2, 0.4],
+                 k2_u=[0.01, 0.02, 0.04], lambda_psi=[0.5, 1, 2]),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Controller gain sweep')
+    parser.add_argument('controller', choices=gain_sweep.CONTROLLERS)
+    parser.add_argument('-o', '--output', default=None,
+                        help='results file, <controller>_sweep.npz by default')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='worker processes, the number of CPUs by default')
+    parser.add_argument('-r', '--realizations', type=int, default=8,
+                        help='disturbance realizations per configuration')
+    parser.add_argument('-d', '--duration', type=float, default=120.,
+                        help='mission duration in seconds')
+    parser.add_argument('-n', '--top', type=int, default=10,
+                        help='configurations to print')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    configs = gain_sweep.grid(**GRIDS[args.controller])
+
+    def progress(done, total):
+        sys.stdout.write('\r%d/%d configurations' % (done, total))
+        sys.stdout.flush()
+
+    start = time.time()
+    results = gain_sweep.sweep(args.controller, configs, args.workers, args.realizations,
+                               args.seed, duration=args.duration, callback=progress)
+    elapsed = time.time() - start
+    print('\n%d configurations x %d realizations in %.1f s'
+          % (len(configs), args.realizations, elapsed))
+
+    order, score = gain_sweep.rank(results)
+    gains = sorted(GRIDS[args.controller])
+    print('  '.join(['%10s' % name for name in gains + ['ye_mean', 'effort', 'settling', 'score']]))
+    for i in order[:args.top]:
+        row = [results[name][i] for name in gains]
+        row += [results['ye_mean'][i], results['effort'][i], results['settling_time'][i], score[i]]
+        print('  '.join(['%10.3f' % value for value in row]))
+
+    output = args.output or '%s_sweep.npz' % args.controller
+    gain_sweep.save(output, results, controller=args.controller, score=score,
+                    realizations=args.realizations, duration=args.duration, seed=args.seed)
+    print('Results written to %s' % output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+'''
+----------------------------------------------------------
+    @file: allocation.py
+    @date: Mon Oct 19, 2026
+    @brief: Thrust allocation of the VantTec USV. The surge force and yaw
+      moment asked by a controller are split between the port and
+      starboard thrusters with the inverse of the dynamic model
+      (T_x = F_port + F_stbd, T_z = B/2*(F_port - F_stbd)). Under
+      saturation the yaw moment keeps priority and the surge force is
+      reduced, instead of clipping each thruster on its own.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import bisect
+
+import numpy as np
+
+B = 0.41 # Distance between thrusters in meters
+C = 0.78 # Starboard thruster force per unit of command
+COMMAND_MAX = 36.5
+COMMAND_MIN = -30
+
+
+def _interp(x, xs, ys):
+    # Piecewise linear lookup on plain floats, extrapolating the end pieces
+    i = min(max(bisect.bisect_right(xs, x), 1), len(xs) - 1)
+    x0 = xs[i - 1]
+    y0 = ys[i - 1]
+    return y0 + (ys[i] - y0)*(x - x0)/(xs[i] - x0)
+
+
+class ThrustAllocator:
+    def __init__(self, b=B, port_map=None, stbd_map=None,
+                 command_max=COMMAND_MAX, command_min=COMMAND_MIN):
+        '''
+        @name: __init__
+        @brief: Allocator for a pair of thrusters with force to command maps.
+        @param: b: distance between thrusters in meters
+                port_map: (forces, commands) increasing table of the port
+                  thruster, force = command by default
+                stbd_map: (forces, commands) table of the starboard
+                  thruster, force = C*command by default
+                command_max: max thruster command
+                command_min: min thruster command
+        @return: --
+        '''
+        self.b = b
+        if port_map is None:
+            port_map = ([command_min, command_max], [command_min, command_max])
+        if stbd_map is None:
+            stbd_map = ([C*command_min, C*command_max], [command_min, command_max])
+        self.port_forces = [float(f) for f in port_map[0]]
+        self.port_commands = [float(u) for u in port_map[1]]
+        self.stbd_forces = [float(f) for f in stbd_map[0]]
+        self.stbd_commands = [float(u) for u in stbd_map[1]]
+        # Two point maps are linear, which spares the table lookup
+        self.linear = len(self.port_forces) == 2 and len(self.stbd_forces) == 2
+        self.port_gain = ((self.port_commands[1] - self.port_commands[0])
+                          /(self.port_forces[1] - self.port_forces[0]))
+        self.stbd_gain = ((self.stbd_commands[1] - self.stbd_commands[0])
+                          /(self.stbd_forces[1] - self.stbd_forces[0]))
+        # Force limits of each thruster from the command limits
+        self.port_min = _interp(command_min, self.port_commands, self.port_forces)
+        self.port_max = _interp(command_max, self.port_commands, self.port_forces)
+        self.stbd_min = _interp(command_min, self.stbd_commands, self.stbd_forces)
+        self.stbd_max = _interp(command_max, self.stbd_commands, self.stbd_forces)
+        # Largest differential force (T_z/b) that leaves a feasible T_x
+        self.diff_min = 0.5*(self.port_min - self.stbd_max)
+        self.diff_max = 0.5*(self.port_max - self.stbd_min)
+
+    def allocate(self, T_x, T_z):
+        '''
+        @name: allocate
+        @brief: Thruster commands for a surge force and yaw moment.
+        @param: T_x: surge force in Newtons
+                T_z: yaw moment in Newton meters
+        @return: T_port: port thruster command
+                 T_stbd: starboard thruster command
+        '''
+        diff = min(max(T_z/self.b, self.diff_min), self.diff_max)
+        half_low = max(self.port_min - diff, self.stbd_min + diff)
+        half_high = min(self.port_max - diff, self.stbd_max + diff)
+        half = min(max(0.5*T_x, half_low), half_high)
+        return (_interp(half + diff, self.port_forces, self.port_commands),
+                _interp(half - diff, self.stbd_forces, self.stbd_commands))
+
+    def allocate_array(self, T_x, T_z):
+        '''
+        @name: allocate_array
+        @brief: allocate() for arrays of N boats.
+        @param: T_x: surge forces in Newtons
+                T_z: yaw moments in Newton meters
+        @return: T_port: port thruster commands
+                 T_stbd: starboard thruster commands
+        '''
+        diff = np.clip(np.asarray(T_z, dtype=float)/self.b, self.diff_min, self.diff_max)
+        half_low = np.maximum(self.port_min - diff, self.stbd_min + diff)
+        half_high = np.minimum(self.port_max - diff, self.stbd_max + diff)
+        half = np.minimum(np.maximum(0.5*np.asarray(T_x, dtype=float), half_low), half_high)
+        if self.linear:
+            return ((half + diff - self.port_forces[0])*self.port_gain + self.port_commands[0],
+                    (half - diff - self.stbd_forces[0])*self.stbd_gain + self.stbd_commands[0])
+        return (np.interp(half + diff, self.port_forces, self.port_commands),
+                np.interp(half - diff, self.stbd_forces, self.stbd_commands))
@@ -0,0 +1,193 @@
+'''
+----------------------------------------------------------
+    @file: debug_log.py
+    @date: Mon Oct 19, 2026
+    @brief: Low overhead logging for the control loops. Records are kept
+      unformatted in an in-memory ring buffer that is dumped on demand,
+      on a signal or on a crash; only records at or above the emit level
+      reach the sink (rosout or stdout), at most once per period for each
+      message key.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import collections
+import signal
+import sys
+import time
+
+DEBUG = 10
+INFO = 20
+WARN = 30
+ERROR = 40
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARN: 'WARN', ERROR: 'ERROR'}
+
+
+def stdout_sink(level, message):
+    '''
+    @name: stdout_sink
+    @brief: Writes a record to stdout.
+    @param: level: record level
+            message: formatted message
+    @return: --
+    '''
+    sys.stdout.write('[%s] %s\n' % (LEVEL_NAMES.get(level, level), message))
+
+
+def rospy_sink(level, message):
+    '''
+    @name: rospy_sink
+    @brief: Writes a record to rosout with the matching rospy call.
+    @param: level: record level
+            message: formatted message
+    @return: --
+    '''
+    import rospy
+    if level >= ERROR:
+        rospy.logerr(message)
+    elif level >= WARN:
+        rospy.logwarn(message)
+    elif level >= INFO:
+        rospy.loginfo(message)
+    else:
+        rospy.logdebug(message)
+
+
+class RingLogger:
+    def __init__(self, name, level=DEBUG, emit_level=WARN, period=1.0,
+                 capacity=2000, sink=stdout_sink):
+        '''
+        @name: __init__
+        @brief: Logger keeping its records in a ring buffer.
+        @param: name: logger name, prefixed to the dumped records
+                level: records under this level are dropped
+                emit_level: records at or above this level are also written
+                  to the sink
+                period: minimum time (s) between two emitted records with
+                  the same key
+                capacity: ring buffer size in records
+                sink: callable(level, message) for the emitted records
+        @return: --
+        '''
+        self.name = name
+        self.level = level
+        self.emit_level = emit_level
+        self.period = period
+        self.sink = sink
+        self.records = collections.deque(maxlen=capacity)
+        self.last_emit = {}
+        self.suppressed = {}
+
+    def enabled(self, level):
+        '''
+        @name: enabled
+        @brief: Whether a record of the level would be kept, to skip costly
+          argument preparation.
+        @param: level: record level
+        @return: True if the record would be kept
+        '''
+        return level >= self.level
+
+    def log(self, level, key, msg, *args):
+        '''
+        @name: log
+        @brief: Records a message. Formatting is deferred until the record
+          is emitted or dumped, so args must not be mutated afterwards
+          (pass scalars or copies of arrays).
+        @param: level: record level
+                key: rate limiting key, usually the call site
+                msg: %-format string
+                args: format arguments
+        @return: --
+        '''
+        if level < self.level:
+            return
+        now = time.time()
+        self.records.append((now, level, key, msg, args))
+        if level < self.emit_level or self.sink is None:
+            return
+        if now - self.last_emit.get(key, -self.period) < self.period:
+            self.suppressed[key] = self.suppressed.get(key, 0) + 1
+            return
+        self.last_emit[key] = now
+        message = self.format(key, msg, args)
+        suppressed = self.suppressed.pop(key, 0)
+        if suppressed:
+            message = '%s (%d suppressed)' % (message, suppressed)
+        self.sink(level, message)
+
+    def debug(self, key, msg, *args):
+        self.log(DEBUG, key, msg, *args)
+
+    def info(self, key, msg, *args):
+        self.log(INFO, key, msg, *args)
+
+    def warn(self, key, msg, *args):
+        self.log(WARN, key, msg, *args)
+
+    def error(self, key, msg, *args):
+        self.log(ERROR, key, msg, *args)
+
+    def format(self, key, msg, args):
+        '''
+        @name: format
+        @brief: Formats a record message.
+        @param: key: record key
+                msg: %-format string
+                args: format arguments
+        @return: message: formatted message
+        '''
+        try:
+            message = msg % args if args else msg
+        except (TypeError, ValueError):
+            message = '%s %r' % (msg, args)
+        return '[%s.%s] %s' % (self.name, key, message)
+
+    def dump(self, stream=None, clear=True):
+        '''
+        @name: dump
+        @brief: Writes the ring buffer contents, oldest first.
+        @param: stream: file-like object, stderr by default
+                clear: empty the ring buffer after dumping
+        @return: --
+        '''
+        if stream is None:
+            stream = sys.stderr
+        records = list(self.records)
+        if clear:
+            self.records.clear()
+        for stamp, level, key, msg, args in records:
+            stream.write('%.3f %-5s %s\n' % (stamp, LEVEL_NAMES.get(level, level),
+                                            self.format(key, msg, args)))
+        stream.flush()
+
+    def dump_on_crash(self, stream=None):
+        '''
+        @name: dump_on_crash
+        @brief: Dumps the ring buffer when an exception reaches the
+          interpreter, before the default traceback.
+        @param: stream: file-like object, stderr by default
+        @return: --
+        '''
+        previous_hook = sys.excepthook
+
+        def hook(exc_type, exc_value, exc_traceback):
+            self.dump(stream)
+            previous_hook(exc_type, exc_value, exc_traceback)
+        sys.excepthook = hook
+
+    def dump_on_signal(self, signum=None, stream=None):
+        '''
+        @name: dump_on_signal
+        @brief: Dumps the ring buffer on a signal, SIGUSR1 by default
+          (`rosnode info` gives the pid, then `kill -USR1 <pid>`).
+        @param: signum: signal number
+                stream: file-like object, stderr by default
+        @return: --
+        '''
+        if signum is None:
+            signum = getattr(signal, 'SIGUSR1', None)
+            if signum is None:
+                return
+        signal.signal(signum, lambda received, frame: self.dump(stream))
@@ -0,0 +1,145 @@
+'''
+----------------------------------------------------------
+    @file: dynamic_window.py
+    @date: Mon Oct 19, 2026
+    @brief: Dynamic window planner. (u_d, psi_d) command pairs reachable
+      from the current state are sampled and forward-simulated in closed
+      loop with the backstepping controller and the 3-DOF model, all
+      samples at once, and scored against the obstacle clearance and the
+      LOS target.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import math
+
+import numpy as np
+
+from usv_control import dynamics
+
+
+class DynamicWindow:
+    def __init__(self, u_max=1.0, u_min=0.3, speed_window=0.4,
+                 heading_window=math.pi/2, speed_samples=40, heading_samples=51,
+                 horizon=3.0, integral_step=0.02, check_step=0.1):
+        '''
+        @name: __init__
+        @brief: Planner parameters.
+        @param: u_max: maximum desired speed
+                u_min: minimum desired speed
+                speed_window: sampled speed interval around the current speed
+                heading_window: sampled heading interval around the LOS bearing
+                speed_samples: number of sampled speeds
+                heading_samples: number of sampled headings
+                horizon: simulated time in seconds
+                integral_step: model integration step in seconds
+                check_step: time between clearance checks in seconds
+        @return: --
+        '''
+        self.u_max = u_max
+        self.u_min = u_min
+        self.speed_window = speed_window
+        self.heading_window = heading_window
+        self.horizon = horizon
+        self.steps = int(round(horizon/integral_step))
+        self.check_every = max(1, int(round(check_step/integral_step)))
+        self.model = dynamics.UsvModel(integral_step)
+
+        # Clearance (m) that stops counting, and score weights
+        self.clearance_max = 3.
+        self.target_weight = 1.
+        self.heading_weight = 1.
+        self.speed_weight = 0.5
+        self.clearance_weight = 0.5
+
+        speed_grid = np.linspace(0, 1, speed_samples)
+        heading_grid = np.linspace(-1, 1, heading_samples)
+        self.speed_grid, self.heading_grid = [g.ravel() for g in np.meshgrid(speed_grid, heading_grid)]
+
+    def sample(self, u, bearing):
+        '''
+        @name: sample
+        @brief: Command pairs of the dynamic window.
+        @param: u: current surge speed
+                bearing: LOS bearing
+        @return: u_d: sampled desired speeds
+                 psi_d: sampled desired headings
+        '''
+        low = max(self.u_min, min(u, self.u_max) - self.speed_window)
+        high = min(self.u_max, max(u, self.u_min) + self.speed_window)
+        u_d = low + (high - low)*self.speed_grid
+        psi_d = dynamics.wrap_angle(bearing + self.heading_window*self.heading_grid)
+        return (u_d, psi_d)
+
+    def simulate(self, upsilon, eta, u_d, psi_d):
+        '''
+        @name: simulate
+        @brief: Closed-loop rollout of every command pair.
+        @param: upsilon: current surge speed, sway speed and yaw rate
+                eta: current NED x, NED y and yaw
+                u_d: desired speeds (N,)
+                psi_d: desired headings (N,)
+        @return: x: (N,K) NED x at every clearance check
+                 y: (N,K) NED y at every clearance check
+        '''
+        n = len(u_d)
+        self.model.reset(np.tile(upsilon, (n, 1)), np.tile(eta, (n, 1)))
+        x = []
+        y = []
+        for step in range(1, self.steps + 1):
+            state = self.model.upsilon
+            T_port, T_stbd = dynamics.backstepping(state[:, 0], state[:, 1], state[:, 2],
+                                                   self.model.eta[:, 2], u_d, psi_d)
+            self.model.step(T_port, T_stbd)
+            if step % self.check_every == 0:
+                x.append(self.model.eta[:, 0])
+                y.append(self.model.eta[:, 1])
+        return (np.column_stack(x), np.column_stack(y))
+
+    def plan(self, upsilon, eta, obs_x, obs_y, obs_radius, target_x, target_y,
+             bearing, u_ref):
+        '''
+        @name: plan
+        @brief: Best command pair of the dynamic window. Rollouts that come
+          closer than the obstacle radius are discarded; the rest minimize
+          the distance left to the target, the deviation from the LOS
+          command and the lack of clearance. If every rollout collides, the
+          one keeping the largest clearance is returned.
+        @param: upsilon: current surge speed, sway speed and yaw rate
+                eta: current NED x, NED y and yaw
+                obs_x: obstacles NED x
+                obs_y: obstacles NED y
+                obs_radius: obstacles radius including boat and safety radius
+                target_x: LOS target NED x
+                target_y: LOS target NED y
+                bearing: LOS bearing
+                u_ref: LOS speed
+        @return: u_d: desired speed
+                 psi_d: desired heading
+                 clearance: clearance of the chosen rollout
+        '''
+        u_d, psi_d = self.sample(upsilon[0], bearing)
+        x, y = self.simulate(upsilon, eta, u_d, psi_d)
+
+        clearance = np.full(len(u_d), np.inf)
+        for i in range(len(obs_x)):
+            dx = x - obs_x[i]
+            dy = y - obs_y[i]
+            edge = np.sqrt((dx*dx + dy*dy).min(axis=1)) - obs_radius[i]
+            np.minimum(clearance, edge, out=clearance)
+
+        start = math.hypot(target_x - eta[0], target_y - eta[1])
+        left = np.hypot(target_x - x[:, -1], target_y - y[:, -1])
+        progress = (left - start)/max(self.u_max*self.horizon, 1e-6)
+        deviation = np.abs(dynamics.wrap_angle(psi_d - bearing))/math.pi
+        cost = (self.target_weight*progress + self.heading_weight*deviation
+                + self.speed_weight*np.abs(u_d - u_ref)/self.u_max
+                - self.clearance_weight*np.minimum(clearance, self.clearance_max)/self.clearance_max)
+
+        free = clearance > 0
+        if free.any():
+            best = np.flatnonzero(free)[np.argmin(cost[free])]
+        else:
+            best = np.argmax(clearance)
+        return (u_d[best], psi_d[best], clearance[best])
@@ -0,0 +1,316 @@
+'''
+----------------------------------------------------------
+    @file: dynamics.py
+    @date: Mon Oct 19, 2026
+    @brief: Vectorized 3-DOF model of the VantTec USV and its backstepping
+      speed and heading controller. The model is the one integrated by
+      dynamic_model_simulate.cpp and the controller the one in bc.py, but
+      every state is an array so N boats are stepped in a single call.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import math
+
+import numpy as np
+
+from usv_control import allocation
+
+# Hydrodynamic and physical constants (dynamic_model_simulate.cpp)
+X_u_dot = -2.25
+Y_v_dot = -23.13
+Y_r_dot = -1.31
+N_v_dot = -16.41
+N_r_dot = -2.79
+Yvv = -99.99
+Yvr = -5.49
+Yrv = -5.49
+Yrr = -8.8
+Nvv = -5.49
+Nvr = -8.8
+Nrv = -8.8
+Nrr = -3.49
+m = 30
+Iz = 4.1
+B = 0.41
+c = 0.78
+
+M = np.array([[m - X_u_dot, 0, 0],
+              [0, m - Y_v_dot, 0 - Y_r_dot],
+              [0, 0 - N_v_dot, Iz - N_r_dot]])
+M_INV_T = np.linalg.inv(M).T
+
+# bc.py allocation, c scales the port thruster
+ALLOCATOR = allocation.ThrustAllocator(
+    B,
+    port_map=([c*allocation.COMMAND_MIN, c*allocation.COMMAND_MAX],
+              [allocation.COMMAND_MIN, allocation.COMMAND_MAX]),
+    stbd_map=([allocation.COMMAND_MIN, allocation.COMMAND_MAX],
+              [allocation.COMMAND_MIN, allocation.COMMAND_MAX]))
+
+# Speed dependent damping factors
+_YV = 0.5*(-40*1000)*(1.1 + 0.0045*(1.01/0.09) - 0.1*(0.27/0.09) + 0.016*(pow((0.27/0.09), 2)))
+_YR = 6*(-3.141592*1000)*0.09*0.09*1.01
+_NV = 0.06*(-3.141592*1000)*0.09*0.09*1.01
+_NR = 0.02*(-3.141592*1000)*0.09*0.09*1.01*1.01
+
+
+def wrap_angle(angle):
+    '''
+    @name: wrap_angle
+    @brief: Wraps angles to the [-pi, pi] interval.
+    @param: angle: array of angles in radians
+    @return: angle: wrapped angles in radians
+    '''
+    abs_angle = np.abs(angle)
+    return np.where(abs_angle > math.pi, np.sign(angle)*(abs_angle - 2*math.pi), angle)
+
+
+def thrust_to_force(T_port, T_stbd):
+    '''
+    @name: thrust_to_force
+    @brief: Thruster forces to the generalized force vector.
+    @param: T_port: port thrust in Newtons
+            T_stbd: starboard thrust in Newtons
+    @return: tau: (N,3) surge force, sway force and yaw moment
+    '''
+    T_port = np.asarray(T_port, dtype=float)
+    T_stbd = np.asarray(T_stbd, dtype=float)
+    return np.column_stack((T_port + c*T_stbd, np.zeros(np.shape(T_port)),
+                            0.5*B*(T_port - c*T_stbd)))
+
+
+def acceleration(upsilon, tau):
+    '''
+    @name: acceleration
+    @brief: Body frame acceleration M^-1 (tau - C(v) v - D(v) v) of N boats.
+    @param: upsilon: (N,3) surge speed, sway speed and yaw rate
+            tau: (N,3) generalized forces
+    @return: upsilon_dot: (N,3) body frame acceleration
+    '''
+    u = upsilon[:, 0]
+    v = upsilon[:, 1]
+    r = upsilon[:, 2]
+    abs_u = np.abs(u)
+    abs_v = np.abs(v)
+    abs_r = np.abs(r)
+    speed = np.sqrt(u*u + v*v)
+
+    fast = abs_u > 1.2
+    Xu = np.where(fast, 64.55, -25.)
+    Xuu = np.where(fast, -70.92, 0.)
+    Yv = _YV*abs_v
+    Yr = _YR*speed
+    Nv = _NV*speed
+    Nr = _NR*speed
+
+    # C = CRB + CA
+    C_u = -m*v*r + 2*((Y_v_dot*v) + ((Y_r_dot + N_v_dot)/2)*r)*r
+    C_v = m*u*r - X_u_dot*m*u*r
+    C_r = 2*(((0 - Y_v_dot)*v) - ((Y_r_dot + N_v_dot)/2)*r)*u + X_u_dot*m*u*v
+    # D = Dl - Dn
+    D_u = (-Xu - Xuu*abs_u)*u
+    D_v = (-Yv - (Yvv*abs_v + Yvr*abs_r))*v + (-Yr - (Yrv*abs_v + Yrr*abs_r))*r
+    D_r = (-Nv - (Nvv*abs_v + Nvr*abs_r))*v + (-Nr - (Nrv*abs_v + Nrr*abs_r))*r
+
+    rhs = tau - np.column_stack((C_u + D_u, C_v + D_v, C_r + D_r))
+    return rhs.dot(M_INV_T)
+
+
+class UsvModel:
+    def __init__(self, integral_step=0.01):
+        '''
+        @name: __init__
+        @brief: N boats integrated with the trapezoidal rule of
+          dynamic_model_simulate.cpp.
+        @param: integral_step: integration step in seconds
+        @return: --
+        '''
+        self.integral_step = integral_step
+        self.reset(np.zeros((1, 3)), np.zeros((1, 3)))
+
+    def reset(self, upsilon, eta):
+        '''
+        @name: reset
+        @brief: Sets the initial state of every boat.
+        @param: upsilon: (N,3) surge speed, sway speed and yaw rate
+                eta: (N,3) NED x, NED y and yaw
+        @return: --
+        '''
+        self.upsilon = np.array(upsilon, dtype=float, ndmin=2)
+        self.eta = np.array(eta, dtype=float, ndmin=2)
+        self.upsilon_dot_last = np.zeros(self.upsilon.shape)
+        self.eta_dot_last = np.zeros(self.eta.shape)
+
+    def step(self, T_port, T_stbd):
+        '''
+        @name: step
+        @brief: Integrates one step for every boat.
+        @param: T_port: port thrust of each boat in Newtons
+                T_stbd: starboard thrust of each boat in Newtons
+        @return: --
+        '''
+        h = self.integral_step
+        upsilon_dot = acceleration(self.upsilon, thrust_to_force(T_port, T_stbd))
+        self.upsilon = h*(upsilon_dot + self.upsilon_dot_last)/2 + self.upsilon
+        self.upsilon_dot_last = upsilon_dot
+
+        u = self.upsilon[:, 0]
+        v = self.upsilon[:, 1]
+        psi = self.eta[:, 2]
+        cos_psi = np.cos(psi)
+        sin_psi = np.sin(psi)
+        eta_dot = np.column_stack((cos_psi*u - sin_psi*v, sin_psi*u + cos_psi*v,
+                                   self.upsilon[:, 2]))
+        self.eta = h*(eta_dot + self.eta_dot_last)/2 + self.eta
+        self.eta_dot_last = eta_dot
+
+
+def backstepping(u, v, r, psi, u_d, psi_d, ku=0.5, ka=0.4, udyaw=0.4,
+                 uamax=0.2, k1=-3, k2=8):
+    '''
+    @name: backstepping
+    @brief: Backstepping speed and heading control law of bc.py for N boats.
+    @param: u: surge speed
+            v: sway speed
+            r: yaw rate
+            psi: yaw
+            u_d: desired surge speed
+            psi_d: desired heading
+            ku: speed error gain
+            ka: acceleration curve-shaping gain
+            udyaw: max allowed speed while turning
+            uamax: max acceleration allowed
+            k1: yaw error gain
+            k2: yaw rate gain
+    @return: T_port: port thrust in Newtons
+             T_stbd: starboard thrust in Newtons
+    '''
+    N_r = (-0.52)*np.sqrt(u*u + v*v)
+    u_abs = np.abs(u)
+    fast = u_abs > 1.2
+    X_u = np.where(fast, 64.55, -25.)
+    X_uu = np.where(fast, -70.92, 0.)
+
+    error_u = u - u_d
+    error_u = np.where(np.abs(error_u) < 0.05, 0., error_u)
+    error_psi = wrap_angle(psi - psi_d)
+    abs_error_psi = np.abs(error_psi)
+    error_psi = np.where(abs_error_psi < 0.015, 0., error_psi)
+    abs_error_psi = np.abs(error_psi)
+
+    min_u = udyaw + (u_d - udyaw)*np.exp((-5.73)*abs_error_psi)
+    u_d_ref = np.minimum(min_u, u_d)
+    u_dot_d = uamax*np.tanh(ka*(u_d_ref - u)/uamax)
+    epsilon_u = u_dot_d - (ku*error_u)
+    epsilon_psi = k1*error_psi - k2*r
+
+    X_drag = X_uu*u*u_abs + X_u*u
+    T_x = (m - X_u_dot)*epsilon_u - (m - Y_v_dot)*v*r - X_drag
+    T_z = (Iz - N_r_dot)*epsilon_psi - (Y_v_dot - X_u_dot)*u*v - N_r*r
+    T_z = np.where(abs_error_psi > 0.03, T_z*.5, T_z)
+    T_z = np.where(abs_error_psi > 0.1, T_z*.7, T_z)
+    T_z = np.where(abs_error_psi > 0.2, T_z*.7, T_z)
+    T_z = np.where(abs_error_psi > 0.3, T_z*.8, T_z)
+
+    return ALLOCATOR.allocate_array(T_x, T_z)
+
+
+class AsmcController:
+    def __init__(self, n, k_u=0.1, k_psi=0.2, kmin_u=0.05, kmin_psi=0.2,
+                 k2_u=0.02, k2_psi=0.1, mu_u=0.05, mu_psi=0.1,
+                 lambda_u=0.001, lambda_psi=1, integral_step=0.01):
+        '''
+        @name: __init__
+        @brief: Adaptive sliding mode speed and heading controller of
+          asmc.cpp for N boats. The gains may be scalars or arrays of N.
+        @param: n: number of boats
+                k_u, k_psi, kmin_u, kmin_psi, k2_u, k2_psi, mu_u, mu_psi,
+                lambda_u, lambda_psi: asmc.launch gains
+                integral_step: controller period in seconds
+        @return: --
+        '''
+        self.k_u = k_u
+        self.k_psi = k_psi
+        self.kmin_u = kmin_u
+        self.kmin_psi = kmin_psi
+        self.k2_u = k2_u
+        self.k2_psi = k2_psi
+        self.mu_u = mu_u
+        self.mu_psi = mu_psi
+        self.lambda_u = lambda_u
+        self.lambda_psi = lambda_psi
+        self.integral_step = integral_step
+        self.e_u_int = np.zeros(n)
+        self.e_u_last = np.zeros(n)
+        self.Ka_u = np.zeros(n)
+        self.Ka_psi = np.zeros(n)
+        self.Ka_dot_last_u = np.zeros(n)
+        self.Ka_dot_last_psi = np.zeros(n)
+
+    def __call__(self, upsilon, eta, u_d, psi_d):
+        '''
+        @name: __call__
+        @brief: One control step, as a usv_control.simulator controller.
+        @param: upsilon: (N,3) surge speed, sway speed and yaw rate
+                eta: (N,3) NED x, NED y and yaw
+                u_d: desired surge speeds
+                psi_d: desired headings
+        @return: T_port: port thrust in Newtons
+                 T_stbd: starboard thrust in Newtons
+        '''
+        h = self.integral_step
+        u = upsilon[:, 0]
+        v = upsilon[:, 1]
+        r = upsilon[:, 2]
+        u_abs = np.abs(u)
+        fast = u_abs > 1.2
+        Xu = np.where(fast, 64.55, -25.)
+        Xuu = np.where(fast, -70.92, 0.)
+        Nr = (-0.52)*np.sqrt(u*u + v*v)
+
+        g_u = 1/(m - X_u_dot)
+        g_psi = 1/(Iz - N_r_dot)
+        f_u = ((m - Y_v_dot)*v*r + (Xuu*u_abs*u + Xu*u))/(m - X_u_dot)
+        f_psi = ((-X_u_dot + Y_v_dot)*u*v + (Nr*r))/(Iz - N_r_dot)
+
+        e_u = u_d - u
+        e_psi = psi_d - eta[:, 2]
+        e_psi = np.where(np.abs(e_psi) > 3.141592,
+                         np.sign(e_psi)*(np.abs(e_psi) - 2*3.141592), e_psi)
+        self.e_u_int = h*(e_u + self.e_u_last)/2 + self.e_u_int
+        self.e_u_last = e_u
+        e_psi_dot = -r
+
+        sigma_u = e_u + self.lambda_u*self.e_u_int
+        sigma_psi = e_psi_dot + self.lambda_psi*e_psi
+
+        # Gains adapt towards the mu boundary layer once above their minimum
+        Ka_dot_u = np.where(self.Ka_u > self.kmin_u,
+                            self.k_u*np.sign(np.abs(sigma_u) - self.mu_u), self.kmin_u)
+        Ka_dot_psi = np.where(self.Ka_psi > self.kmin_psi,
+                              self.k_psi*np.sign(np.abs(sigma_psi) - self.mu_psi), self.kmin_psi)
+        self.Ka_u = h*(Ka_dot_u + self.Ka_dot_last_u)/2 + self.Ka_u
+        self.Ka_dot_last_u = Ka_dot_u
+        self.Ka_psi = h*(Ka_dot_psi + self.Ka_dot_last_psi)/2 + self.Ka_psi
+        self.Ka_dot_last_psi = Ka_dot_psi
+
+        ua_u = -self.Ka_u*np.sqrt(np.abs(sigma_u))*np.sign(sigma_u) - self.k2_u*sigma_u
+        ua_psi = -self.Ka_psi*np.sqrt(np.abs(sigma_psi))*np.sign(sigma_psi) - self.k2_psi*sigma_psi
+
+        Tx = np.clip((self.lambda_u*e_u - f_u - ua_u)/g_u, -60, 73)
+        Tz = np.clip((self.lambda_psi*e_psi_dot - f_psi - ua_psi)/g_psi, -14, 14)
+
+        # A zero speed command stops the thrusters and resets the adaptation
+        stop = u_d == 0
+        if stop.any():
+            Tx = np.where(stop, 0., Tx)
+            Tz = np.where(stop, 0., Tz)
+            for state in (self.Ka_u, self.Ka_dot_last_u, self.Ka_psi,
+                          self.Ka_dot_last_psi, self.e_u_int, self.e_u_last):
+                state[stop] = 0
+
+        T_port = np.clip((Tx/2) + (Tz/B), -30, 36.5)
+        T_stbd = np.clip((Tx/(2*c)) - (Tz/(B*c)), -30, 36.5)
+        return (T_port, T_stbd)
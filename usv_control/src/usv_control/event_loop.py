@@ -0,0 +1,186 @@
+'''
+----------------------------------------------------------
+    @file: event_loop.py
+    @date: Mon Oct 19, 2026
+    @brief: Input driven triggering for the guidance and control loops.
+      Subscriber callbacks notify the trigger and the node loop wakes up
+      at once instead of polling at a fixed rate, with a minimum period
+      to coalesce bursts, a watchdog for stale inputs and the latency
+      from the oldest sample to the loop output. run_controller() is the
+      node loop shared by the controllers.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import threading
+import time
+
+from usv_control import loop_monitor
+
+
+class EventTrigger:
+    def __init__(self, min_period=0.01, stale_timeout=0.5, inputs=()):
+        '''
+        @name: __init__
+        @brief: Trigger shared by the callbacks and the node loop.
+        @param: min_period: minimum time between two loop iterations (s)
+                stale_timeout: age after which a watched input is stale (s)
+                inputs: names of the inputs checked by the watchdog
+        @return: --
+        '''
+        self.min_period = min_period
+        self.stale_timeout = stale_timeout
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.last_input = dict((name, None) for name in inputs)
+        self.pending_origin = None
+        self.origin = None
+        self.last_run = 0.
+
+        self.latency = 0.
+        self.latency_count = 0
+        self.latency_sum = 0.
+        self.latency_max = 0.
+
+    def notify(self, name, origin=None):
+        '''
+        @name: notify
+        @brief: Called from a subscriber callback when a new sample arrives.
+        @param: name: input name
+                origin: time (s) the sample that produced this input was
+                  received upstream, now by default
+        @return: --
+        '''
+        now = time.time()
+        if origin is None:
+            origin = now
+        with self.lock:
+            if name in self.last_input:
+                self.last_input[name] = now
+            if self.pending_origin is None or origin < self.pending_origin:
+                self.pending_origin = origin
+        self.event.set()
+
+    def wait(self, timeout=None):
+        '''
+        @name: wait
+        @brief: Blocks until an input is notified, then keeps the minimum
+          period since the previous iteration. Samples arriving meanwhile
+          are served by the same iteration.
+        @param: timeout: maximum wait (s), the stale timeout by default
+        @return: triggered: False if the wait timed out
+        '''
+        if timeout is None:
+            timeout = self.stale_timeout
+        triggered = self.event.wait(timeout)
+        if triggered:
+            remaining = self.min_period - (time.time() - self.last_run)
+            if remaining > 0:
+                time.sleep(remaining)
+        with self.lock:
+            self.event.clear()
+            self.origin = self.pending_origin
+            self.pending_origin = None
+        self.last_run = time.time()
+        return bool(triggered)
+
+    def stale(self):
+        '''
+        @name: stale
+        @brief: Watchdog on the watched inputs.
+        @param: --
+        @return: names: inputs never received or older than the stale timeout
+        '''
+        now = time.time()
+        with self.lock:
+            return [name for name, stamp in self.last_input.items()
+                    if stamp is None or now - stamp > self.stale_timeout]
+
+    def complete(self):
+        '''
+        @name: complete
+        @brief: Called once the iteration output is published. Measures the
+          latency from the oldest sample served by the iteration.
+        @param: --
+        @return: latency: latency in seconds, 0 if nothing was served
+        '''
+        if self.origin is None:
+            return 0.
+        self.latency = time.time() - self.origin
+        self.latency_count += 1
+        self.latency_sum += self.latency
+        self.latency_max = max(self.latency_max, self.latency)
+        return self.latency
+
+    def latency_stats(self, reset=True):
+        '''
+        @name: latency_stats
+        @brief: Latency statistics since the last reset.
+        @param: reset: restart the statistics
+        @return: count: number of measured iterations
+                 mean: mean latency (s)
+                 maximum: maximum latency (s)
+        '''
+        count = self.latency_count
+        mean = self.latency_sum/count if count else 0.
+        maximum = self.latency_max
+        if reset:
+            self.latency_count = 0
+            self.latency_sum = 0.
+            self.latency_max = 0.
+        return (count, mean, maximum)
+
+
+def run_controller(C, setpoint, period=0.01, name='Controller'):
+    '''
+    @name: run_controller
+    @brief: Node loop of a controller, at a fixed rate or woken by its
+      trigger in event driven mode. Stale inputs zero the thrusters, the
+      loop health is published every 100 iterations and, in event driven
+      mode, the pose to thrust latency after every iteration.
+    @param: C: controller with run(), activated, event_driven, trigger and
+              the thruster, health and latency publishers
+            setpoint: callable returning the run() arguments
+            period: nominal loop period (s)
+            name: name in the log messages
+    @return: --
+    '''
+    import rospy
+    from std_msgs.msg import Float32MultiArray, MultiArrayDimension
+
+    rate = rospy.Rate(1./period)
+    # Loop supervision, optional priority and CPU affinity
+    monitor = loop_monitor.LoopMonitor(period, event_driven=C.event_driven)
+    for error in loop_monitor.set_scheduling(rospy.get_param('~nice', None),
+                                             rospy.get_param('~cpu_affinity', None)):
+        rospy.logwarn('Could not set ' + error)
+    health = Float32MultiArray()
+    health.layout.dim.append(MultiArrayDimension(label=','.join(loop_monitor.HEALTH_FIELDS),
+        size=len(loop_monitor.HEALTH_FIELDS), stride=len(loop_monitor.HEALTH_FIELDS)))
+
+    while not rospy.is_shutdown() and C.activated:
+        if monitor.iterations >= 100:
+            health.data = monitor.health()
+            C.health_pub.publish(health)
+        if C.event_driven:
+            C.trigger.wait()
+            stale = C.trigger.stale()
+            if stale:
+                rospy.logwarn_throttle(1, name + ' stale inputs: ' + ', '.join(stale))
+                C.right_thruster_pub.publish(0)
+                C.left_thruster_pub.publish(0)
+                continue
+        monitor.start()
+        C.run(*setpoint())
+        monitor.stop()
+        if C.event_driven:
+            # End-to-end latency from the oldest pose sample to the thrust
+            C.latency_pub.publish(C.trigger.complete())
+            count, mean, maximum = C.trigger.latency_stats(reset=False)
+            if count >= 1000:
+                C.trigger.latency_stats()
+                rospy.loginfo('Pose to thrust latency: mean %.1f ms, max %.1f ms'
+                    % (1e3*mean, 1e3*maximum))
+        else:
+            rate.sleep()
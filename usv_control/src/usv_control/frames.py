@@ -0,0 +1,124 @@
+'''
+----------------------------------------------------------
+    @file: frames.py
+    @date: Mon Oct 19, 2026
+    @brief: Planar reference frame transformations (body, NED, gate and
+      parallel path frames). Every transform takes a single point of
+      shape (2,) or N points of shape (N,2). Rotation matrices are
+      inverted by transposition.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import math
+
+import numpy as np
+
+
+def rotation_matrix(angle):
+    '''
+    @name: rotation_matrix
+    @brief: Rotation matrix.
+    @param: angle: angle of rotation
+    @return: J: transformation matrix
+    '''
+    cos_angle = math.cos(angle)
+    sin_angle = math.sin(angle)
+    return np.array([[cos_angle, -sin_angle],
+                     [sin_angle, cos_angle]])
+
+
+def to_parent(points, angle, origin_x=0, origin_y=0):
+    '''
+    @name: to_parent
+    @brief: Coordinate transformation from a child frame, rotated by angle
+      and centered at origin, to its parent frame.
+    @param: points: point (2,) or points (N,2) in the child frame
+            angle: angle between child and parent reference frames
+            origin_x: child frame origin x coordinate in the parent frame
+            origin_y: child frame origin y coordinate in the parent frame
+    @return: points in the parent frame, same shape as the input
+    '''
+    p = np.asarray(points, dtype=float)
+    return p.dot(rotation_matrix(angle).T) + (origin_x, origin_y)
+
+
+def to_child(points, angle, origin_x=0, origin_y=0):
+    '''
+    @name: to_child
+    @brief: Inverse of to_parent, the inverse rotation is the transpose.
+    @param: points: point (2,) or points (N,2) in the parent frame
+            angle: angle between child and parent reference frames
+            origin_x: child frame origin x coordinate in the parent frame
+            origin_y: child frame origin y coordinate in the parent frame
+    @return: points in the child frame, same shape as the input
+    '''
+    p = np.asarray(points, dtype=float) - (origin_x, origin_y)
+    return p.dot(rotation_matrix(angle))
+
+
+def body_to_ned(points, ned_x, ned_y, yaw):
+    '''
+    @name: body_to_ned
+    @brief: Coordinate transformation between body and NED reference frames.
+    @param: points: target coordinates in body reference frame
+            ned_x: USV x coordinate in NED reference frame
+            ned_y: USV y coordinate in NED reference frame
+            yaw: USV heading
+    @return: target coordinates in NED reference frame
+    '''
+    return to_parent(points, yaw, ned_x, ned_y)
+
+
+def ned_to_body(points, ned_x, ned_y, yaw):
+    '''
+    @name: ned_to_body
+    @brief: Coordinate transformation between NED and body reference frames.
+    @param: points: target coordinates in NED reference frame
+            ned_x: USV x coordinate in NED reference frame
+            ned_y: USV y coordinate in NED reference frame
+            yaw: USV heading
+    @return: target coordinates in body reference frame
+    '''
+    return to_child(points, yaw, ned_x, ned_y)
+
+
+def gate_to_ned(points, alpha, ned_x, ned_y):
+    '''
+    @name: gate_to_ned
+    @brief: Coordinate transformation between gate and NED reference frames.
+    @param: points: target coordinates in gate reference frame
+            alpha: angle between gate and NED reference frames
+            ned_x: gate x coordinate in NED reference frame
+            ned_y: gate y coordinate in NED reference frame
+    @return: target coordinates in NED reference frame
+    '''
+    return to_parent(points, alpha, ned_x, ned_y)
+
+
+def ned_to_gate(points, alpha, ned_x, ned_y):
+    '''
+    @name: ned_to_gate
+    @brief: Coordinate transformation between NED and gate reference frames.
+    @param: points: target coordinates in NED reference frame
+            alpha: angle between gate and NED reference frames
+            ned_x: gate x coordinate in NED reference frame
+            ned_y: gate y coordinate in NED reference frame
+    @return: target coordinates in gate reference frame
+    '''
+    return to_child(points, alpha, ned_x, ned_y)
+
+
+def ned_to_path(points, ak, ned_x, ned_y):
+    '''
+    @name: ned_to_path
+    @brief: Coordinate transformation between NED and parallel path
+      reference frames.
+    @param: points: target coordinates in NED reference frame
+            ak: angle between path and NED reference frames
+            ned_x: path origin x coordinate in NED reference frame
+            ned_y: path origin y coordinate in NED reference frame
+    @return: target coordinates in parallel path reference frame
+    '''
+    return to_child(points, ak, ned_x, ned_y)
@@ -0,0 +1,236 @@
+'''
+----------------------------------------------------------
+    @file: gain_sweep.py
+    @date: Mon Oct 19, 2026
+    @brief: Monte Carlo gain sweep of the speed and heading controllers on
+      usv_control.simulator. Every gain configuration is one task of a
+      process pool; within a task its disturbance realizations run as a
+      single batch of boats. Results are kept as columns, one row per
+      configuration.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import itertools
+import multiprocessing
+
+import numpy as np
+
+from usv_control import dynamics, simulator
+
+METRICS = ('ye_mean', 'ye_max', 'speed_error', 'heading_error', 'effort',
+           'settling_time', 'settled')
+
+CONTROLLERS = ('bc', 'asmc')
+
+
+def grid(**axes):
+    '''
+    @name: grid
+    @brief: Cartesian product of gain values.
+    @param: axes: gain name to list of values
+    @return: configs: list of gain dicts
+    '''
+    names = sorted(axes)
+    return [dict(zip(names, values))
+            for values in itertools.product(*[axes[name] for name in names])]
+
+
+def make_controller(name, n, gains):
+    '''
+    @name: make_controller
+    @brief: Builds a simulator controller for N boats.
+    @param: name: 'bc' or 'asmc'
+            n: number of boats
+            gains: gain dict
+    @return: controller: callable(upsilon, eta, u_d, psi_d) -> (T_port, T_stbd)
+    '''
+    if name == 'bc':
+        return simulator.backstepping_controller(**gains)
+    if name == 'asmc':
+        return dynamics.AsmcController(n, **gains)
+    raise ValueError('Unknown controller %s' % name)
+
+
+class ThrustDisturbance:
+    def __init__(self, rng, n, bias=3., amplitude=5., period=(2., 8.)):
+        '''
+        @name: __init__
+        @brief: Random thrust offsets per boat: a constant bias (current,
+          thruster mismatch) plus a sinusoid (waves) on each thruster.
+        @param: rng: numpy RandomState
+                n: number of boats
+                bias: max bias in Newtons
+                amplitude: max wave amplitude in Newtons
+                period: wave period range in seconds
+        @return: --
+        '''
+        self.bias = rng.uniform(-bias, bias, (n, 2))
+        self.amplitude = rng.uniform(0, amplitude, (n, 2))
+        self.omega = 2*np.pi/rng.uniform(period[0], period[1], (n, 1))
+        self.phase = rng.uniform(0, 2*np.pi, (n, 2))
+
+    def __call__(self, time, upsilon, eta):
+        return self.bias + self.amplitude*np.sin(self.omega*time + self.phase)
+
+
+def settling_time(t, error, band):
+    '''
+    @name: settling_time
+    @brief: Time after which the error stays within the band.
+    @param: t: (K,) sample times
+            error: (N,K) errors
+            band: tolerance
+    @return: settling: (N,) settling times, t[-1] when not settled
+             settled: (N,) boolean array
+    '''
+    outside = np.abs(error) > band
+    settled = ~outside[:, -1]
+    # Index of the last sample outside the band, -1 when always inside
+    last = outside.shape[1] - 1 - np.argmax(outside[:, ::-1], axis=1)
+    last = np.where(outside.any(axis=1), last, -1)
+    index = np.minimum(last + 1, len(t) - 1)
+    return (np.where(settled, t[index], t[-1]), settled)
+
+
+def evaluate(task):
+    '''
+    @name: evaluate
+    @brief: Simulates one gain configuration over its disturbance
+      realizations: a waypoint mission for tracking error and effort, and
+      a speed and heading step for the settling time.
+    @param: task: (index, controller name, gains, seed, realizations,
+              waypoints, duration, step_duration)
+    @return: index: task index
+             metrics: list of floats in METRICS order, averaged over the
+               realizations
+    '''
+    index, name, gains, seed, realizations, waypoints, duration, step_duration = task
+    rng = np.random.RandomState(seed)
+    n = realizations
+
+    sim = simulator.BatchSimulator(n, record_period=0.1)
+    eta = np.column_stack((rng.uniform(-2, 2, n), rng.uniform(-2, 2, n),
+                           rng.uniform(-0.5, 0.5, n)))
+    sim.reset(np.zeros((n, 3)), eta)
+    log = sim.run(make_controller(name, n, gains), simulator.LosGuidance(waypoints, n),
+                  duration, ThrustDisturbance(rng, n))
+    speed_error = log['u'] - log['u_d']
+    heading_error = dynamics.wrap_angle(log['psi'] - log['psi_d'])
+    effort = np.sqrt(np.mean(log['T_port']**2 + log['T_stbd']**2, axis=1))
+
+    # Step from rest to 1 m/s and 90 degrees
+    sim.reset()
+    u_step = np.ones(n)
+    psi_step = np.full(n, np.pi/2)
+    step = sim.run(make_controller(name, n, gains), lambda eta: (u_step, psi_step),
+                   step_duration, ThrustDisturbance(rng, n))
+    t_u, settled_u = settling_time(step['t'], step['u'] - 1, 0.1)
+    t_psi, settled_psi = settling_time(step['t'], dynamics.wrap_angle(step['psi'] - np.pi/2), 0.1)
+
+    metrics = [np.abs(log['ye']).mean(), np.abs(log['ye']).max(),
+               np.sqrt(np.mean(speed_error**2)), np.sqrt(np.mean(heading_error**2)),
+               effort.mean(), np.maximum(t_u, t_psi).mean(),
+               (settled_u & settled_psi).mean()]
+    return (index, [float(value) for value in metrics])
+
+
+def sweep(name, configs, workers=None, realizations=8, seed=0, waypoints=None,
+          duration=120., step_duration=30., callback=None):
+    '''
+    @name: sweep
+    @brief: Evaluates every gain configuration on a process pool.
+    @param: name: 'bc' or 'asmc'
+            configs: list of gain dicts, see grid()
+            workers: pool size, the number of CPUs by default
+            realizations: disturbance realizations per configuration
+            seed: random seed, shared by every configuration so all of
+              them face the same initial states and disturbances
+            waypoints: flat NED mission, a 20 m square by default
+            duration: mission duration in seconds
+            step_duration: step response duration in seconds
+            callback: optional callable(done, total) for progress
+    @return: results: dict of columns, one array per gain and per metric
+    '''
+    if waypoints is None:
+        waypoints = [0, 0, 20, 0, 20, 20, 0, 20, 0, 0]
+    tasks = [(i, name, config, seed, realizations, waypoints, duration, step_duration)
+             for i, config in enumerate(configs)]
+    rows = [None]*len(tasks)
+    if workers == 1:
+        outputs = map(evaluate, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers)
+        # One configuration per message keeps every worker busy
+        outputs = pool.imap_unordered(evaluate, tasks, chunksize=1)
+    try:
+        for done, (i, metrics) in enumerate(outputs):
+            rows[i] = metrics
+            if callback is not None:
+                callback(done + 1, len(tasks))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    results = {}
+    for gain in sorted(set(key for config in configs for key in config)):
+        results[gain] = np.array([config.get(gain, np.nan) for config in configs], dtype=float)
+    table = np.array(rows, dtype=float).reshape(len(rows), len(METRICS))
+    for j, metric in enumerate(METRICS):
+        results[metric] = table[:, j]
+    return results
+
+
+def rank(results, weights=None):
+    '''
+    @name: rank
+    @brief: Orders the configurations by a weighted sum of their metrics,
+      each normalized by its median over the sweep. A step that never
+      settles counts with the whole step duration as settling time.
+    @param: results: sweep() columns
+            weights: metric name to weight, tracking error, effort and
+              settling time by default
+    @return: order: configuration indexes, best first
+             score: score of each configuration
+    '''
+    if weights is None:
+        weights = {'ye_mean': 1., 'heading_error': 1., 'speed_error': 1.,
+                   'effort': 0.5, 'settling_time': 1.}
+    score = np.zeros(len(results['ye_mean']))
+    for metric, weight in weights.items():
+        column = results[metric]
+        scale = np.median(column)
+        score += weight*column/(scale if scale > 0 else 1.)
+    return (np.argsort(score, kind='mergesort'), score)
+
+
+def save(path, results, **metadata):
+    '''
+    @name: save
+    @brief: Writes the result columns to a compressed .npz file.
+    @param: path: file path
+            results: sweep() columns
+            metadata: extra arrays or values to store
+    @return: --
+    '''
+    arrays = dict(results)
+    for key, value in metadata.items():
+        arrays['meta_' + key] = np.asarray(value)
+    np.savez_compressed(path, **arrays)
+
+
+def load(path):
+    '''
+    @name: load
+    @brief: Reads a save() file.
+    @param: path: file path
+    @return: results: dict of columns
+             metadata: dict of the metadata values
+    '''
+    data = np.load(path)
+    results = dict((key, data[key]) for key in data.files if not key.startswith('meta_'))
+    metadata = dict((key[5:], data[key]) for key in data.files if key.startswith('meta_'))
+    return (results, metadata)
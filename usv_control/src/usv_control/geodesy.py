@@ -0,0 +1,112 @@
+'''
+----------------------------------------------------------
+    @file: geodesy.py
+    @date: Mon Oct 19, 2026
+    @brief: Vectorized coordinate transformation between geodetic and NED
+      reference frames. The trigonometry of the reference point is
+      computed once, when the INS reference arrives, and N latitude and
+      longitude pairs are converted in a single numpy call.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import numpy as np
+
+EARTH_RADIUS = 6378137 #Equatorial radius in meters
+WGS84_F = 1/298.257223563 #WGS84 flattening
+WGS84_E2 = WGS84_F*(2 - WGS84_F) #WGS84 first eccentricity squared
+
+MODES = ('haversine', 'flat', 'ecef')
+
+
+def geodetic_to_ecef(phi, lam):
+    '''
+    @name: geodetic_to_ecef
+    @brief: WGS84 geodetic to ECEF coordinates at zero altitude.
+    @param: phi: latitude in radians
+            lam: longitude in radians
+    @return: x, y, z: ECEF coordinates in meters
+    '''
+    sin_phi = np.sin(phi)
+    cos_phi = np.cos(phi)
+    n = EARTH_RADIUS/np.sqrt(1 - WGS84_E2*sin_phi*sin_phi)
+    x = n*cos_phi*np.cos(lam)
+    y = n*cos_phi*np.sin(lam)
+    z = n*(1 - WGS84_E2)*sin_phi
+    return (x, y, z)
+
+
+class GeodeticReference:
+    def __init__(self, latitude=0, longitude=0, mode='haversine'):
+        '''
+        @name: __init__
+        @brief: Precomputes the reference point terms used by to_ned.
+        @param: latitude: reference latitude in degrees
+                longitude: reference longitude in degrees
+                mode: 'haversine' for great-circle distance and bearing,
+                  'flat' for a flat-earth (equirectangular) approximation,
+                  'ecef' for the WGS84 ellipsoid through ECEF coordinates
+        @return: --
+        '''
+        if mode not in MODES:
+            raise ValueError("Unknown geodetic mode '%s'" % mode)
+        self.mode = mode
+        self.latitude = latitude
+        self.longitude = longitude
+
+        self.phi = np.radians(latitude)
+        self.lam = np.radians(longitude)
+        self.sin_phi = np.sin(self.phi)
+        self.cos_phi = np.cos(self.phi)
+        self.sin_lam = np.sin(self.lam)
+        self.cos_lam = np.cos(self.lam)
+        self.ecef = geodetic_to_ecef(self.phi, self.lam)
+
+    def to_ned(self, latitude, longitude):
+        '''
+        @name: to_ned
+        @brief: Coordinate transformation between geodetic and NED reference
+          frames.
+        @param: latitude: target latitudes in degrees (scalar or array)
+                longitude: target longitudes in degrees (scalar or array)
+        @return: ned_x: target x coordinates in NED reference frame
+                 ned_y: target y coordinates in NED reference frame
+        '''
+        phi = np.radians(np.asarray(latitude, dtype=float))
+        lam = np.radians(np.asarray(longitude, dtype=float))
+        if self.mode == 'flat':
+            ned_x = EARTH_RADIUS*(phi - self.phi)
+            ned_y = EARTH_RADIUS*self.cos_phi*(lam - self.lam)
+        elif self.mode == 'ecef':
+            x, y, z = geodetic_to_ecef(phi, lam)
+            dx = x - self.ecef[0]
+            dy = y - self.ecef[1]
+            dz = z - self.ecef[2]
+            east = -self.sin_lam*dx + self.cos_lam*dy
+            ned_x = (-self.sin_phi*self.cos_lam*dx - self.sin_phi*self.sin_lam*dy
+                     + self.cos_phi*dz)
+            ned_y = east
+        else:
+            cos_phi = np.cos(phi)
+            delta_lam = lam - self.lam
+            sin_half_phi = np.sin((phi - self.phi)/2)
+            sin_half_lam = np.sin(delta_lam/2)
+            a = sin_half_phi*sin_half_phi + self.cos_phi*cos_phi*sin_half_lam*sin_half_lam
+            distance = EARTH_RADIUS*2*np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+            bearing = np.arctan2(np.sin(delta_lam)*cos_phi,
+                                 self.cos_phi*np.sin(phi)
+                                 - self.sin_phi*cos_phi*np.cos(delta_lam))
+            ned_x = distance*np.cos(bearing)
+            ned_y = distance*np.sin(bearing)
+        return (ned_x, ned_y)
+
+    def waypoints_to_ned(self, waypoints):
+        '''
+        @name: waypoints_to_ned
+        @brief: Converts a flat [lat0, lon0, lat1, lon1, ...] waypoint list.
+        @param: waypoints: flat list of geodetic waypoints in degrees
+        @return: ned_waypoints: flat list [x0, y0, x1, y1, ...] in NED
+        '''
+        ned_x, ned_y = self.to_ned(waypoints[0::2], waypoints[1::2])
+        return np.column_stack((ned_x, ned_y)).ravel().tolist()
@@ -0,0 +1,388 @@
+'''
+----------------------------------------------------------
+    @file: guidance.py
+    @date: Mon Oct 19, 2026
+    @brief: Line-of-sight (LOS) guidance law and waypoint manager shared
+      by the LOS nodes. The geometry of every path segment (heading, unit
+      vector and length) is computed once when the waypoints are loaded,
+      so each control tick only projects the USV position onto the segment.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from usv_control import debug_log, frames, replanning, smoothing, speed_profile
+
+Segment = namedtuple('Segment',
+                     ['x1', 'y1', 'x2', 'y2', 'ak', 'cos_ak', 'sin_ak', 'length'])
+
+
+def wrap_angle(angle):
+    '''
+    @name: wrap_angle
+    @brief: Wraps an angle to the [-pi, pi] interval.
+    @param: angle: angle in radians
+    @return: angle: wrapped angle in radians
+    '''
+    if (abs(angle) > (math.pi)):
+        angle = (angle/abs(angle))*(abs(angle) - 2*math.pi)
+    return angle
+
+
+class WaypointPath:
+    def __init__(self, waypoints):
+        '''
+        @name: __init__
+        @brief: Precomputes the geometry of each segment of a polyline.
+        @param: waypoints: flat list of NED waypoints [x0, y0, x1, y1, ...]
+        @return: --
+        '''
+        n = len(waypoints)//2
+        points = np.asarray(waypoints[:2*n], dtype=float).reshape(n, 2)
+        self.x = points[:, 0]
+        self.y = points[:, 1]
+
+        dx = np.diff(self.x)
+        dy = np.diff(self.y)
+        self.ak = np.arctan2(dy, dx)
+        self.cos_ak = np.cos(self.ak)
+        self.sin_ak = np.sin(self.ak)
+        self.length = np.hypot(dx, dy)
+        # Arc length at each waypoint
+        self.s = np.concatenate(([0.], np.cumsum(self.length)))
+        self.total_length = float(self.s[-1])
+
+        # Plain floats are faster than numpy scalars on the per-tick path
+        self.segments = [Segment(*s) for s in zip(self.x[:-1].tolist(),
+                                                  self.y[:-1].tolist(),
+                                                  self.x[1:].tolist(),
+                                                  self.y[1:].tolist(),
+                                                  self.ak.tolist(),
+                                                  self.cos_ak.tolist(),
+                                                  self.sin_ak.tolist(),
+                                                  self.length.tolist())]
+
+    def __len__(self):
+        return len(self.segments)
+
+    def segment(self, k):
+        '''
+        @name: segment
+        @brief: Returns the k-th segment, numbered from 1 as in los_manager.
+        @param: k: segment number, the segment ends at waypoint k
+        @return: segment: Segment tuple
+        '''
+        return self.segments[k - 1]
+
+    def advance(self, k, ned_x, ned_y, switch_radius=1, window=3):
+        '''
+        @name: advance
+        @brief: Projects the USV on segment k and moves to the next segments
+          while it is past their end (along-track) or within switch_radius
+          of their waypoint. At most window segments are skipped per call,
+          so the cost does not grow with the path length.
+        @param: k: current segment number, numbered from 1
+                ned_x: USV x coordinate in NED reference frame
+                ned_y: USV y coordinate in NED reference frame
+                switch_radius: distance to the waypoint that ends a segment
+                window: max segments skipped in one call
+        @return: k: segment to follow, len(path) + 1 once finished
+                 xe: along-track distance on segment k
+                 ye: cross-track error on segment k
+                 distance: distance to the waypoint ending segment k
+        '''
+        n = len(self.segments)
+        xe = ye = distance = 0.
+        skipped = 0
+        while k <= n:
+            x1, y1, x2, y2, ak, cos_ak, sin_ak, length = self.segments[k - 1]
+            dx = ned_x - x1
+            dy = ned_y - y1
+            xe = dx*cos_ak + dy*sin_ak
+            ye = -dx*sin_ak + dy*cos_ak
+            distance = math.hypot(x2 - ned_x, y2 - ned_y)
+            if (xe < length and distance > switch_radius) or skipped == window:
+                break
+            k += 1
+            skipped += 1
+        return (k, xe, ye, distance)
+
+    def arc_length(self, k, xe):
+        '''
+        @name: arc_length
+        @brief: Path parameter of a projection on segment k.
+        @param: k: segment number, numbered from 1
+                xe: along-track distance on the segment
+        @return: s: distance travelled along the path
+        '''
+        if k > len(self.segments):
+            return self.total_length
+        return float(self.s[k - 1]) + min(max(xe, 0.), self.segments[k - 1].length)
+
+
+def los_manager(path, k, ned_x, ned_y, switch_radius=1, arc_distance=False,
+                profile=None):
+    '''
+    @name: los_manager
+    @brief: Waypoint manager step of the LOS nodes and the simulator.
+      Segments switch on along-track progress, so a missed waypoint does
+      not turn the USV around.
+    @param: path: WaypointPath with the precomputed segments
+            k: current segment number, numbered from 1
+            ned_x: USV x coordinate in NED reference frame
+            ned_y: USV y coordinate in NED reference frame
+            switch_radius: distance to the waypoint that ends a segment
+            arc_distance: measure the distance left along the path instead
+              of to the next waypoint, for the dense waypoints of smoothed
+              corners, so the speed only drops near the end
+            profile: speed_profile.SpeedProfile capping the speed, None for
+              no cap
+    @return: k: segment to follow, len(path) + 1 once finished
+             segment: Segment to follow, None once finished
+             ye: cross-track error on the segment
+             distance: distance used to shape the speed
+             u_max: speed cap at the USV position, None without profile
+    '''
+    k, xe, ye, distance = path.advance(k, ned_x, ned_y, switch_radius)
+    if k > len(path):
+        return (k, None, ye, distance, None)
+    u_max = None
+    if arc_distance or profile is not None:
+        s = path.arc_length(k, xe)
+        distance = path.total_length - s
+        if profile is not None:
+            u_max = profile.speed(s)
+    return (k, path.segment(k), ye, distance, u_max)
+
+
+class WaypointManager:
+    def __init__(self, smoothing_radius=0, profile=None, log=None):
+        '''
+        @name: __init__
+        @brief: Path followed by a LOS node. The waypoints callback loads
+          new paths while the node loop follows the current one.
+        @param: smoothing_radius: corner arc radius, 0 to follow the polyline
+                profile: speed_profile.SpeedProfile keyword arguments to cap
+                  the speed along every new path, None for no cap
+                log: debug_log.RingLogger for the ignored updates, to
+                  stdout by default
+        @return: --
+        '''
+        self.smoothing_radius = smoothing_radius
+        self.profile = profile
+        self.log = log if log is not None else debug_log.RingLogger('waypoints')
+        self.waypoints = []
+        self.mode = replanning.NED_MODE # 0 for NED, 1 for GPS, 2 for body
+        self.path = WaypointPath([])
+        self.speed_profile = None
+        self.k = 1
+        self.version = 0
+        self.last_version = 0
+        self.reset_version = 0
+
+    def load(self, data, ned_x, ned_y, yaw, geodetic_reference=None):
+        '''
+        @name: load
+        @brief: Loads the waypoints of a /mission/waypoints message. A tail
+          update keeps the waypoints before the first replaced one, the
+          path origin (unless corners are smoothed) and the segment
+          progress. It is ignored when it does not apply to the path
+          followed, a NED path with at least first waypoints; the
+          planner resends the full plan once it is unchanged.
+        @param: data: message data [x1, y1, x2, y2, ..., mode], mode 0 for
+                  NED, 1 for GPS, 2 for body and 3 for a NED tail update
+                  [first, x_first, y_first, ..., 3]
+                ned_x: USV x coordinate in NED reference frame
+                ned_y: USV y coordinate in NED reference frame
+                yaw: USV heading
+                geodetic_reference: geodesy.GeodeticReference for GPS mode
+        @return: loaded: False if the waypoints are those already followed
+                   or the tail update was ignored
+        '''
+        waypoints = list(data[:-1])
+        mode = data[-1]
+        origin = None
+        if mode == replanning.TAIL_MODE:
+            first = int(waypoints[0])
+            if self.mode != replanning.NED_MODE or first > len(self.waypoints)//2:
+                self.log.warn('tail', 'tail update from waypoint %d ignored, '
+                              'the path followed is not its NED path', first)
+                return False
+            waypoints = replanning.splice(self.waypoints, first, waypoints[1:])
+            # The points of a smoothed path are not the waypoints, it
+            # restarts from the USV position
+            if len(self.path.x) > 0 and not self.smoothing_radius:
+                origin = (float(self.path.x[0]), float(self.path.y[0]))
+            mode = replanning.NED_MODE
+        # Republished waypoints keep the current path and its progress
+        if waypoints == self.waypoints and mode == self.mode:
+            return False
+        self.waypoints = waypoints
+        self.mode = mode
+        if origin is None:
+            # Also when a tail update follows before the loop saw this path
+            self.reset_version = self.version + 1
+        # The path is replaced before the version so the loop never sees
+        # a new version with the old path
+        path = self.build_path(waypoints, mode, ned_x, ned_y, yaw,
+                               geodetic_reference, origin)
+        if self.profile is not None:
+            self.speed_profile = speed_profile.SpeedProfile(path, **self.profile)
+        self.path = path
+        self.version += 1
+        return True
+
+    def build_path(self, waypoints, mode, ned_x, ned_y, yaw,
+                   geodetic_reference=None, origin=None):
+        '''
+        @name: build_path
+        @brief: Converts a waypoint list to NED, starting at the current USV
+          position, and builds the path.
+        @param: waypoints: flat waypoint list [x1, y1, x2, y2, ...]
+                mode: 0 for NED, 1 for GPS, 2 for body
+                ned_x: USV x coordinate in NED reference frame
+                ned_y: USV y coordinate in NED reference frame
+                yaw: USV heading
+                geodetic_reference: geodesy.GeodeticReference for GPS mode
+                origin: (x, y) NED start of the path instead of the USV
+                  position, to rebuild a path after a tail update
+        @return: path: WaypointPath
+        '''
+        if origin is None:
+            x_0 = ned_x
+            y_0 = ned_y
+        else:
+            x_0, y_0 = origin
+        if mode == 0:
+            aux_waypoint_array = [x_0, y_0] + waypoints
+        elif mode == 1:
+            aux_waypoint_array = [x_0, y_0] + geodetic_reference.waypoints_to_ned(waypoints)
+        elif mode == 2:
+            body = np.reshape(waypoints, (-1, 2))
+            aux_waypoint_array = [x_0, y_0] + frames.body_to_ned(body, x_0, y_0, yaw).ravel().tolist()
+        else:
+            aux_waypoint_array = waypoints
+        if self.smoothing_radius:
+            aux_waypoint_array = smoothing.fillet_path(aux_waypoint_array,
+                                                       self.smoothing_radius)
+        return WaypointPath(aux_waypoint_array)
+
+    def update(self):
+        '''
+        @name: update
+        @brief: Called by the node loop. Restarts at the first segment when
+          load() published a new path, or keeps the segment after a tail
+          update.
+        @param: --
+        @return: active: True once there is a path to follow
+        '''
+        if self.version != self.last_version:
+            if self.reset_version > self.last_version:
+                self.k = 1
+            else:
+                self.k = min(self.k, len(self.path) + 1)
+            self.last_version = self.version
+        return len(self.path.x) > 0
+
+    def step(self, ned_x, ned_y):
+        '''
+        @name: step
+        @brief: los_manager() step on the current path.
+        @param: ned_x: USV x coordinate in NED reference frame
+                ned_y: USV y coordinate in NED reference frame
+        @return: segment: Segment to follow, None once finished
+                 ye: cross-track error on the segment
+                 distance: distance used to shape the speed
+                 u_max: speed cap at the USV position, None without profile
+        '''
+        self.k, segment, ye, distance, u_max = los_manager(
+            self.path, self.k, ned_x, ned_y, arc_distance=self.smoothing_radius > 0,
+            profile=self.speed_profile)
+        return (segment, ye, distance, u_max)
+
+
+class LineOfSight:
+    def __init__(self, delta_max=5, delta_min=0.5, gamma=0.5, u_max=1,
+                 u_min=0.3, threshold_radius=5, exp_gain=10, exp_offset=0.5):
+        self.delta_max = delta_max
+        self.delta_min = delta_min
+        self.gamma = gamma
+
+        self.u_max = u_max
+        self.u_min = u_min
+        self.threshold_radius = threshold_radius
+        self.chi_r = 1./threshold_radius
+        self.chi_psi = 2/math.pi
+        self.exp_gain = exp_gain
+        self.exp_offset = exp_offset
+
+    def track_errors(self, segment, ned_x, ned_y, reverse=True):
+        '''
+        @name: track_errors
+        @brief: Projects the USV position on a path segment.
+        @param: segment: Segment tuple
+                ned_x: USV x coordinate in NED reference frame
+                ned_y: USV y coordinate in NED reference frame
+                reverse: flip the path direction if the USV went farther
+                  than the segment end
+        @return: ak: path angle in NED reference frame
+                 xe: along-track distance from the segment start
+                 ye: cross-track error
+        '''
+        x1, y1, x2, y2, ak, cos_ak, sin_ak, length = segment
+        dx = ned_x - x1
+        dy = ned_y - y1
+        xe = dx*cos_ak + dy*sin_ak
+        ye = -dx*sin_ak + dy*cos_ak
+        if reverse and xe > length: #Means the USV went farther than x2
+            #Rotating the path by pi only flips the sign of both errors
+            ak = wrap_angle(ak - math.pi)
+            xe = -xe
+            ye = -ye
+        return (ak, xe, ye)
+
+    def lookahead(self, ye):
+        '''
+        @name: lookahead
+        @brief: Lookahead distance as a function of the cross-track error.
+        @param: ye: cross-track error
+        @return: delta: lookahead distance
+        '''
+        return (self.delta_max - self.delta_min)*math.exp(-(1/self.gamma)*abs(ye)) + self.delta_min
+
+    def bearing(self, ak, ye):
+        '''
+        @name: bearing
+        @brief: Desired heading to converge to the path.
+        @param: ak: path angle in NED reference frame
+                ye: cross-track error
+        @return: bearing: desired heading
+                 delta: lookahead distance used
+        '''
+        delta = self.lookahead(ye)
+        psi_r = math.atan(-ye/delta)
+        return (wrap_angle(ak + psi_r), delta)
+
+    def speed(self, bearing, yaw, distance, u_max=None):
+        '''
+        @name: speed
+        @brief: Desired speed shaped by the heading error and the distance to
+          the next waypoint.
+        @param: bearing: desired heading
+                yaw: current heading
+                distance: distance to the next waypoint
+                u_max: speed cap at this point of the path (speed profile),
+                  self.u_max by default
+        @return: vel: desired speed
+        '''
+        if u_max is None:
+            u_max = self.u_max
+        abs_e_psi = abs(wrap_angle(bearing - yaw))
+        u_psi = 1/(1 + math.exp(self.exp_gain*(abs_e_psi*self.chi_psi - self.exp_offset)))
+        u_r = 1/(1 + math.exp(-self.exp_gain*(distance*self.chi_r - self.exp_offset)))
+        return (u_max - self.u_min)*min(u_psi, u_r) + self.u_min
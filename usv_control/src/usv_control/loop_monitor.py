@@ -0,0 +1,191 @@
+'''
+----------------------------------------------------------
+    @file: loop_monitor.py
+    @date: Mon Oct 19, 2026
+    @brief: Deadline and jitter supervision of fixed rate loops. Every
+      iteration period and compute time goes into a fixed-bin histogram,
+      so recording costs a few arithmetic operations and no allocation.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import os
+import time
+
+HEALTH_FIELDS = ('rate', 'period_mean', 'period_max', 'period_p99',
+                 'compute_mean', 'compute_max', 'compute_p99', 'missed',
+                 'iterations')
+
+
+class Histogram:
+    def __init__(self, bin_width, bins):
+        '''
+        @name: __init__
+        @brief: Fixed-bin histogram from 0 to bin_width*bins, the last bin
+          also counts the values above its upper edge.
+        @param: bin_width: bin width in seconds
+                bins: number of bins
+        @return: --
+        '''
+        self.bin_width = bin_width
+        self.counts = [0]*bins
+        self.reset()
+
+    def reset(self):
+        '''
+        @name: reset
+        @brief: Clears the histogram.
+        @param: --
+        @return: --
+        '''
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count = 0
+        self.total = 0.
+        self.maximum = 0.
+
+    def add(self, value):
+        '''
+        @name: add
+        @brief: Adds a sample.
+        @param: value: sample in seconds
+        @return: --
+        '''
+        i = int(value/self.bin_width)
+        if i >= len(self.counts):
+            i = len(self.counts) - 1
+        elif i < 0:
+            i = 0
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        if value > self.maximum:
+            self.maximum = value
+
+    def mean(self):
+        return self.total/self.count if self.count else 0.
+
+    def percentile(self, q):
+        '''
+        @name: percentile
+        @brief: Upper edge of the bin holding the q-th percentile.
+        @param: q: percentile in [0, 100]
+        @return: value: percentile in seconds
+        '''
+        if not self.count:
+            return 0.
+        target = q/100.*self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return (i + 1)*self.bin_width
+        return len(self.counts)*self.bin_width
+
+
+class LoopMonitor:
+    def __init__(self, period, bins=50, tolerance=0.5, event_driven=False):
+        '''
+        @name: __init__
+        @brief: Supervisor of a loop with a nominal period.
+        @param: period: nominal loop period in seconds
+                bins: histogram bins, spanning up to four periods
+                tolerance: fraction of the period an iteration may be late
+                  before it counts as a missed deadline
+                event_driven: the loop is woken by its inputs, so the
+                  period between iterations has no deadline and only the
+                  compute time is checked against the period
+        @return: --
+        '''
+        self.period = period
+        self.deadline = None if event_driven else period*(1 + tolerance)
+        self.periods = Histogram(4.*period/bins, bins)
+        self.computes = Histogram(4.*period/bins, bins)
+        self.missed = 0
+        self.late = False
+        self.iterations = 0
+        self.last_start = None
+        self.start_time = None
+        self.window_start = time.time()
+
+    def start(self):
+        '''
+        @name: start
+        @brief: Marks the beginning of an iteration.
+        @param: --
+        @return: --
+        '''
+        now = time.time()
+        if self.last_start is not None:
+            period = now - self.last_start
+            self.periods.add(period)
+            self.late = self.deadline is not None and period > self.deadline
+        self.last_start = now
+        self.start_time = now
+
+    def stop(self):
+        '''
+        @name: stop
+        @brief: Marks the end of the iteration work. An iteration that
+          started late or overran the period counts once as missed.
+        @param: --
+        @return: compute: iteration compute time in seconds
+        '''
+        compute = time.time() - self.start_time
+        self.computes.add(compute)
+        self.iterations += 1
+        if self.late or compute > self.period:
+            self.missed += 1
+        self.late = False
+        return compute
+
+    def health(self, reset=True):
+        '''
+        @name: health
+        @brief: Loop statistics since the last reset, in HEALTH_FIELDS
+          order.
+        @param: reset: restart the statistics window
+        @return: values: list of floats
+        '''
+        now = time.time()
+        elapsed = now - self.window_start
+        values = [self.iterations/elapsed if elapsed > 0 else 0.,
+                  self.periods.mean(), self.periods.maximum,
+                  self.periods.percentile(99),
+                  self.computes.mean(), self.computes.maximum,
+                  self.computes.percentile(99),
+                  float(self.missed), float(self.iterations)]
+        if reset:
+            self.periods.reset()
+            self.computes.reset()
+            self.missed = 0
+            self.iterations = 0
+            self.window_start = now
+        return values
+
+
+def set_scheduling(nice=None, cpus=None):
+    '''
+    @name: set_scheduling
+    @brief: Raises the process priority and pins it to CPUs where the
+      platform allows it. Negative nice values need privileges.
+    @param: nice: niceness increment, None to keep it
+            cpus: list of CPU indexes, None or empty to keep them
+    @return: errors: list of the settings that could not be applied
+    '''
+    errors = []
+    if nice is not None:
+        try:
+            os.nice(nice)
+        except (OSError, AttributeError) as e:
+            errors.append('nice %s: %s' % (nice, e))
+    if cpus:
+        if hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(0, cpus)
+            except OSError as e:
+                errors.append('affinity %s: %s' % (cpus, e))
+        else:
+            errors.append('affinity %s: not supported' % (cpus,))
+    return errors
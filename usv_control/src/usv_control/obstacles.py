@@ -0,0 +1,313 @@
+'''
+----------------------------------------------------------
+    @file: obstacles.py
+    @date: Mon Oct 19, 2026
+    @brief: Obstacle processing shared by the collision avoidance nodes.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import math
+
+import numpy as np
+
+
+def _find(parent, i):
+    '''
+    @name: _find
+    @brief: Union-find root lookup with path halving.
+    @param: parent: parent list
+            i: element index
+    @return: root: root index of the element
+    '''
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def merge_obstacles(x, y, radius, clearance):
+    '''
+    @name: merge_obstacles
+    @brief: Groups obstacles whose free space is smaller than clearance and
+      reduces each group to a circle enclosing all of its members. Close
+      pairs are found through a spatial hash with cells big enough that
+      only the neighbouring cells must be checked, and grouped with
+      union-find, so the cost is near-linear for sparse buoy fields.
+    @param: x: obstacles x coordinate
+            y: obstacles y coordinate
+            radius: obstacles radius
+            clearance: free space under which two obstacles are merged
+    @return: labels: group index of each obstacle
+             merged_x: x coordinate of each group circle
+             merged_y: y coordinate of each group circle
+             merged_radius: radius of each group circle
+    '''
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    radius = np.asarray(radius, dtype=float)
+    n = len(x)
+    if n == 0:
+        empty = np.zeros(0)
+        return (np.zeros(0, dtype=int), empty, empty, empty)
+
+    cell = 2*radius.max() + clearance
+    if cell <= 0:
+        cell = 1.
+    cells_x = np.floor(x/cell).astype(int).tolist()
+    cells_y = np.floor(y/cell).astype(int).tolist()
+    x_list = x.tolist()
+    y_list = y.tolist()
+    r_list = radius.tolist()
+
+    grid = {}
+    for i in range(n):
+        grid.setdefault((cells_x[i], cells_y[i]), []).append(i)
+
+    parent = list(range(n))
+    for i in range(n):
+        cx = cells_x[i]
+        cy = cells_y[i]
+        for gx in (cx - 1, cx, cx + 1):
+            for gy in (cy - 1, cy, cy + 1):
+                for j in grid.get((gx, gy), ()):
+                    if j <= i:
+                        continue
+                    distance_centers = math.hypot(x_list[i] - x_list[j],
+                                                  y_list[i] - y_list[j])
+                    if distance_centers - r_list[i] - r_list[j] <= clearance:
+                        root_i = _find(parent, i)
+                        root_j = _find(parent, j)
+                        if root_i != root_j:
+                            parent[root_j] = root_i
+
+    roots = [_find(parent, i) for i in range(n)]
+    _, labels = np.unique(roots, return_inverse=True)
+    labels = labels.reshape(-1)
+    groups = labels.max() + 1
+
+    # Enclosing circle: centroid of the centers, radius reaching the
+    # farthest member edge
+    count = np.bincount(labels, minlength=groups)
+    merged_x = np.bincount(labels, weights=x, minlength=groups)/count
+    merged_y = np.bincount(labels, weights=y, minlength=groups)/count
+    reach = np.hypot(x - merged_x[labels], y - merged_y[labels]) + radius
+    merged_radius = np.zeros(groups)
+    np.maximum.at(merged_radius, labels, reach)
+    return (labels, merged_x, merged_y, merged_radius)
+
+
+class ObstacleTable:
+    def __init__(self, gate=1.0, smoothing=0.5):
+        '''
+        @name: __init__
+        @brief: Structure-of-arrays obstacle storage. Columns are resized
+          with every incomming obstacle list and the collision state is
+          carried between lists by track ID.
+        @param: gate: maximum displacement (m) between two lists for an
+          obstacle to keep its track ID
+                smoothing: weight of the newest displacement in the
+          obstacle velocity estimate (1 disables the filter)
+        @return: --
+        '''
+        self.gate = gate
+        self.smoothing = smoothing
+        self.next_id = 0
+        self.stamp = None
+        self.resize(0)
+
+    def __len__(self):
+        return len(self.x)
+
+    def resize(self, n):
+        '''
+        @name: resize
+        @brief: Allocates zeroed columns for n obstacles.
+        @param: n: number of obstacles
+        @return: --
+        '''
+        self.x = np.zeros(n)
+        self.y = np.zeros(n)
+        self.radius = np.zeros(n)
+        self.total_radius = np.zeros(n)
+        self.alpha = np.zeros(n)
+        self.teta = np.zeros(n)
+        self.collision_flag = np.zeros(n, dtype=int)
+        self.past_collision_flag = np.zeros(n, dtype=int)
+        self.track_id = np.zeros(n, dtype=int)
+        self.ned_x = np.zeros(n)
+        self.ned_y = np.zeros(n)
+        self.vel_x = np.zeros(n)
+        self.vel_y = np.zeros(n)
+
+    def associate(self, ned_x, ned_y):
+        '''
+        @name: associate
+        @brief: Greedy nearest-neighbour association between the stored
+          obstacles and a new list, in NED reference frame.
+        @param: ned_x: new obstacles x coordinate in NED reference frame
+                ned_y: new obstacles y coordinate in NED reference frame
+        @return: match: index of the stored obstacle for each new one, -1
+                   when it is a new track
+        '''
+        match = -np.ones(len(ned_x), dtype=int)
+        if len(ned_x) == 0 or len(self.x) == 0:
+            return match
+        distance = np.hypot(ned_x[:, None] - self.ned_x[None, :],
+                            ned_y[:, None] - self.ned_y[None, :])
+        taken = np.zeros(len(self.x), dtype=bool)
+        order = np.argsort(distance, axis=None)
+        rows, cols = np.unravel_index(order, distance.shape)
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            if distance[row, col] > self.gate:
+                break
+            if match[row] < 0 and not taken[col]:
+                match[row] = col
+                taken[col] = True
+        return match
+
+    def update(self, x, y, radius, ned_x, ned_y, stamp=None):
+        '''
+        @name: update
+        @brief: Replaces the table contents with a new obstacle list, keeping
+          the avoidance state of the obstacles already tracked. When the
+          list stamp advances, the NED velocity of the tracked obstacles is
+          estimated from their displacement; otherwise it is carried over.
+        @param: x: obstacles x coordinate in the avoidance reference frame
+                y: obstacles y coordinate in the avoidance reference frame
+                radius: obstacles radius
+                ned_x: obstacles x coordinate in NED reference frame
+                ned_y: obstacles y coordinate in NED reference frame
+                stamp: time (s) the obstacle list was measured
+        @return: match: index of each obstacle in the previous table, -1
+                   for new tracks
+        '''
+        ned_x = np.asarray(ned_x, dtype=float)
+        ned_y = np.asarray(ned_y, dtype=float)
+        match = self.associate(ned_x, ned_y)
+        tracked = match >= 0
+        previous = match[tracked]
+
+        alpha = self.alpha[previous]
+        teta = self.teta[previous]
+        collision_flag = self.collision_flag[previous]
+        track_id = self.track_id[previous]
+        vel_x = self.vel_x[previous]
+        vel_y = self.vel_y[previous]
+        if stamp is not None and self.stamp is not None and stamp > self.stamp:
+            dt = stamp - self.stamp
+            s = self.smoothing
+            vel_x = (1 - s)*vel_x + s*(ned_x[tracked] - self.ned_x[previous])/dt
+            vel_y = (1 - s)*vel_y + s*(ned_y[tracked] - self.ned_y[previous])/dt
+        if stamp is not None:
+            self.stamp = stamp
+
+        self.resize(len(ned_x))
+        self.x[:] = x
+        self.y[:] = y
+        self.radius[:] = radius
+        self.ned_x[:] = ned_x
+        self.ned_y[:] = ned_y
+        self.alpha[tracked] = alpha
+        self.teta[tracked] = teta
+        self.collision_flag[tracked] = collision_flag
+        self.past_collision_flag[tracked] = collision_flag
+        self.track_id[tracked] = track_id
+        self.vel_x[tracked] = vel_x
+        self.vel_y[tracked] = vel_y
+        new = np.count_nonzero(~tracked)
+        self.track_id[~tracked] = np.arange(self.next_id, self.next_id + new)
+        self.next_id += new
+        return match
+
+    def collision_cone(self, ppx, ppy, vel_ppx, vel_ppy, margin=.30):
+        '''
+        @name: collision_cone
+        @brief: Collision cone test of every obstacle against the boat
+          velocity. Colliding obstacles get their total radius grown by the
+          avoidance margin, their avoid angle (alpha) and the heading change
+          needed to leave the cone (teta); the collision flag is latched until
+          alpha turns negative. teta is reset for the rest, as the former
+          per obstacle code meant to (it set a misspelled tetha instead).
+        @param: ppx: boat x coordinate
+                ppy: boat y coordinate
+                vel_ppx: boat velocity x
+                vel_ppy: boat velocity y
+                margin: extra radius added to colliding obstacles
+        @return: collision: boolean array, impending collision
+                 distance: distance from the boat to each obstacle
+                 distance_free: distance to each obstacle edge
+        '''
+        dx = self.x - ppx
+        dy = self.y - ppy
+        distance = np.sqrt(dx*dx + dy*dy)
+        distance_free = distance - self.total_radius
+
+        # Cone half angle, inside the obstacle the cone covers every heading
+        ratio = np.ones(len(distance))
+        np.divide(self.total_radius, distance, out=ratio,
+                  where=distance > self.total_radius)
+        cone = np.arcsin(ratio)
+        beta = math.atan2(vel_ppy, vel_ppx) - np.arctan2(dy, dx)
+        beta = np.where(beta > math.pi, beta - 2*math.pi, beta)
+        beta = np.abs(np.where(beta < -math.pi, beta + 2*math.pi, beta))
+        collision = (beta <= cone) | (self.collision_flag == 1)
+
+        c = np.flatnonzero(collision)
+        d = distance[c]
+        total_radius = self.total_radius[c] + margin
+        tangent = np.sqrt(np.abs((d - total_radius)*(d + total_radius)))
+        teta = np.arctan2(total_radius, tangent)
+        side = np.abs(ppy - self.y[c])
+        gamma1 = np.zeros(len(c))
+        np.divide(side, d, out=gamma1, where=d > 0)
+        gamma1 = np.arcsin(gamma1)
+        alpha = (math.pi/2) - (((math.pi/2) - teta) + gamma1)
+        hb = side/np.cos(alpha)
+
+        self.total_radius[c] = total_radius
+        self.alpha[c] = alpha
+        self.teta[:] = 0
+        self.teta[c] = np.arctan2(total_radius - hb, tangent)
+        self.collision_flag[c] = np.where(alpha < 0.0, 0, 1)
+        return (collision, distance, distance_free)
+
+
+def time_to_collision(px, py, vx, vy, radius, cand_vx, cand_vy, horizon):
+    '''
+    @name: time_to_collision
+    @brief: Velocity obstacle test of M candidate velocities against N
+      moving obstacles. A candidate lies inside the velocity obstacle of an
+      obstacle when the relative motion reaches the obstacle circle within
+      the horizon; all M x N pairs are solved at once.
+    @param: px: obstacles x coordinate relative to the boat (N,)
+            py: obstacles y coordinate relative to the boat (N,)
+            vx: obstacles velocity x (N,)
+            vy: obstacles velocity y (N,)
+            radius: obstacles radius including the boat and safety radius (N,)
+            cand_vx: candidate boat velocity x (M,)
+            cand_vy: candidate boat velocity y (M,)
+            horizon: time horizon (s)
+    @return: ttc: time to the first collision of each candidate, inf when
+               it is free for the whole horizon (M,)
+    '''
+    cand_vx = np.asarray(cand_vx, dtype=float)
+    ttc = np.full(len(cand_vx), np.inf)
+    if len(px) == 0:
+        return ttc
+    # Relative velocity of the boat with respect to each obstacle (M,N)
+    rvx = cand_vx[:, None] - vx[None, :]
+    rvy = np.asarray(cand_vy, dtype=float)[:, None] - vy[None, :]
+    # |p - rv*t| = radius  ->  a*t^2 - 2*b*t + c = 0
+    a = rvx*rvx + rvy*rvy
+    b = rvx*px[None, :] + rvy*py[None, :]
+    c = px*px + py*py - radius*radius
+    disc = b*b - a*c[None, :]
+    hit = (disc >= 0) & (b > 0) & (a > 0)
+    t = np.full(a.shape, np.inf)
+    t[hit] = ((b - np.sqrt(np.maximum(disc, 0)))/np.where(a > 0, a, 1))[hit]
+    t[t > horizon] = np.inf
+    # Already inside an obstacle circle
+    t[:, c <= 0] = 0.
+    return t.min(axis=1)
@@ -0,0 +1,121 @@
+'''
+----------------------------------------------------------
+    @file: recorder.py
+    @date: Mon Oct 19, 2026
+    @brief: Telemetry recorder for the control loops. Fixed-width records
+      go to a memory-mapped .npy file used as a ring buffer, so a sample
+      costs one structured array assignment, the file size is bounded and
+      the kernel writes the pages back even if the node dies. Every record
+      carries a sequence number, which is all the loader needs to put the
+      ring back in order.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import os
+import time
+
+import numpy as np
+
+
+def record_dtype(fields):
+    '''
+    @name: record_dtype
+    @brief: Record layout: sequence number, wall time and float32 fields.
+    @param: fields: field names
+    @return: dtype: numpy structured dtype
+    '''
+    return np.dtype([('seq', '<u8'), ('t', '<f8')] + [(name, '<f4') for name in fields])
+
+
+class Recorder:
+    def __init__(self, path, fields, capacity=360000):
+        '''
+        @name: __init__
+        @brief: Opens the ring file, resuming after the last record when it
+          has the same layout, or creating it.
+        @param: path: .npy file path
+                fields: field names, in the order given to record()
+                capacity: records kept before the oldest are overwritten,
+                  one hour at 100 Hz by default
+        @return: --
+        '''
+        self.path = path
+        self.fields = tuple(fields)
+        dtype = record_dtype(self.fields)
+        self.data = None
+        if os.path.exists(path):
+            try:
+                data = np.lib.format.open_memmap(path, mode='r+')
+                if data.dtype == dtype and data.shape == (capacity,):
+                    self.data = data
+            except (ValueError, IOError):
+                pass
+        if self.data is None:
+            directory = os.path.dirname(path)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            self.data = np.lib.format.open_memmap(path, mode='w+', dtype=dtype,
+                                                  shape=(capacity,))
+        self.capacity = capacity
+        self.seq = int(self.data['seq'].max()) + 1
+        self.index = self.seq % capacity
+
+    def record(self, *values):
+        '''
+        @name: record
+        @brief: Appends a record, overwriting the oldest one when full.
+          Records after close() are dropped, the node loops still send
+          their final zero command once the shutdown hook closed the file.
+        @param: values: field values, in the order of fields
+        @return: --
+        '''
+        if self.data is None:
+            return
+        self.data[self.index] = (self.seq, time.time()) + values
+        self.seq += 1
+        self.index += 1
+        if self.index == self.capacity:
+            self.index = 0
+
+    def flush(self):
+        if self.data is not None:
+            self.data.flush()
+
+    def close(self):
+        '''
+        @name: close
+        @brief: Writes the pages back and releases the file.
+        @param: --
+        @return: --
+        '''
+        if self.data is not None:
+            self.data.flush()
+            self.data = None
+
+
+def load(path):
+    '''
+    @name: load
+    @brief: Reads a ring file in chronological order.
+    @param: path: .npy file written by a Recorder
+    @return: records: structured array, oldest record first
+    '''
+    data = np.load(path, mmap_mode='r')
+    valid = data[data['seq'] > 0]
+    return np.array(valid[np.argsort(valid['seq'], kind='mergesort')])
+
+
+def load_columns(path):
+    '''
+    @name: load_columns
+    @brief: Reads a ring file as a dict of columns, for offline analysis.
+    @param: path: .npy file written by a Recorder
+    @return: columns: field name to array, time relative to the first record
+    '''
+    records = load(path)
+    columns = dict((name, records[name]) for name in records.dtype.names)
+    if len(records):
+        columns['t'] = columns['t'] - columns['t'][0]
+    return columns
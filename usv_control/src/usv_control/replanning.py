@@ -0,0 +1,99 @@
+'''
+----------------------------------------------------------
+    @file: replanning.py
+    @date: Mon Oct 19, 2026
+    @brief: Incremental replanning between the mission planners and the
+      LOS nodes. A planner diffs every new plan against the plan the LOS
+      node follows and only sends the waypoints that moved beyond a
+      tolerance, as a tail update that keeps the segment progress of LOS.
+      Tail update message data: [first, x_first, y_first, ..., 3], the
+      waypoints from index first on are replaced, the previous ones kept.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import time
+
+import numpy as np
+
+NED_MODE = 0
+TAIL_MODE = 3
+
+
+def splice(waypoints, first, tail):
+    '''
+    @name: splice
+    @brief: Applies a tail update to a waypoint list.
+    @param: waypoints: flat NED waypoint list [x0, y0, x1, y1, ...]
+            first: index of the first replaced waypoint
+            tail: flat list of the new waypoints from index first on
+    @return: waypoints: flat waypoint list
+    '''
+    first = min(max(int(first), 0), len(waypoints)//2)
+    return list(waypoints[:2*first]) + list(tail)
+
+
+class PlanTracker:
+    def __init__(self, tolerance=0.5, refresh=1., clock=time.time):
+        '''
+        @name: __init__
+        @brief: Keeps the plan known to the LOS node.
+        @param: tolerance: distance (m) a waypoint has to move to be resent
+                refresh: period (s) at which an unchanged plan is sent again
+                  in full, for a LOS node that missed it; LOS ignores a
+                  path equal to the one it follows
+                clock: callable returning the time in seconds
+        @return: --
+        '''
+        self.tolerance = tolerance
+        self.refresh = refresh
+        self.clock = clock
+        self.active = np.zeros((0, 2))
+        self.last_sent = None
+
+    def reset(self):
+        self.active = np.zeros((0, 2))
+        self.last_sent = None
+
+    def _sent(self, data):
+        self.last_sent = self.clock()
+        return data
+
+    def update(self, waypoints):
+        '''
+        @name: update
+        @brief: Diffs a new plan against the active one. A plan that starts
+          at a waypoint of the active plan (the waypoints already reached
+          are usually not planned again) is aligned to it, so the waypoints
+          before are kept and only the tail is compared.
+        @param: waypoints: flat NED waypoint list of the new plan
+        @return: data: waypoints message data, a tail update or a full NED
+                   path, None when no waypoint moved beyond the tolerance
+                   and the plan was sent less than refresh seconds ago
+        '''
+        new = np.asarray(waypoints, dtype=float).reshape(-1, 2)
+        old = self.active
+        offset = None
+        if len(old) and len(new):
+            match = np.nonzero(np.hypot(old[:, 0] - new[0, 0],
+                                        old[:, 1] - new[0, 1]) <= self.tolerance)[0]
+            if len(match):
+                offset = int(match[0])
+        if offset is None:
+            # Nothing in common, the plan starts over from the USV position
+            self.active = new
+            return self._sent(new.ravel().tolist() + [NED_MODE])
+
+        merged = np.vstack((old[:offset], new))
+        common = min(len(old), len(merged))
+        moved = np.hypot(merged[:common, 0] - old[:common, 0],
+                         merged[:common, 1] - old[:common, 1]) > self.tolerance
+        first = int(np.argmax(moved)) if moved.any() else common
+        if first == len(old) and first == len(merged):
+            if self.refresh is not None and self.clock() - self.last_sent >= self.refresh:
+                return self._sent(old.ravel().tolist() + [NED_MODE])
+            return None
+        # Waypoints within the tolerance keep the values LOS already has
+        self.active = np.vstack((old[:first], merged[first:]))
+        return self._sent([first] + merged[first:].ravel().tolist() + [TAIL_MODE])
@@ -0,0 +1,185 @@
+'''
+----------------------------------------------------------
+    @file: simulator.py
+    @date: Mon Oct 19, 2026
+    @brief: Faster than real time simulation of N boats with no ROS
+      master. The 3-DOF model of usv_control.dynamics is stepped in
+      lockstep with the LOS guidance and a speed and heading controller,
+      and the states are recorded at a fixed period.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import numpy as np
+
+from usv_control import dynamics, guidance, smoothing, speed_profile
+
+
+class LosGuidance:
+    def __init__(self, waypoints, n, los=None, switch_radius=1, smoothing_radius=0,
+                 profile=False):
+        '''
+        @name: __init__
+        @brief: LOS waypoint manager of los.py for N boats following the
+          same NED path.
+        @param: waypoints: flat NED waypoint list [x0, y0, x1, y1, ...]
+                n: number of boats
+                los: guidance.LineOfSight, the los.py parameters by default
+                switch_radius: distance to the waypoint that ends a segment
+                smoothing_radius: corner arc radius, 0 to follow the polyline
+                profile: cap the speed with a speed_profile.SpeedProfile
+        @return: --
+        '''
+        self.smoothing = smoothing_radius > 0
+        if self.smoothing:
+            waypoints = smoothing.fillet_path(waypoints, smoothing_radius)
+        self.path = guidance.WaypointPath(waypoints)
+        self.los = los if los is not None else guidance.LineOfSight()
+        self.profile = None
+        if profile:
+            self.profile = speed_profile.SpeedProfile(self.path, self.los.u_max, self.los.u_min)
+        self.switch_radius = switch_radius
+        self.k = np.ones(n, dtype=int)
+        self.ye = np.zeros(n)
+        self.u_d = np.zeros(n)
+        self.psi_d = np.zeros(n)
+
+    def finished(self):
+        '''
+        @name: finished
+        @brief: Whether each boat reached the last waypoint.
+        @return: finished: boolean array
+        '''
+        return self.k > len(self.path)
+
+    def command(self, eta):
+        '''
+        @name: command
+        @brief: Desired speed and heading of every boat.
+        @param: eta: (N,3) NED x, NED y and yaw
+        @return: u_d: desired speeds
+                 psi_d: desired headings
+        '''
+        n = len(eta)
+        ned_x = eta[:, 0].tolist()
+        ned_y = eta[:, 1].tolist()
+        yaw = eta[:, 2].tolist()
+        for i in range(n):
+            k, segment, ye, distance, u_max = guidance.los_manager(
+                self.path, int(self.k[i]), ned_x[i], ned_y[i], self.switch_radius,
+                self.smoothing, self.profile)
+            self.k[i] = k
+            if segment is None:
+                self.u_d[i] = 0
+                self.psi_d[i] = yaw[i]
+                continue
+            bearing, delta = self.los.bearing(segment.ak, ye)
+            self.ye[i] = ye
+            self.u_d[i] = self.los.speed(bearing, yaw[i], distance, u_max)
+            self.psi_d[i] = bearing
+        return (self.u_d.copy(), self.psi_d.copy())
+
+
+def backstepping_controller(**gains):
+    '''
+    @name: backstepping_controller
+    @brief: Vectorized bc.py control law as a simulator controller.
+    @param: gains: dynamics.backstepping gain overrides
+    @return: controller: callable(upsilon, eta, u_d, psi_d) -> (T_port, T_stbd)
+    '''
+    def controller(upsilon, eta, u_d, psi_d):
+        return dynamics.backstepping(upsilon[:, 0], upsilon[:, 1], upsilon[:, 2],
+                                     eta[:, 2], u_d, psi_d, **gains)
+    return controller
+
+
+class BatchSimulator:
+    def __init__(self, n, integral_step=0.01, control_period=0.01,
+                 guidance_period=0.01, record_period=0.1):
+        '''
+        @name: __init__
+        @brief: Lockstep simulation of N boats.
+        @param: n: number of boats
+                integral_step: model integration step in seconds
+                control_period: controller period in seconds
+                guidance_period: guidance period in seconds
+                record_period: recording period in seconds
+        @return: --
+        '''
+        self.n = n
+        self.model = dynamics.UsvModel(integral_step)
+        self.substeps = max(1, int(round(control_period/integral_step)))
+        self.control_period = self.substeps*integral_step
+        self.guidance_every = max(1, int(round(guidance_period/self.control_period)))
+        self.record_every = max(1, int(round(record_period/self.control_period)))
+        self.reset()
+
+    def reset(self, upsilon=None, eta=None):
+        '''
+        @name: reset
+        @brief: Sets the initial state, at rest on the origin by default.
+        @param: upsilon: (N,3) surge speed, sway speed and yaw rate
+                eta: (N,3) NED x, NED y and yaw
+        @return: --
+        '''
+        if upsilon is None:
+            upsilon = np.zeros((self.n, 3))
+        if eta is None:
+            eta = np.zeros((self.n, 3))
+        self.model.reset(upsilon, eta)
+        self.time = 0.
+
+    def run(self, controller, guidance, duration, disturbance=None):
+        '''
+        @name: run
+        @brief: Runs the closed loop for a duration or until every boat
+          finishes the path.
+        @param: controller: callable(upsilon, eta, u_d, psi_d) returning
+                  the port and starboard thrust arrays
+                guidance: LosGuidance, or callable(eta) returning the
+                  desired speed and heading arrays
+                duration: maximum simulated time in seconds
+                disturbance: optional callable(time, upsilon, eta) returning
+                  (N,2) port and starboard thrust offsets
+        @return: log: dict of recorded (N,K) arrays 't', 'x', 'y', 'psi',
+                  'u', 'v', 'r', 'u_d', 'psi_d', 'T_port', 'T_stbd', 'ye'
+        '''
+        command = guidance.command if hasattr(guidance, 'command') else guidance
+        keys = ('x', 'y', 'psi', 'u', 'v', 'r', 'u_d', 'psi_d', 'T_port', 'T_stbd', 'ye')
+        log = dict((key, []) for key in keys)
+        log['t'] = []
+        ye = np.zeros(self.n)
+        u_d = np.zeros(self.n)
+        psi_d = self.model.eta[:, 2].copy()
+
+        steps = int(round(duration/self.control_period))
+        for step in range(steps):
+            upsilon = self.model.upsilon
+            eta = self.model.eta
+            if step % self.guidance_every == 0:
+                u_d, psi_d = command(eta)
+                if hasattr(guidance, 'ye'):
+                    ye = guidance.ye.copy()
+            T_port, T_stbd = controller(upsilon, eta, u_d, psi_d)
+            if disturbance is not None:
+                offset = disturbance(self.time, upsilon, eta)
+                T_port = T_port + offset[:, 0]
+                T_stbd = T_stbd + offset[:, 1]
+            if step % self.record_every == 0:
+                log['t'].append(self.time)
+                for key, value in (('x', eta[:, 0]), ('y', eta[:, 1]), ('psi', eta[:, 2]),
+                                   ('u', upsilon[:, 0]), ('v', upsilon[:, 1]),
+                                   ('r', upsilon[:, 2]), ('u_d', u_d), ('psi_d', psi_d),
+                                   ('T_port', T_port), ('T_stbd', T_stbd), ('ye', ye)):
+                    log[key].append(np.array(value, dtype=float))
+            for substep in range(self.substeps):
+                self.model.step(T_port, T_stbd)
+            self.time += self.control_period
+            if hasattr(guidance, 'finished') and guidance.finished().all():
+                break
+
+        result = dict((key, np.column_stack(value) if value else np.zeros((self.n, 0)))
+                      for key, value in log.items() if key != 't')
+        result['t'] = np.array(log['t'])
+        return result
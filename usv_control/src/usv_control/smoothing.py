@@ -0,0 +1,95 @@
+'''
+----------------------------------------------------------
+    @file: smoothing.py
+    @date: Mon Oct 19, 2026
+    @brief: Curvature bounded smoothing of waypoint polylines. Every
+      corner is replaced by a circular arc tangent to both legs (the
+      left or right turn of a Dubins path between two straight legs), with
+      the radius given by the turn rate limit of the USV, and the arcs are
+      sampled into dense waypoints for the LOS guidance.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import math
+
+
+def turn_radius(u, r_max):
+    '''
+    @name: turn_radius
+    @brief: Smallest turn radius at a speed.
+    @param: u: surge speed in m/s
+            r_max: max yaw rate in rad/s
+    @return: radius: turn radius in meters
+    '''
+    return u/r_max
+
+
+def fillet_path(waypoints, radius, spacing=0.5):
+    '''
+    @name: fillet_path
+    @brief: Rounds every corner of a polyline with an arc of the given
+      radius. The radius shrinks where the legs are too short to fit the
+      arc (half of each inner leg is available to each of its corners), so
+      hairpin turns keep a sharp corner.
+    @param: waypoints: flat list of NED waypoints [x0, y0, x1, y1, ...]
+            radius: arc radius in meters
+            spacing: max distance between the waypoints sampled on an arc
+    @return: waypoints: flat list of the smoothed waypoints, same first and
+               last waypoints
+    '''
+    points = [(waypoints[i], waypoints[i + 1]) for i in range(0, len(waypoints) - 1, 2)]
+    # Repeated waypoints have no direction
+    unique = points[:1]
+    for point in points[1:]:
+        if point != unique[-1]:
+            unique.append(point)
+    points = unique
+    if len(points) < 3 or radius <= 0:
+        return [value for point in points for value in point]
+
+    last = len(points) - 1
+    smoothed = [points[0]]
+    for i in range(1, last):
+        x0, y0 = points[i - 1]
+        x1, y1 = points[i]
+        x2, y2 = points[i + 1]
+        length_in = math.hypot(x1 - x0, y1 - y0)
+        length_out = math.hypot(x2 - x1, y2 - y1)
+        dx_in, dy_in = (x1 - x0)/length_in, (y1 - y0)/length_in
+        dx_out, dy_out = (x2 - x1)/length_out, (y2 - y1)/length_out
+        turn = math.atan2(dx_in*dy_out - dy_in*dx_out, dx_in*dx_out + dy_in*dy_out)
+        if abs(turn) < 1e-3 or abs(turn) > math.pi - 1e-3:
+            smoothed.append(points[i])
+            continue
+
+        # Distance from the corner to the tangent points
+        half_turn = math.tan(abs(turn)/2)
+        available = min(length_in*(1. if i == 1 else .5),
+                        length_out*(1. if i == last - 1 else .5))
+        r = min(radius, available/half_turn)
+        tangent = r*half_turn
+
+        # Arc from the incoming tangent point, rotating the radius by turn
+        ax = x1 - dx_in*tangent
+        ay = y1 - dy_in*tangent
+        side = 1. if turn > 0 else -1.
+        cx = ax - side*dy_in*r
+        cy = ay + side*dx_in*r
+        samples = max(2, int(math.ceil(r*abs(turn)/spacing)))
+        for j in range(samples + 1):
+            angle = turn*j/samples
+            cos_a = math.cos(angle)
+            sin_a = math.sin(angle)
+            rx = ax - cx
+            ry = ay - cy
+            smoothed.append((cx + rx*cos_a - ry*sin_a, cy + rx*sin_a + ry*cos_a))
+    smoothed.append(points[-1])
+
+    # Tangent points that fall on a previous point are dropped
+    result = [smoothed[0]]
+    for point in smoothed[1:]:
+        if math.hypot(point[0] - result[-1][0], point[1] - result[-1][1]) > 1e-6:
+            result.append(point)
+    return [value for point in result for value in point]
@@ -0,0 +1,85 @@
+'''
+----------------------------------------------------------
+    @file: spatial_index.py
+    @date: Mon Oct 19, 2026
+    @brief: Nearest neighbour queries over a detection list. The index is
+      built once per detection message, with the distances to the USV
+      computed in one pass, and is shared by every query of the mission
+      until the next message. k nearest queries use np.argpartition.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import numpy as np
+
+
+class SpatialIndex:
+    def __init__(self, x, y, labels=None):
+        '''
+        @name: __init__
+        @brief: Index over points in the body reference frame.
+        @param: x: points x coordinate
+                y: points y coordinate
+                labels: optional label of each point (buoy color)
+        @return: --
+        '''
+        self.x = np.asarray(x, dtype=float).reshape(-1)
+        self.y = np.asarray(y, dtype=float).reshape(-1)
+        self.labels = np.array(labels if labels is not None else [None]*len(self.x),
+                               dtype=object).reshape(-1)
+        self.distance = np.hypot(self.x, self.y)
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.x)
+
+    def _distance(self, x, y):
+        if x == 0 and y == 0:
+            return self.distance
+        return np.hypot(self.x - x, self.y - y)
+
+    def nearest(self, k=1, x=0, y=0, label=None):
+        '''
+        @name: nearest
+        @brief: k nearest points, to the USV by default. Queries from the
+          USV are cached until the next message.
+        @param: k: number of points
+                x: query point x coordinate
+                y: query point y coordinate
+                label: only points with this label when given
+        @return: indexes: up to k point indexes, nearest first
+        '''
+        key = (k, x, y, label)
+        indexes = self.cache.get(key)
+        if indexes is not None:
+            return indexes
+        distance = self._distance(x, y)
+        candidates = np.arange(len(self.x))
+        if label is not None:
+            candidates = candidates[self.labels == label]
+            distance = distance[candidates]
+        if len(candidates) > k:
+            closest = np.argpartition(distance, k - 1)[:k]
+            candidates = candidates[closest]
+            distance = distance[closest]
+        indexes = candidates[np.argsort(distance, kind='mergesort')]
+        self.cache[key] = indexes
+        return indexes
+
+    def within(self, radius, x=0, y=0, label=None):
+        '''
+        @name: within
+        @brief: Points within a radius, of the USV by default.
+        @param: radius: search radius
+                x: query point x coordinate
+                y: query point y coordinate
+                label: only points with this label when given
+        @return: indexes: point indexes, nearest first
+        '''
+        distance = self._distance(x, y)
+        mask = distance <= radius
+        if label is not None:
+            mask &= self.labels == label
+        indexes = np.nonzero(mask)[0]
+        return indexes[np.argsort(distance[indexes], kind='mergesort')]
@@ -0,0 +1,88 @@
+'''
+----------------------------------------------------------
+    @file: speed_profile.py
+    @date: Mon Oct 19, 2026
+    @brief: Feasible speed along a LOS path. The speed allowed by the
+      curvature at every waypoint is limited by the acceleration of the
+      USV with a forward and a backward pass, both computed in closed form
+      with cumulative minimums over NumPy arrays, once per path.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import bisect
+
+import numpy as np
+
+
+class SpeedProfile:
+    def __init__(self, path, u_max=1, u_min=0.3, r_max=0.15, a_max=0.2,
+                 a_brake=None, corner_length=2, u_end=None):
+        '''
+        @name: __init__
+        @brief: Computes the speed profile of a path.
+        @param: path: guidance.WaypointPath
+                u_max: max speed in m/s
+                u_min: min speed in m/s
+                r_max: max yaw rate in rad/s, the speed at a waypoint is
+                  r_max over its curvature
+                a_max: max acceleration in m/s^2 (uamax of bc.py)
+                a_brake: max deceleration in m/s^2, a_max by default
+                corner_length: arc length over which a sharp corner is
+                  turned, bounds the curvature of polyline corners
+                u_end: speed at the last waypoint, u_min by default
+        @return: --
+        '''
+        if a_brake is None:
+            a_brake = a_max
+        if u_end is None:
+            u_end = u_min
+        s = np.asarray(path.s, dtype=float)
+        n = len(s)
+        cap = np.full(n, float(u_max))
+        if n > 2:
+            # Turn angle at each inner waypoint over the length it is
+            # turned in: the mean of both legs, at most corner_length
+            turn = np.abs(np.angle(np.exp(1j*np.diff(path.ak))))
+            legs = np.minimum(0.5*(path.length[:-1] + path.length[1:]), corner_length)
+            curvature = turn/np.maximum(legs, 1e-6)
+            with np.errstate(divide='ignore'):
+                cap[1:-1] = np.clip(r_max/curvature, u_min, u_max)
+        if n > 0:
+            cap[-1] = min(u_end, u_max)
+
+        # v^2 grows at most 2*a per meter, so v^2(s) = min over the
+        # waypoints behind (forward) or ahead (backward) of the cap plus
+        # the distance allowance
+        cap2 = cap*cap
+        forward = 2*a_max*s + np.minimum.accumulate(cap2 - 2*a_max*s)
+        backward = -2*a_brake*s + np.minimum.accumulate((cap2 + 2*a_brake*s)[::-1])[::-1]
+        self.s = s
+        self.u = np.sqrt(np.maximum(np.minimum(forward, backward), u_min*u_min))
+        self.u_max = u_max
+        self.a_max = a_max
+        self.a_brake = a_brake
+        self._s = self.s.tolist()
+        self._u2 = (self.u*self.u).tolist()
+
+    def speed(self, s):
+        '''
+        @name: speed
+        @brief: Speed at an arc length. Between two waypoints the speed
+          follows the acceleration limits, so v^2 is interpolated.
+        @param: s: distance travelled along the path
+        @return: u: speed in m/s
+        '''
+        i = bisect.bisect_right(self._s, s)
+        if i <= 0:
+            return self._u2[0]**0.5 if self._u2 else 0.
+        if i >= len(self._s):
+            return self._u2[-1]**0.5
+        s0 = self._s[i - 1]
+        s1 = self._s[i]
+        u0 = self._u2[i - 1]
+        u1 = self._u2[i]
+        # Accelerate from the start, brake to the end, whichever is lower
+        return min(u0 + 2*self.a_max*(s - s0), u1 + 2*self.a_brake*(s1 - s),
+                   self.u_max*self.u_max)**0.5
@@ -0,0 +1,153 @@
+'''
+----------------------------------------------------------
+    @file: state_machine.py
+    @date: Mon Oct 19, 2026
+    @brief: Mission state machines. A mission is declared as states with
+      an update action, the event it waits for, timed actions and
+      transitions held for a time. One scheduler steps the machine once
+      per rate.sleep(), so waiting for a detection or a timeout never spins.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import threading
+import time
+
+
+class Event:
+    def __init__(self):
+        '''
+        @name: __init__
+        @brief: Flag set from a subscriber callback and consumed by the
+          state machine thread.
+        @param: --
+        @return: --
+        '''
+        self.flag = threading.Event()
+
+    def set(self):
+        self.flag.set()
+
+    def consume(self):
+        '''
+        @name: consume
+        @brief: Clears the flag.
+        @param: --
+        @return: fired: True if it was set since the last consume
+        '''
+        if self.flag.is_set():
+            self.flag.clear()
+            return True
+        return False
+
+
+class State:
+    def __init__(self, name, update=None, event=None, enter=None,
+                 transitions=(), timers=()):
+        '''
+        @name: __init__
+        @brief: State declaration.
+        @param: name: state name, published as the mission state
+                update: callable run every step, or only when event fired
+                event: Event the update waits for
+                enter: callable run when the state is entered
+                transitions: (condition, target) or (condition, target,
+                  hold) tuples, checked in order every step; the machine
+                  goes to target once condition() has been true for hold
+                  seconds (0 by default)
+                timers: (condition, period, action) tuples; action runs
+                  every period seconds while condition() is true (always
+                  if condition is None)
+        @return: --
+        '''
+        self.name = name
+        self.update = update
+        self.event = event
+        self.enter = enter
+        self.transitions = [tuple(transition) + (0,)*(3 - len(transition))
+                            for transition in transitions]
+        self.timers = list(timers)
+
+
+class StateMachine:
+    def __init__(self, states, initial, clock=time.time, on_step=None):
+        '''
+        @name: __init__
+        @brief: State machine over declared states.
+        @param: states: list of State
+                initial: name of the first state
+                clock: callable returning the time in seconds
+                on_step: optional callable(state name) run every step
+        @return: --
+        '''
+        self.states = dict((state.name, state) for state in states)
+        self.clock = clock
+        self.on_step = on_step
+        self.state = None
+        self.entered = 0.
+        self.since = {}
+        self.enter(initial)
+
+    def enter(self, name):
+        '''
+        @name: enter
+        @brief: Goes to a state, restarting its timers and holds. An event
+          fired before entering is kept, so the latest data is served.
+        @param: name: state name
+        @return: --
+        '''
+        self.state = self.states[name]
+        self.entered = self.clock()
+        self.since = {}
+        if self.state.enter is not None:
+            self.state.enter()
+
+    def elapsed(self):
+        return self.clock() - self.entered
+
+    def _held(self, key, condition, duration, now):
+        # True once condition has been true for duration, the hold
+        # restarts whenever it is false
+        if condition is not None and not condition():
+            self.since.pop(key, None)
+            return False
+        since = self.since.setdefault(key, now)
+        return now - since >= duration
+
+    def step(self):
+        '''
+        @name: step
+        @brief: One scheduler step: the state update, its timers, then its
+          transitions.
+        @param: --
+        @return: --
+        '''
+        state = self.state
+        if self.on_step is not None:
+            self.on_step(state.name)
+        if state.update is not None and (state.event is None or state.event.consume()):
+            state.update()
+        now = self.clock()
+        for i, (condition, period, action) in enumerate(state.timers):
+            if self._held(('timer', i), condition, period, now):
+                action()
+                self.since[('timer', i)] = now
+        for i, (condition, target, hold) in enumerate(state.transitions):
+            if self._held(('transition', i), condition, hold, now):
+                self.enter(target)
+                break
+
+    def run(self, sleep, is_shutdown=None, active=None):
+        '''
+        @name: run
+        @brief: Scheduler loop, one step per sleep.
+        @param: sleep: callable that waits for the next step (rate.sleep)
+                is_shutdown: optional callable, stops the loop when true
+                active: optional callable, stops the loop when false
+        @return: --
+        '''
+        while ((is_shutdown is None or not is_shutdown()) and
+               (active is None or active())):
+            self.step()
+            sleep()
@@ -0,0 +1,277 @@
+'''
+----------------------------------------------------------
+    @file: world_model.py
+    @date: Mon Oct 19, 2026
+    @brief: Persistent map of the buoys seen during a mission. Detections
+      are moved to the NED reference frame and merged with the buoy of the
+      same color within a gate, keeping a running mean and covariance of
+      its position, so buoys that leave the camera view are not lost.
+      Buoys are stored as NumPy columns and indexed by a spatial hash for
+      the association and radius queries.
+    @version: 1.0
+    Open source
+----------------------------------------------------------
+'''
+
+import math
+
+import numpy as np
+
+from usv_control import frames
+
+
+class BuoyMap:
+    def __init__(self, gate=1.0, window=30, tentative_timeout=2.0, capacity=32):
+        '''
+        @name: __init__
+        @brief: Empty buoy map.
+        @param: gate: max distance (m) between a detection and a buoy for
+                  them to be merged, also the spatial hash cell size
+                window: max number of observations averaged, older ones
+                  fade so a buoy first seen far away converges to its
+                  closer observations
+                tentative_timeout: time (s) after which a buoy seen only
+                  once is dropped as a false detection
+                capacity: initial number of buoys allocated
+        @return: --
+        '''
+        self.gate = gate
+        self.window = window
+        self.tentative_timeout = tentative_timeout
+        self.n = 0
+        self.stamp = None
+        self.grid = {}
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.cov = np.zeros((capacity, 2, 2))
+        self.count = np.zeros(capacity, dtype=int)
+        self.first_seen = np.zeros(capacity)
+        self.last_seen = np.zeros(capacity)
+        self.color = np.zeros(capacity, dtype=object)
+        self.clase = np.zeros(capacity, dtype=object)
+
+    def __len__(self):
+        return self.n
+
+    def _cell(self, x, y):
+        return (int(math.floor(x/self.gate)), int(math.floor(y/self.gate)))
+
+    def _grow(self):
+        capacity = 2*len(self.x)
+        for name in ('x', 'y', 'cov', 'count', 'first_seen', 'last_seen',
+                     'color', 'clase'):
+            column = getattr(self, name)
+            grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[:self.n] = column[:self.n]
+            setattr(self, name, grown)
+
+    def _candidates(self, x, y, radius):
+        # Buoys in the cells touched by the circle
+        cx0, cy0 = self._cell(x - radius, y - radius)
+        cx1, cy1 = self._cell(x + radius, y + radius)
+        ids = []
+        for gx in range(cx0, cx1 + 1):
+            for gy in range(cy0, cy1 + 1):
+                ids.extend(self.grid.get((gx, gy), ()))
+        return ids
+
+    def observe(self, points, colors, classes, stamp):
+        '''
+        @name: observe
+        @brief: Merges a detection list in NED reference frame. Each
+          detection goes to the nearest buoy of its color within the gate
+          not taken by another detection of the list, or becomes a new buoy.
+        @param: points: (N,2) detections in NED reference frame
+                colors: detection colors
+                classes: detection classes
+                stamp: time (s) of the detection list
+        @return: ids: buoy index of each detection
+        '''
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        self.stamp = stamp
+        ids = []
+        taken = set()
+        for (px, py), color, clase in zip(points.tolist(), colors, classes):
+            best = -1
+            best_distance = self.gate
+            for i in self._candidates(px, py, self.gate):
+                if i in taken or self.color[i] != color:
+                    continue
+                distance = math.hypot(px - self.x[i], py - self.y[i])
+                if distance <= best_distance:
+                    best = i
+                    best_distance = distance
+            if best < 0:
+                best = self._add(px, py, color, clase, stamp)
+            else:
+                self._merge(best, px, py, stamp)
+            taken.add(best)
+            ids.append(best)
+        return ids
+
+    def observe_body(self, points, colors, classes, ned_x, ned_y, yaw, stamp):
+        '''
+        @name: observe_body
+        @brief: observe() for detections in body reference frame.
+        @param: points: (N,2) detections in body reference frame
+                colors: detection colors
+                classes: detection classes
+                ned_x: USV x coordinate in NED reference frame
+                ned_y: USV y coordinate in NED reference frame
+                yaw: USV heading
+                stamp: time (s) of the detection list
+        @return: ids: buoy index of each detection
+        '''
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        return self.observe(frames.body_to_ned(points, ned_x, ned_y, yaw),
+                            colors, classes, stamp)
+
+    def _add(self, x, y, color, clase, stamp):
+        if self.n == len(self.x):
+            self._grow()
+        i = self.n
+        self.n += 1
+        self.x[i] = x
+        self.y[i] = y
+        self.cov[i] = 0.
+        self.count[i] = 1
+        self.first_seen[i] = stamp
+        self.last_seen[i] = stamp
+        self.color[i] = color
+        self.clase[i] = clase
+        self.grid.setdefault(self._cell(x, y), []).append(i)
+        return i
+
+    def _merge(self, i, x, y, stamp):
+        # Welford update of mean and covariance, with the weight of a new
+        # observation bounded by the window
+        self.count[i] += 1
+        w = 1./min(self.count[i], self.window)
+        dx = x - self.x[i]
+        dy = y - self.y[i]
+        cell = self._cell(self.x[i], self.y[i])
+        self.x[i] += w*dx
+        self.y[i] += w*dy
+        self.cov[i] = (1 - w)*(self.cov[i] + w*np.array([[dx*dx, dx*dy],
+                                                         [dx*dy, dy*dy]]))
+        self.last_seen[i] = stamp
+        new_cell = self._cell(self.x[i], self.y[i])
+        if new_cell != cell:
+            self.grid[cell].remove(i)
+            if not self.grid[cell]:
+                del self.grid[cell]
+            self.grid.setdefault(new_cell, []).append(i)
+
+    def prune(self, stamp=None):
+        '''
+        @name: prune
+        @brief: Drops the buoys seen once and not confirmed within the
+          tentative timeout. Buoy indexes change when buoys are dropped.
+        @param: stamp: current time (s), the last detection time by default
+        @return: removed: number of buoys dropped
+        '''
+        if stamp is None:
+            stamp = self.stamp
+        if stamp is None or self.n == 0:
+            return 0
+        n = self.n
+        keep = ((self.count[:n] > 1) |
+                (stamp - self.last_seen[:n] <= self.tentative_timeout))
+        removed = n - int(keep.sum())
+        if removed:
+            for name in ('x', 'y', 'cov', 'count', 'first_seen', 'last_seen',
+                         'color', 'clase'):
+                column = getattr(self, name)
+                kept = column[:n][keep]
+                column[:len(kept)] = kept
+            self.n = n - removed
+            self.grid = {}
+            for i in range(self.n):
+                self.grid.setdefault(self._cell(self.x[i], self.y[i]), []).append(i)
+        return removed
+
+    def covariance(self, i):
+        '''
+        @name: covariance
+        @brief: Position covariance of a buoy.
+        @param: i: buoy index
+        @return: cov: (2,2) covariance in NED reference frame
+        '''
+        return self.cov[i].copy()
+
+    def within(self, x, y, radius, color=None):
+        '''
+        @name: within
+        @brief: Buoys within a radius of a NED point.
+        @param: x: point x coordinate in NED reference frame
+                y: point y coordinate in NED reference frame
+                radius: search radius (m)
+                color: only buoys of this color when given
+        @return: ids: buoy indexes, nearest first
+        '''
+        ids = [i for i in self._candidates(x, y, radius)
+               if color is None or self.color[i] == color]
+        ids = np.array(ids, dtype=int)
+        distance = np.hypot(self.x[ids] - x, self.y[ids] - y)
+        order = np.argsort(distance, kind='mergesort')
+        return ids[order][distance[order] <= radius]
+
+    def nearest(self, x, y, k=1, color=None, ids=None):
+        '''
+        @name: nearest
+        @brief: k nearest buoys to a NED point.
+        @param: x: point x coordinate in NED reference frame
+                y: point y coordinate in NED reference frame
+                k: number of buoys
+                color: only buoys of this color when given
+                ids: only these buoy indexes when given
+        @return: ids: up to k buoy indexes, nearest first
+        '''
+        if ids is None:
+            ids = np.arange(self.n)
+        ids = np.asarray(ids, dtype=int)
+        if color is not None:
+            ids = ids[self.color[ids] == color]
+        distance = np.hypot(self.x[ids] - x, self.y[ids] - y)
+        if len(ids) > k:
+            closest = np.argpartition(distance, k - 1)[:k]
+            ids = ids[closest]
+            distance = distance[closest]
+        return ids[np.argsort(distance, kind='mergesort')]
+
+    def ahead(self, ned_x, ned_y, yaw, max_distance=10, min_x=0):
+        '''
+        @name: ahead
+        @brief: Buoys in front of the USV.
+        @param: ned_x: USV x coordinate in NED reference frame
+                ned_y: USV y coordinate in NED reference frame
+                yaw: USV heading
+                max_distance: max distance (m) to the USV
+                min_x: min x coordinate in body reference frame
+        @return: ids: buoy indexes, nearest first
+                 body: (M,2) buoy coordinates in body reference frame
+        '''
+        ids = self.within(ned_x, ned_y, max_distance)
+        body = frames.ned_to_body(np.column_stack((self.x[ids], self.y[ids])),
+                                  ned_x, ned_y, yaw).reshape(-1, 2)
+        front = body[:, 0] > min_x
+        return (ids[front], body[front])
+
+    def gate_ahead(self, ned_x, ned_y, yaw, max_distance=10, min_x=0):
+        '''
+        @name: gate_ahead
+        @brief: The two nearest buoys in front of the USV, as a gate.
+        @param: ned_x: USV x coordinate in NED reference frame
+                ned_y: USV y coordinate in NED reference frame
+                yaw: USV heading
+                max_distance: max distance (m) to the USV
+                min_x: min x coordinate in body reference frame
+        @return: ids: (left, right) buoy indexes as seen from the USV, None
+                   when fewer than two buoys are ahead
+        '''
+        ids, body = self.ahead(ned_x, ned_y, yaw, max_distance, min_x)
+        if len(ids) < 2:
+            return None
+        if body[0, 1] < body[1, 1]:
+            return (int(ids[0]), int(ids[1]))
+        return (int(ids[1]), int(ids[0]))
@@ -29,6 +29,8 @@ import math
 
 import os
 
+from usv_control import debug_log
+
 class Color():
     BLUE  = '\033[94m'
     GREEN = '\033[92m'
@@ -50,6 +52,11 @@ class Detection_Node:
 
         self.detector_pub = rospy.Publisher('/usv_perception/yolo_zed/objects_detected', obj_detected_list, queue_size=10)
 
+        # Per frame records stay in memory, dumped on a crash or on SIGUSR1
+        self.log = debug_log.RingLogger('yolo_zed', sink=debug_log.rospy_sink)
+        self.log.dump_on_crash()
+        self.log.dump_on_signal()
+
 
     def callback_zed_img(self,img):
         """ ZED rect_image callback"""
@@ -160,7 +167,6 @@ class Detection_Node:
 
                 if detect == True:
                     color = self.calculate_color(frame,x,y,h,w)
-                    print(zed_cam_size)
 
                     p1= int((x+w/2)*zed_cam_size/1000) #1.28 hd
                     p2= int((y+h/2)*zed_cam_size/1000)
@@ -220,8 +226,8 @@ class Detection_Node:
 
                     det.draw_prediction(frame, cls_ids[i], confidences[i], color,diststring, x, y, x+w, y+h)
 
-            det_str = "Det: {}, BBoxes {}, Colors {}, Distance {}".format(dets, boxes, colors, distances)
-            self.send_message(Color.BLUE, det_str)
+            self.log.debug('detections', "Det: %d, BBoxes %s, Colors %s, Distance %s",
+                           dets, boxes, colors, distances)
             fps.update()
             obj_list.len = len_list
             self.detector_pub.publish(obj_list)